@@ -7,10 +7,16 @@ the Cangjie documentation using the Graph RAG approach.
 """
 
 import argparse
+import functools
 import json
+import os
+import socket
+import socketserver
 import sys
+import textwrap
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from src import (
     GraphRAGRetriever,
@@ -28,7 +34,10 @@ def build_index(docs_path: str = None,
                 db_path: str = "./milvus_cangjie_docs.db",
                 embedding_model_path: str = "./model/Conan-embedding-v1",
                 max_chunk_size: int = 1000,
-                graph_file: str = None) -> None:
+                graph_file: str = None,
+                vector_dtype: str = "float32",
+                embedding_backend: str = "torch",
+                cpu_bf16: bool = False) -> None:
     """Build the Graph RAG index from documentation files."""
 
     print("=" * 80)
@@ -41,6 +50,8 @@ def build_index(docs_path: str = None,
     print(f"💾 Database path: {db_path}")
     print(f"🧠 Embedding model: {embedding_model_path}")
     print(f"📏 Max chunk size: {max_chunk_size}")
+    print(f"🔢 Vector dtype: {vector_dtype}")
+    print(f"🧠 Embedding backend: {embedding_backend}{' (CPU BF16)' if cpu_bf16 else ''}")
     print()
 
     # Initialize components
@@ -57,7 +68,10 @@ def build_index(docs_path: str = None,
     vector_store = MilvusVectorStore(
         db_path=db_path,
         collection_name=collection_name,
-        embedding_model_path=embedding_model_path
+        embedding_model_path=embedding_model_path,
+        vector_dtype=vector_dtype,
+        embedding_backend=embedding_backend,
+        cpu_bf16=cpu_bf16
     )
 
     # Import hybrid processor
@@ -115,11 +129,39 @@ def build_index(docs_path: str = None,
     print("=" * 80)
 
 
+DEFAULT_DAEMON_SOCKET = "/tmp/cj-rag.sock"
+# JSON-RPC error code a daemon returns when asked about an index it did not load
+DAEMON_INDEX_MISMATCH = -32001
+
+
+class DaemonIndexMismatch(RuntimeError):
+    """The running daemon serves a different database, model or graph."""
+
+
+def _index_paths(db_path: str, embed_model_path: str, graph_file: str,
+                 **embedding_options: Any) -> Dict[str, Any]:
+    """Absolute index paths plus the initialize_retrieval_system embedding
+    options, comparable between a daemon and its clients."""
+    return {
+        'db': os.path.abspath(db_path),
+        'embed_model': os.path.abspath(embed_model_path),
+        'load_graph': os.path.abspath(graph_file),
+        **embedding_options,
+    }
+
+
+@functools.lru_cache(maxsize=1)
 def initialize_retrieval_system(db_path: str,
                               embed_model_path: str,
                               graph_file: str,
-                              silent: bool = False) -> GraphRAGRetriever:
-    """Initialize vector store, graph, and retriever with common logic."""
+                              silent: bool = False,
+                              embedding_backend: str = "torch",
+                              cpu_bf16: bool = False) -> GraphRAGRetriever:
+    """Initialize vector store, graph, and retriever with common logic.
+
+    Memoized on its arguments, so repeated calls within one process reuse
+    the loaded embedding model, Milvus client and graph.
+    """
     from pathlib import Path
 
     # Check if database file exists
@@ -152,17 +194,19 @@ def initialize_retrieval_system(db_path: str,
     vector_store = MilvusVectorStore(
         db_path=db_path,
         collection_name=collection_name,
-        embedding_model_path=embed_model_path
+        embedding_model_path=embed_model_path,
+        embedding_backend=embedding_backend,
+        cpu_bf16=cpu_bf16
     )
 
     # Load graph if file exists, otherwise use empty graph
-    if Path(graph_file).exists():
+    from src.graph import CodeGraph
+    if CodeGraph.exists(graph_file):
         from src.graph import GraphBuilder
         graph = GraphBuilder.load_graph(graph_file, silent=silent)
         if not silent:
             print("✅ Graph loaded for enhanced retrieval")
     else:
-        from src.graph import CodeGraph
         graph = CodeGraph()
         if not silent:
             print(f"⚠️  Graph file {graph_file} not found - using semantic search only")
@@ -172,44 +216,198 @@ def initialize_retrieval_system(db_path: str,
     return GraphRAGRetriever(vector_store, graph)
 
 
-def query_docs(query: str,
-               retriever: GraphRAGRetriever,
-               config: Optional[RetrievalConfig] = None) -> List:
-    """Query the documentation using the Graph RAG system."""
+def _result_record(rank: int, result) -> dict:
+    """Convert a retrieval result into a JSON-serializable record."""
+    return {
+        'rank': rank,
+        'score': result.score,
+        'content': result.content,
+        'code_elements': result.metadata.code_elements,
+        'section_title': result.metadata.section_title
+    }
 
-    if config is None:
-        config = RetrievalConfig()
 
+def _print_query_header(query: str, config: RetrievalConfig) -> None:
     print(f"Querying: {query}")
     print(f"Config: initial_k={config.initial_k}, max_distance={config.max_graph_distance}")
 
-    results = retriever.retrieve(query, config)
 
-    print(f"\nFound {len(results)} relevant chunks:")
+def _print_record(record: dict) -> None:
+    """Print one result record."""
+    code_elements = record['code_elements']
+    section_title = record['section_title']
+    section = f"Section: {section_title}\n" if section_title else ""
+
+    # Show content preview, slicing only when the content is actually long
+    content = record['content']
+    content_preview = content if len(content) <= 300 else content[:300] + "..."
+
+    # One write per result instead of one per line
+    print(f"\n[{record['rank']}] Score: {record['score']:.3f}\n"
+          f"File: {Path(code_elements[0] if code_elements else 'unknown').name}\n"
+          f"Code Elements: {', '.join(code_elements[:5])}\n"
+          f"{section}"
+          f"Content: {content_preview}\n"
+          f"{'-' * 40}")
+
+
+def _print_found(count: int) -> None:
+    print(f"\nFound {count} relevant chunks:")
     print("=" * 80)
 
-    formatted_results = []
+
+def iter_results(query: str,
+                 retriever: GraphRAGRetriever,
+                 config: Optional[RetrievalConfig] = None) -> Iterator[dict]:
+    """Query the documentation, printing and yielding one result record at a time."""
+
+    if config is None:
+        config = RetrievalConfig()
+
+    _print_query_header(query, config)
+
+    results = retriever.retrieve(query, config)
+
+    _print_found(len(results))
+
     for i, result in enumerate(results, 1):
-        print(f"\n[{i}] Score: {result.score:.3f}")
-        print(f"File: {Path(result.metadata.code_elements[0] if result.metadata.code_elements else 'unknown').name}")
-        print(f"Code Elements: {', '.join(result.metadata.code_elements[:5])}")
-        if result.metadata.section_title:
-            print(f"Section: {result.metadata.section_title}")
+        record = _result_record(i, result)
+        _print_record(record)
+        yield record
+
+
+def query_docs(query: str,
+               retriever: GraphRAGRetriever,
+               config: Optional[RetrievalConfig] = None) -> List:
+    """Query the documentation using the Graph RAG system."""
+    return list(iter_results(query, retriever, config))
 
-        # Show content preview
-        content_preview = result.content[:300] + "..." if len(result.content) > 300 else result.content
-        print(f"Content: {content_preview}")
-        print("-" * 40)
 
-        formatted_results.append({
-            'rank': i,
-            'score': result.score,
-            'content': result.content,
-            'code_elements': result.metadata.code_elements,
-            'section_title': result.metadata.section_title
-        })
+def write_results_json(records: Iterable[dict], output_path: str) -> int:
+    """Stream result records to a JSON array file without building the list first."""
+    count = 0
+    with open(output_path, 'w') as f:
+        for record in records:
+            f.write(",\n" if count else "[\n")
+            f.write(textwrap.indent(json.dumps(record, indent=2), "  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
 
-    return formatted_results
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, retriever: GraphRAGRetriever,
+                 index_paths: Optional[Dict[str, str]] = None):
+        self.retriever = retriever
+        self.index_paths = index_paths
+        # Connections are served on their own threads, but the retriever's
+        # caches are not thread-safe, so its calls run one at a time
+        self.retriever_lock = threading.Lock()
+        super().__init__(socket_path, _DaemonRequestHandler)
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON-RPC 2.0 requests on a Unix socket.
+
+    Supported methods:
+        query(query, initial_k?, max_distance?, max_results?, index?) -> list of result records
+        stats() -> retriever statistics
+        reload() -> reload the database and graph after a rebuild
+
+    A query naming an ``index`` (see ``_index_paths``) other than the loaded
+    one fails with ``DAEMON_INDEX_MISMATCH``.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self._dispatch(line)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+    def _dispatch(self, line: bytes) -> Dict[str, Any]:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method')
+            params = request.get('params') or {}
+
+            if method == 'query':
+                index = params.get('index')
+                if index is not None and self.server.index_paths is not None \
+                        and index != self.server.index_paths:
+                    return {'jsonrpc': '2.0', 'id': request_id,
+                            'error': {'code': DAEMON_INDEX_MISMATCH,
+                                      'message': f"Daemon serves {self.server.index_paths}"}}
+                config = RetrievalConfig(
+                    initial_k=params.get('initial_k', 5),
+                    max_graph_distance=params.get('max_distance', 2),
+                    max_total_chunks=params.get('max_results', 10)
+                )
+                with self.server.retriever_lock:
+                    results = self.server.retriever.retrieve(params['query'], config)
+                result = [_result_record(i, r) for i, r in enumerate(results, 1)]
+            elif method == 'stats':
+                with self.server.retriever_lock:
+                    result = self.server.retriever.get_statistics()
+            elif method == 'reload':
+                if self.server.index_paths is None:
+                    raise RuntimeError("Daemon was started without index paths to reload")
+                paths = dict(self.server.index_paths)
+                # Bypass the memoized loader, which would hand back the same objects
+                fresh = initialize_retrieval_system.__wrapped__(
+                    paths.pop('db'), paths.pop('embed_model'), paths.pop('load_graph'),
+                    silent=True, **paths
+                )
+                with self.server.retriever_lock:
+                    self.server.retriever.reload(fresh.vector_store, fresh.graph)
+                result = self.server.retriever.get_statistics()
+            else:
+                return {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': -32601, 'message': f"Method not found: {method}"}}
+
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': request_id,
+                    'error': {'code': -32000, 'message': str(e)}}
+
+
+def run_daemon(retriever: GraphRAGRetriever, socket_path: str = DEFAULT_DAEMON_SOCKET,
+               index_paths: Optional[Dict[str, str]] = None) -> None:
+    """Serve queries over a Unix socket, keeping the retrieval system loaded between calls."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    print(f"⏱️  Warmup completed in {retriever.warmup():.2f}s")
+    with _DaemonServer(socket_path, retriever, index_paths) as server:
+        print(f"🛰️  Daemon listening on {socket_path} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Goodbye!")
+        finally:
+            os.unlink(socket_path)
+
+
+def query_daemon(socket_path: str, method: str, params: Optional[dict] = None) -> Any:
+    """Send one JSON-RPC request to a running daemon and return its result."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        request = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params or {}}
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with sock.makefile('rb') as f:
+            response = json.loads(f.readline())
+
+    if 'error' in response:
+        error = response['error']
+        if error.get('code') == DAEMON_INDEX_MISMATCH:
+            raise DaemonIndexMismatch(error['message'])
+        raise RuntimeError(error['message'])
+    return response['result']
 
 
 def interactive_mode(retriever: GraphRAGRetriever):
@@ -253,8 +451,9 @@ def interactive_mode(retriever: GraphRAGRetriever):
                     print(f"Current config: {config}")
                 continue
 
-            # Perform query
-            query_docs(query, retriever, config)
+            # Perform query; results are only printed, so don't keep them
+            for _ in iter_results(query, retriever, config):
+                pass
 
         except KeyboardInterrupt:
             print("\n👋 Goodbye!")
@@ -263,6 +462,19 @@ def interactive_mode(retriever: GraphRAGRetriever):
             print(f"❌ Error: {e}")
 
 
+def add_embedding_arguments(parser: argparse.ArgumentParser) -> None:
+    """Embedding options; queries should use the same ones as the build."""
+    parser.add_argument('--embed-backend', choices=['torch', 'onnx'], default='torch',
+                        help='Embedding runtime; onnx runs INT8 weights quantized for this CPU (default: torch)')
+    parser.add_argument('--cpu-bf16', action='store_true',
+                        help='Run the torch backend in BF16 on CPUs with native BF16 support')
+
+
+def embedding_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """MilvusVectorStore embedding keyword arguments from parsed arguments."""
+    return {'embedding_backend': args.embed_backend, 'cpu_bf16': args.cpu_bf16}
+
+
 def main():
     """Main CLI interface."""
 
@@ -273,11 +485,14 @@ def main():
     # Build command
     build_parser = subparsers.add_parser('build', help='Build the search index')
     build_parser.add_argument('--docs', help='Path to markdown documentation directory')
-    build_parser.add_argument('--jsonl', help='Path to JSONL file with DocumentModel schema')
+    build_parser.add_argument('--jsonl', help='Path to JSONL file with DocumentModel schema (.gz, .bz2, .xz and .zst are decompressed)')
     build_parser.add_argument('--db', default='./milvus_cangjie_docs.db', help='Milvus database path')
     build_parser.add_argument('--embed-model', default='./model/Conan-embedding-v1', help='Embedding model path')
     build_parser.add_argument('--chunk-size', type=int, default=1000, help='Maximum chunk size')
     build_parser.add_argument('--save-graph', default='graph.pkl', help='Save graph to file (default: graph.pkl)')
+    build_parser.add_argument('--vector-dtype', choices=['float32', 'float16'], default='float32',
+                              help='Vector storage type; float16 halves index size (default: float32)')
+    add_embedding_arguments(build_parser)
 
     # Query command
     query_parser = subparsers.add_parser('query', help='Query the documentation')
@@ -285,17 +500,24 @@ def main():
     query_parser.add_argument('--db', default='./milvus_cangjie_docs.db', help='Milvus database path')
     query_parser.add_argument('--embed-model', default='./model/Conan-embedding-v1', help='Embedding model path')
     query_parser.add_argument('--load-graph', default='graph.pkl', help='Load graph from file (default: graph.pkl)')
+    add_embedding_arguments(query_parser)
     query_parser.add_argument('--initial-k', type=int, default=5, help='Initial semantic search results')
     query_parser.add_argument('--max-distance', type=int, default=2, help='Maximum graph traversal distance')
     query_parser.add_argument('--max-results', type=int, default=10, help='Maximum final results')
     query_parser.add_argument('--output', help='Output file for results (JSON)')
+    query_parser.add_argument('--socket', default=DEFAULT_DAEMON_SOCKET,
+                              help=f'Daemon socket to query if one is running (default: {DEFAULT_DAEMON_SOCKET})')
 
     # Interactive command
     interactive_parser = subparsers.add_parser('interactive', help='Start interactive mode')
     interactive_parser.add_argument('--db', default='./milvus_cangjie_docs.db', help='Milvus database path')
     interactive_parser.add_argument('--embed-model', default='./model/Conan-embedding-v1', help='Embedding model path')
     interactive_parser.add_argument('--load-graph', default='graph.pkl', help='Load graph from file (default: graph.pkl)')
-
+    add_embedding_arguments(interactive_parser)
+    interactive_parser.add_argument('--daemon', action='store_true',
+                                    help='Serve queries over a Unix socket instead of reading from stdin')
+    interactive_parser.add_argument('--socket', default=DEFAULT_DAEMON_SOCKET,
+                                    help=f'Daemon socket path (default: {DEFAULT_DAEMON_SOCKET})')
 
     args = parser.parse_args()
 
@@ -315,41 +537,77 @@ def main():
                 db_path=args.db,
                 embedding_model_path=args.embed_model,
                 max_chunk_size=args.chunk_size,
-                graph_file=args.save_graph
+                graph_file=args.save_graph,
+                vector_dtype=args.vector_dtype,
+                **embedding_options(args)
             )
 
         elif args.command == 'query':
-            # Initialize retrieval system
-            retriever = initialize_retrieval_system(
-                args.db,
-                args.embed_model,
-                args.load_graph
-            )
-
             config = RetrievalConfig(
                 initial_k=args.initial_k,
                 max_graph_distance=args.max_distance,
                 max_total_chunks=args.max_results
             )
 
-            # Perform the query
-            results = query_docs(args.query, retriever, config)
-
-            # Save to output file if specified
+            records = None
+            if os.path.exists(args.socket):
+                # A daemon may already hold the retrieval system, skip re-initialization
+                try:
+                    records = query_daemon(args.socket, 'query', {
+                        'query': args.query,
+                        'initial_k': args.initial_k,
+                        'max_distance': args.max_distance,
+                        'max_results': args.max_results,
+                        'index': _index_paths(args.db, args.embed_model, args.load_graph,
+                                              **embedding_options(args))
+                    })
+                except (OSError, DaemonIndexMismatch) as e:
+                    # A stale socket file, or a daemon serving another index
+                    print(f"⚠️  Not using daemon at {args.socket}: {e}")
+
+            if records is not None:
+                _print_query_header(args.query, config)
+                _print_found(len(records))
+
+                def daemon_results():
+                    for record in records:
+                        _print_record(record)
+                        yield record
+
+                results = daemon_results()
+            else:
+                # Initialize retrieval system
+                retriever = initialize_retrieval_system(
+                    args.db,
+                    args.embed_model,
+                    args.load_graph,
+                    **embedding_options(args)
+                )
+
+                # Perform the query, streaming results to the output file if specified
+                results = iter_results(args.query, retriever, config)
             if args.output:
-                with open(args.output, 'w') as f:
-                    json.dump(results, f, indent=2)
+                write_results_json(results, args.output)
                 print(f"📁 Results saved to: {args.output}")
+            else:
+                for _ in results:
+                    pass
 
         elif args.command == 'interactive':
             # Initialize retrieval system
             retriever = initialize_retrieval_system(
                 args.db,
                 args.embed_model,
-                args.load_graph
+                args.load_graph,
+                **embedding_options(args)
             )
 
-            interactive_mode(retriever)
+            if args.daemon:
+                run_daemon(retriever, args.socket,
+                           _index_paths(args.db, args.embed_model, args.load_graph,
+                                        **embedding_options(args)))
+            else:
+                interactive_mode(retriever)
 
 
     except Exception as e:
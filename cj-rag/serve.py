@@ -19,69 +19,101 @@ from fastmcp import FastMCP
 from src.graph import GraphBuilder, CodeGraph
 from src.vector_store import MilvusVectorStore
 from src.retriever import GraphRAGRetriever, RetrievalConfig
-from main import initialize_retrieval_system
+from main import add_embedding_arguments, embedding_options, initialize_retrieval_system
+
+
+def _format_result(i: int, result) -> str:
+    """Format a single retrieval result as one markdown block."""
+    metadata = result.metadata
+    section = f"**Section:** {metadata.section_title}\n\n" if metadata.section_title else ""
+
+    elements = ""
+    if metadata.code_elements:
+        elements_str = ", ".join(metadata.code_elements[:5])
+        if len(metadata.code_elements) > 5:
+            elements_str += f" (+ {len(metadata.code_elements) - 5} more)"
+        elements = f"**Code Elements:** {elements_str}\n\n"
+
+    return f"## Result {i}\n\n{section}{elements}**Content:**\n\n{result.content}\n\n---\n"
 
 
 def format_results(query: str, results) -> str:
     """Format retrieval results for MCP response."""
 
-    response_parts = [
-        f"# Cangjie Documentation Search Results",
-        f"",
-        f"**Query:** {query}",
-        f"**Found:** {len(results)} relevant documentation chunks",
-        f"",
-        "---",
-        ""
-    ]
-
-    for i, result in enumerate(results, 1):
-        # Extract file info from metadata
-        file_info = ""
-        if result.metadata.code_elements:
-            file_info = f"({result.metadata.code_elements[0]})"
-
-        response_parts.extend([
-            f"## Result {i}",
-            ""
-        ])
-
-        # Add section title if available
-        if result.metadata.section_title:
-            response_parts.extend([
-                f"**Section:** {result.metadata.section_title}",
-                ""
-            ])
-
-        # Add code elements if available
-        if result.metadata.code_elements:
-            elements_str = ", ".join(result.metadata.code_elements[:5])
-            if len(result.metadata.code_elements) > 5:
-                elements_str += f" (+ {len(result.metadata.code_elements) - 5} more)"
-            response_parts.extend([
-                f"**Code Elements:** {elements_str}",
-                ""
-            ])
-
-        # Add content
-        response_parts.extend([
-            "**Content:**",
-            "",
-            result.content,
-            "",
-            "---",
-            ""
-        ])
-
-    return "\n".join(response_parts)
+    header = (
+        f"# Cangjie Documentation Search Results\n\n"
+        f"**Query:** {query}\n"
+        f"**Found:** {len(results)} relevant documentation chunks\n\n"
+        f"---\n"
+    )
+
+    return "\n".join([header, *(_format_result(i, result) for i, result in enumerate(results, 1))])
+
+
+class RetrievalBatcher:
+    """Coalesce concurrent retrieval requests into one batched embedding + search call."""
+
+    def __init__(self, retriever: GraphRAGRetriever,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        self.retriever = retriever
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._worker = None
+
+    async def retrieve(self, query: str, config: RetrievalConfig):
+        """Queue a query and wait for its results from the next batch."""
+        if self._worker is None:
+            # Created lazily so the queue and worker live on the server's event loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, config, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Drain the queue in batches of up to max_batch_size or max_wait_ms."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _, _ in batch]
+            configs = [config for _, config, _ in batch]
+            try:
+                # Embedding and graph traversal are blocking, keep them off the event loop
+                batch_results = await asyncio.to_thread(
+                    self.retriever.retrieve_batch, queries, configs
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, _, future), results in zip(batch, batch_results):
+                if not future.done():
+                    future.set_result(results)
+
 
 # Initialize FastMCP
 mcp = FastMCP("Cangjie Graph RAG")
 
 retriever = None
+batcher = None
 
 @mcp.tool()
-def retrieve_cangjie_docs(query: str, max_total_chunks: int = 10) -> str:
+async def retrieve_cangjie_docs(query: str, max_total_chunks: int = 10) -> str:
     """
     Retrieve relevant Cangjie documentation using Graph RAG.
 
@@ -112,14 +144,14 @@ def retrieve_cangjie_docs(query: str, max_total_chunks: int = 10) -> str:
             rerank_by_graph=True
         )
 
-        # Perform retrieval
-        results = retriever.retrieve(query, config)
+        # Perform retrieval, batched with any concurrent requests
+        results = await batcher.retrieve(query, config)
 
         if not results:
             return f"No relevant documentation found for query: '{query}'"
 
-        # Format results
-        return format_results(query, results)
+        # Format results off the event loop; large result sets build long strings
+        return await asyncio.to_thread(format_results, query, results)
 
     except Exception as e:
         return f"Error retrieving Cangjie documentation: {str(e)}"
@@ -136,21 +168,30 @@ def main():
                        help='Embedding model path (default: ./model/Conan-embedding-v1)')
     parser.add_argument('--load-graph', default='graph.pkl',
                        help='Load graph from file (default: graph.pkl)')
+    add_embedding_arguments(parser)
 
     args = parser.parse_args()
 
     try:
         # Create retriever
-        global retriever
+        global retriever, batcher
         retriever = initialize_retrieval_system(
             args.db,
             args.embed_model,
             args.load_graph,
-            silent=True
+            silent=True,
+            **embedding_options(args)
         )
+        batcher = RetrievalBatcher(retriever)
+
+        # Load model weights, database pages and graph arrays before serving
+        warmup_seconds = retriever.warmup()
+        print(f"Warmup completed in {warmup_seconds:.2f}s", file=sys.stderr, flush=True)
 
         # Start MCP server
         # asyncio.run(mcp.run())
+        # uvicorn's default "auto" loop and http settings pick uvloop and
+        # httptools from uvicorn[standard] wherever they are installed
         mcp.run(transport='sse', port=8787)
         # asyncio.run(mcp.run(transport='sse', port=8787))
 
@@ -1,12 +1,19 @@
 """
 Document chunking module for splitting markdown files into processable chunks.
 """
+import functools
+import hashlib
+import itertools
+import mmap
+import os
 import re
-import uuid
-from typing import List, Tuple, Optional
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Tuple, Optional
 from pathlib import Path
 from .models import Chunk, ChunkMetadata
-from .extractor import CangjieCodeElementExtractor
+from .extractor import CangjieCodeElementExtractor, CangjiePatterns
 
 
 class MarkdownChunker:
@@ -15,43 +22,72 @@ class MarkdownChunker:
     def __init__(self, 
                  max_chunk_size: int = 1000,
                  min_chunk_size: int = 100,
-                 overlap_size: int = 50):
+                 overlap_size: int = 50,
+                 verbose: bool = False,
+                 progress: bool = True):
         self.max_chunk_size = max_chunk_size
         self.min_chunk_size = min_chunk_size
         self.overlap_size = overlap_size
+        self.verbose = verbose  # Print a line per chunk with code elements
+        self.progress = progress  # Print the per-file progress lines
         self.extractor = CangjieCodeElementExtractor()
         
         # Regex patterns for markdown structure
-        self.header_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
+        # Whitespace after the hashes must not cross a newline, so the pattern
+        # can be matched inside whole documents as well as on single lines
+        self.header_pattern = re.compile(r'^(#{1,6})[^\S\n]+(.+)$', re.MULTILINE)
         self.code_block_pattern = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+        # Runs of non-whitespace, the words str.split() would return
+        self.word_pattern = re.compile(r'\S+')
     
     def chunk_file(self, file_path: str) -> List[Chunk]:
         """Chunk a single markdown file."""
-        print(f"  📄 Processing file: {file_path}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            print(f"  ⚠️  Encoding issue with {file_path}, using fallback encoding")
-            # Try with different encoding
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        
+        return self.chunk_text(self.read_file(file_path), file_path)
+
+    @staticmethod
+    def read_file(file_path: str) -> str:
+        """Read a markdown file as text, the way text-mode open() would."""
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                return ''
+            # Decode straight from the page cache instead of copying the
+            # file into a bytes object first
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                try:
+                    content = str(data, 'utf-8')
+                except UnicodeDecodeError:
+                    print(f"  ⚠️  Encoding issue with {file_path}, using fallback encoding")
+                    # Try with different encoding
+                    content = str(data, 'utf-8', 'ignore')
+        if '\r' in content:
+            # Universal newlines, as text-mode reads translate them
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content
+
+    def chunk_text(self, content: str, file_path: str) -> List[Chunk]:
+        """Chunk the already-read text of a markdown file."""
+        if self.progress:
+            print(f"  📄 Processing file: {file_path}")
         chunks = self.chunk_content(content, file_path)
-        print(f"    ✅ Generated {len(chunks)} chunks from {file_path}")
+        if self.progress:
+            print(f"    ✅ Generated {len(chunks)} chunks from {file_path}")
         return chunks
     
     def chunk_content(self, content: str, file_path: str) -> List[Chunk]:
         """Chunk markdown content into processable pieces."""
         chunks = []
+        # Chunk IDs are numbered per file, so re-chunking a file reproduces them.
+        # The counter stays local: the chunker is pickled into worker processes
+        counter = itertools.count()
         
         # First, try to split by headers
-        header_chunks = self._split_by_headers(content, file_path)
+        header_chunks = self._split_by_headers(content, file_path, counter)
         
         # Then, split large chunks by size if needed
         for chunk in header_chunks:
             if len(chunk.content) > self.max_chunk_size:
-                size_chunks = self._split_by_size(chunk)
+                size_chunks = self._split_by_size(chunk, counter)
                 chunks.extend(size_chunks)
             else:
                 chunks.append(chunk)
@@ -60,58 +96,77 @@ class MarkdownChunker:
         chunks = [c for c in chunks if len(c.content.strip()) >= self.min_chunk_size]
         
         # Add code element metadata to chunks
-        print(f"    🔍 Extracting code elements from {len(chunks)} chunks...")
+        if self.progress:
+            print(f"    🔍 Extracting code elements from {len(chunks)} chunks...")
+        total_found = 0
         for i, chunk in enumerate(chunks):
             chunk.metadata.code_elements = self.extractor.get_code_element_names(chunk)
-            if chunk.metadata.code_elements:
+            total_found += len(chunk.metadata.code_elements)
+            if self.verbose and chunk.metadata.code_elements:
                 print(f"      📝 Chunk {i+1}: Found {len(chunk.metadata.code_elements)} code elements: {chunk.metadata.code_elements[:3]}{'...' if len(chunk.metadata.code_elements) > 3 else ''}")
+        if self.progress:
+            print(f"    ✅ {total_found} code elements across {len(chunks)} chunks")
         
         return chunks
     
-    def _split_by_headers(self, content: str, file_path: str) -> List[Chunk]:
-        """Split content by markdown headers."""
+    def _split_by_headers(self, content: str, file_path: str,
+                          counter: Iterator[int]) -> List[Chunk]:
+        """Split content by markdown headers.
+
+        Sections are sliced out of the content between header matches instead
+        of being rebuilt from lines; a header on the first line does not start
+        a new section.
+        """
         chunks = []
-        lines = content.split('\n')
         
-        current_section = []
+        section_start = 0
         current_header = None
         start_line = 1
+
+        # Line index of the current header, counted incrementally from the last one
+        line_index = 0
+        counted_to = 0
         
-        for i, line in enumerate(lines):
-            header_match = self.header_pattern.match(line)
-            
-            if header_match and current_section:
-                # Save previous section
-                section_content = '\n'.join(current_section)
-                if section_content.strip():
-                    chunk = self._create_chunk(
-                        content=section_content,
-                        file_path=file_path,
-                        start_line=start_line,
-                        end_line=i,
-                        section_title=current_header
-                    )
-                    chunks.append(chunk)
-                
-                # Start new section
-                current_section = [line]
-                current_header = header_match.group(2).strip()
-                start_line = i + 1
-            else:
-                current_section.append(line)
-        
-        # Add the last section
-        if current_section:
-            section_content = '\n'.join(current_section)
+        for header_match in self._iter_headers(content):
+            header_start = header_match.start()
+            line_index += content.count('\n', counted_to, header_start)
+            counted_to = header_start
+
+            if line_index == 0:
+                continue
+
+            # Save previous section (without the newline before this header)
+            section_content = content[section_start:header_start - 1]
             if section_content.strip():
                 chunk = self._create_chunk(
                     content=section_content,
                     file_path=file_path,
                     start_line=start_line,
-                    end_line=len(lines),
-                    section_title=current_header
+                    end_line=line_index,
+                    section_title=current_header,
+                    counter=counter
                 )
                 chunks.append(chunk)
+            
+            # Start new section
+            section_start = header_start
+            current_header = header_match.group(2).strip()
+            start_line = line_index + 1
+
+        line_count = line_index + content.count('\n', counted_to) + 1
+        
+        # Add the last section
+        section_content = content[section_start:]
+        if section_content.strip():
+            chunk = self._create_chunk(
+                content=section_content,
+                file_path=file_path,
+                start_line=start_line,
+                end_line=line_count,
+                section_title=current_header,
+                counter=counter
+            )
+            chunks.append(chunk)
         
         # If no headers found, treat entire content as one chunk
         if not chunks:
@@ -119,78 +174,129 @@ class MarkdownChunker:
                 content=content,
                 file_path=file_path,
                 start_line=1,
-                end_line=len(lines),
-                section_title=None
+                end_line=line_count,
+                section_title=None,
+                counter=counter
             )
             chunks.append(chunk)
         
         return chunks
     
-    def _split_by_size(self, chunk: Chunk) -> List[Chunk]:
-        """Split a large chunk into smaller chunks by size."""
+    def _iter_headers(self, content: str):
+        """Yield header matches in order, trying the pattern only at lines starting with '#'."""
+        if content.startswith('#'):
+            header_match = self.header_pattern.match(content, 0)
+            if header_match:
+                yield header_match
+
+        pos = content.find('\n#')
+        while pos != -1:
+            header_match = self.header_pattern.match(content, pos + 1)
+            if header_match:
+                yield header_match
+            pos = content.find('\n#', pos + 1)
+
+    def _split_by_size(self, chunk: Chunk, counter: Iterator[int]) -> List[Chunk]:
+        """Split a large chunk into smaller chunks by size.
+
+        Windows are slices of the original content, so whitespace and line
+        structure survive and each window gets the lines it actually covers.
+        A window ends at the first word end at least max_chunk_size
+        characters past its start; the next one starts a few words before
+        that end to overlap.
+        """
         chunks = []
         content = chunk.content
-        words = content.split()
         
-        if len(words) <= self.max_chunk_size // 10:  # Rough word count estimate
+        # Rough word count estimate; the maxsplit cap avoids splitting every word
+        word_limit = self.max_chunk_size // 10
+        if len(content.split(None, word_limit)) <= word_limit:
             return [chunk]
+
+        first_word = self.word_pattern.search(content)
+        window_start = first_word.start() if first_word else len(content)
+        window_end = window_start
+        most_overlap = self.overlap_size // 10
+
+        # Window starts never move backwards, so their lines are counted incrementally
+        line = chunk.start_line
+        counted_to = 0
+
+        def create_window(start: int, end: int) -> Chunk:
+            nonlocal line, counted_to
+            line += content.count('\n', counted_to, start)
+            counted_to = start
+            return self._create_chunk(
+                content=content[start:end],
+                file_path=chunk.file_path,
+                start_line=line,
+                end_line=line + content.count('\n', start, end),
+                section_title=chunk.metadata.section_title,
+                counter=counter
+            )
         
-        current_chunk = []
-        current_size = 0
-        start_word = 0
-        
-        for i, word in enumerate(words):
-            current_chunk.append(word)
-            current_size += len(word) + 1  # +1 for space
+        while True:
+            # A window is full once its length plus one trailing space reaches
+            # max_chunk_size, so it ends with the word covering the offset
+            # below; always past the previous window's end
+            reaching_word = self.word_pattern.search(
+                content, max(window_start + self.max_chunk_size - 2, window_end))
+            if reaching_word is None:
+                break
+            window_end = reaching_word.end()
+            window = create_window(window_start, window_end)
+            chunks.append(window)
             
-            if current_size >= self.max_chunk_size:
-                # Create chunk with overlap
-                chunk_content = ' '.join(current_chunk)
-                new_chunk = self._create_chunk(
-                    content=chunk_content,
-                    file_path=chunk.file_path,
-                    start_line=chunk.start_line,
-                    end_line=chunk.end_line,
-                    section_title=chunk.metadata.section_title
-                )
-                chunks.append(new_chunk)
-                
-                # Start next chunk with overlap
-                overlap_words = max(0, min(self.overlap_size // 10, len(current_chunk) // 4))
-                current_chunk = current_chunk[-overlap_words:]
-                current_size = sum(len(w) + 1 for w in current_chunk)
-                start_word = i - overlap_words
+            # Start next chunk with overlap; an overlap of 0 keeps the whole
+            # window, as slicing the last 0 words with [-0:] always did.
+            # Only window sizes below 4 * most_overlap words matter, so the
+            # word count is capped there
+            window_size = len(window.content.split(None, 4 * most_overlap))
+            overlap_words = max(0, min(most_overlap, window_size // 4))
+            if overlap_words:
+                window_start = self._word_start_before(content, window_end, overlap_words)
         
         # Add remaining content
-        if current_chunk:
-            chunk_content = ' '.join(current_chunk)
-            if len(chunk_content.strip()) >= self.min_chunk_size:
-                new_chunk = self._create_chunk(
-                    content=chunk_content,
-                    file_path=chunk.file_path,
-                    start_line=chunk.start_line,
-                    end_line=chunk.end_line,
-                    section_title=chunk.metadata.section_title
-                )
-                chunks.append(new_chunk)
+        remaining = content[window_start:].rstrip()
+        if remaining and len(remaining) >= self.min_chunk_size:
+            chunks.append(create_window(window_start, window_start + len(remaining)))
         
         return chunks if chunks else [chunk]
     
+    @staticmethod
+    def _word_start_before(content: str, end: int, count: int) -> int:
+        """Offset where the count-th word before position end starts."""
+        pos = end
+        for _ in range(count):
+            while pos > 0 and content[pos - 1].isspace():
+                pos -= 1
+            while pos > 0 and not content[pos - 1].isspace():
+                pos -= 1
+        return pos
+    
     def _create_chunk(self, 
                      content: str, 
                      file_path: str, 
                      start_line: int, 
                      end_line: int, 
-                     section_title: Optional[str]) -> Chunk:
-        """Create a chunk with appropriate metadata."""
-        chunk_id = str(uuid.uuid4())
-        chunk_type = self._determine_chunk_type(content)
+                     section_title: Optional[str],
+                     counter: Iterator[int]) -> Chunk:
+        """Create a chunk with appropriate metadata, numbered from counter."""
+        chunk_id = f"{_file_id_prefix(file_path)}:{next(counter)}"
+        code_ranges = self._compute_code_ranges(content)
+        chunk_type = self._determine_chunk_type(content, code_ranges)
         
         metadata = ChunkMetadata(
             code_elements=[],  # Will be populated later
             language="cangjie",
-            section_title=section_title
+            # Sibling chunks repeat their section title; keep one copy of it
+            section_title=sys.intern(section_title) if section_title else None
         )
+        # Ranges are kept relative to the stripped content stored on the chunk
+        leading = len(content) - len(content.lstrip())
+        metadata.code_ranges = ([(start - leading, end - leading, language)
+                                 for start, end, language in code_ranges]
+                                if leading else code_ranges)
         
         return Chunk(
             id=chunk_id,
@@ -202,25 +308,27 @@ class MarkdownChunker:
             metadata=metadata
         )
     
-    def _determine_chunk_type(self, content: str) -> str:
+    def _compute_code_ranges(self, content: str) -> List[Tuple[int, int, str]]:
+        """Find the (start, end, language) spans of fenced code bodies in content."""
+        # A fenced block needs a ``` run; without one skip the DOTALL scan
+        if '```' not in content:
+            return []
+        return [(match.start(2), match.end(2), match.group(1) or "")
+                for match in self.code_block_pattern.finditer(content)]
+    
+    def _determine_chunk_type(self, content: str,
+                              code_ranges: Optional[List[Tuple[int, int, str]]] = None) -> str:
         """Determine if a chunk is TEXT, CODE, or MIXED."""
-        code_blocks = self.code_block_pattern.findall(content)
+        if code_ranges is None:
+            code_ranges = self._compute_code_ranges(content)
         
-        if not code_blocks:
+        if not code_ranges:
             # Check if there are code-like patterns in the text
-            code_patterns = [
-                r'func\s+\w+\s*\(',
-                r'class\s+\w+',
-                r'struct\s+\w+',
-                r'interface\s+\w+',
-                r'enum\s+\w+'
-            ]
-            
-            has_code_patterns = any(re.search(pattern, content) for pattern in code_patterns)
+            has_code_patterns = CangjiePatterns.CODE_HINT.search(content) is not None
             return "MIXED" if has_code_patterns else "TEXT"
         
         # Calculate ratio of code to text
-        code_length = sum(len(block[1]) for block in code_blocks)
+        code_length = sum(end - start for start, end, _ in code_ranges)
         total_length = len(content)
         code_ratio = code_length / total_length if total_length > 0 else 0
         
@@ -232,35 +340,125 @@ class MarkdownChunker:
             return "TEXT"
 
 
+@functools.lru_cache(maxsize=1024)
+def _file_id_prefix(file_path: str) -> str:
+    """Short stable hash of a file path, used as the prefix of its chunk IDs."""
+    return hashlib.blake2b(file_path.encode('utf-8'), digest_size=6).hexdigest()
+
+
+# Chunker used by worker processes, set once per process by _init_worker
+_worker_chunker: Optional[MarkdownChunker] = None
+
+
+def _init_worker(chunker: MarkdownChunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+    # Per-chunk logging from many processes would interleave and funnel through
+    # the shared terminal; the parent reports per-file progress instead. The
+    # chunker is this process's own copy, and warnings still get through
+    chunker.progress = False
+    chunker.verbose = False
+
+
+def _chunk_file_worker(file_path: str) -> Tuple[List[Chunk], Optional[str]]:
+    """Chunk one file in a worker process, returning the error instead of raising."""
+    try:
+        return _worker_chunker.chunk_file(file_path), None
+    except Exception as e:
+        return [], str(e)
+
+
+def _read_file_safe(file_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """Read one file, returning the error instead of raising."""
+    try:
+        return MarkdownChunker.read_file(file_path), None
+    except Exception as e:
+        return None, str(e)
+
+
 class DirectoryProcessor:
     """Process multiple markdown files in a directory."""
-    
-    def __init__(self, chunker: Optional[MarkdownChunker] = None):
+
+    # Below this many files, process start-up costs more than parallel parsing saves
+    PARALLEL_MIN_FILES = 16
+    # Reads kept in flight ahead of the chunker when chunking in-process
+    READ_AHEAD = 128
+
+    def __init__(self, chunker: Optional[MarkdownChunker] = None,
+                 max_workers: Optional[int] = None):
         self.chunker = chunker or MarkdownChunker()
+        self.max_workers = max_workers or os.cpu_count() or 1
     
     def process_directory(self, directory_path: str, 
                          pattern: str = "*.md") -> List[Chunk]:
-        """Process all markdown files in a directory."""
+        """Process all markdown files in a directory.
+
+        Files are chunked in parallel across processes when there are enough
+        of them; chunks are returned in the same file order either way.
+        """
         directory = Path(directory_path)
         chunks = []
         
         # Find all markdown files first
-        files = list(directory.rglob(pattern))
+        files = [file_path for file_path in directory.rglob(pattern) if file_path.is_file()]
         print(f"📁 Found {len(files)} markdown files in {directory_path}")
-        
-        for i, file_path in enumerate(files, 1):
-            if file_path.is_file():
-                print(f"📄 [{i}/{len(files)}] Processing: {file_path.name}")
-                try:
-                    file_chunks = self.chunker.chunk_file(str(file_path))
-                    chunks.extend(file_chunks)
-                except Exception as e:
-                    print(f"❌ Error processing {file_path}: {e}")
-                    continue
+
+        for i, (file_path, (file_chunks, error)) in enumerate(
+                zip(files, self._chunk_files([str(f) for f in files])), 1):
+            if error is not None:
+                print(f"📄 [{i}/{len(files)}] Processed: {file_path.name}")
+                print(f"❌ Error processing {file_path}: {error}")
+                continue
+            print(f"📄 [{i}/{len(files)}] Processed: {file_path.name} ({len(file_chunks)} chunks)")
+            chunks.extend(file_chunks)
         
         print(f"✅ Completed processing {len(files)} files, generated {len(chunks)} total chunks")
         return chunks
+
+    def _chunk_files(self, file_paths: List[str]):
+        """Yield (chunks, error) for each file, in order."""
+        if self.max_workers <= 1 or len(file_paths) < self.PARALLEL_MIN_FILES:
+            yield from self._chunk_files_in_process(file_paths)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.chunker,)) as executor:
+            yield from executor.map(_chunk_file_worker, file_paths, chunksize=8)
     
+    def _chunk_files_in_process(self, file_paths: List[str]):
+        """Chunk files on this thread while a thread pool reads the next ones.
+
+        At most READ_AHEAD reads are outstanding, so file contents waiting
+        to be chunked stay bounded on large directories.
+        """
+        if not file_paths:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(32, len(file_paths))) as pool:
+            pending = deque()
+            next_path = iter(file_paths)
+
+            for file_path in next_path:
+                pending.append((file_path, pool.submit(_read_file_safe, file_path)))
+                if len(pending) >= self.READ_AHEAD:
+                    break
+
+            while pending:
+                file_path, future = pending.popleft()
+                for queued_path in next_path:
+                    pending.append((queued_path, pool.submit(_read_file_safe, queued_path)))
+                    break
+
+                content, error = future.result()
+                if error is not None:
+                    yield [], error
+                    continue
+                try:
+                    yield self.chunker.chunk_text(content, file_path), None
+                except Exception as e:
+                    yield [], str(e)
+
     def process_files(self, file_paths: List[str]) -> List[Chunk]:
         """Process a list of markdown files."""
         chunks = []
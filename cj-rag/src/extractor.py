@@ -2,8 +2,9 @@
 Cangjie code element extraction using regex patterns.
 """
 import re
-from typing import List, Tuple
-from .models import Chunk, CodeElement, Reference, ElementType, ReferenceType
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+from .models import Chunk, ChunkMetadata, CodeElement, Reference, ElementType, ReferenceType
 
 
 class CangjiePatterns:
@@ -24,11 +25,90 @@ class CangjiePatterns:
     INTERFACE_DEF = re.compile(r'interface\s+(\w+)(?:\s*\{|\s*$|\s+)', re.MULTILINE)
     # enum A, enum A {
     ENUM_DEF = re.compile(r'enum\s+(\w+)(?:\s*\{|\s*$|\s+)', re.MULTILINE)
+    # All four type definitions in one pass; only classes take an extends clause.
+    # The lookahead rejects positions that cannot start a keyword before
+    # entering the alternation
+    TYPE_DEF = re.compile(
+        r'(?=[ceis])(?:(?P<class>class)\s+(?P<class_name>\w+)(?:\s+extends\s+(?P<base>\w+))?'
+        r'|(?P<kind>struct|interface|enum)\s+(?P<name>\w+))'
+        r'(?:\s*\{|\s*$|\s+)',
+        re.MULTILINE
+    )
+
+    # Code-like text outside code blocks (markdown chunk type detection).
+    # Both hints share TYPE_DEF's keyword lookahead
+    CODE_HINT = re.compile(r'(?=[cfeis])(?:func\s+\w+\s*\(|(?:class|struct|interface|enum)\s+\w+)')
+    # Stricter declaration check used for JSONL document text
+    DECLARATION_HINT = re.compile(
+        r'(?=[cfeis])(?:func\s+\w+\s*\('
+        r'|(?:class\s+\w+(?:\s+extends\s+\w+)?|(?:struct|interface|enum)\s+\w+)(?:\s*\{|\s*$|\s+))'
+    )
     
-    # Function calls: obj.method(...) or function(...)
-    METHOD_CALL = re.compile(r'(\w+)\.(\w+)\s*\(', re.MULTILINE)
+    # Function calls: obj.method(...) or function(...); the leading \b keeps
+    # the engine from retrying at every character inside a receiver name
+    METHOD_CALL = re.compile(r'\b(\w+)\.(\w+)\s*\(', re.MULTILINE)
     FUNCTION_CALL = re.compile(r'(?<![\w.])\b([a-zA-Z_]\w*)\s*\(', re.MULTILINE)
 
+    # 'func' keyword with trailing whitespace; its end is where a defined name starts
+    FUNC_KEYWORD = re.compile(r'func\s*')
+
+    # Parameter declarations: name: Type or name!: Type = default
+    PARAMETER_TYPE = re.compile(r'\w+!?\s*:\s*([^=]+)(?:\s*=.*)?')
+    # Characters that matter when splitting a parameter list
+    PARAMETER_DELIMITER = re.compile(r'[<>,]')
+    # Leading identifier of a type expression: Array<String> -> Array
+    BASE_TYPE = re.compile(r'(\w+)')
+    # Cangjie naming convention for user types: leading uppercase, letters only
+    CUSTOM_TYPE = re.compile(r'[A-Z][A-Za-z]+\Z')
+
+
+_TYPE_DEF_KINDS = {
+    'class': ElementType.CLASS,
+    'struct': ElementType.STRUCT,
+    'interface': ElementType.INTERFACE,
+    'enum': ElementType.ENUM,
+}
+
+# Built-in types that are never reported as custom type references
+_PRIMITIVE_TYPES = frozenset({
+    'Int8', 'Int16', 'Int32', 'Int64', 'IntNative',
+    'UInt8', 'UInt16', 'UInt32', 'UInt64', 'UIntNative',
+    'Float16', 'Float32', 'Float64',
+    'String', 'Rune', 'Bool', 'Unit', 'Byte',
+    'Array', 'ArrayList', 'HashMap', 'HashSet',
+    'Option', 'Result', 'Iterator'
+})
+
+# Control-flow words that look like calls when followed by '('
+_METHOD_FALSE_POSITIVES = frozenset({
+    'if', 'for', 'while', 'switch', 'catch', 'try'
+})
+
+# Keywords that are never function calls, plus common false positives
+_CALL_KEYWORDS = frozenset({
+    'if', 'for', 'while', 'switch', 'case', 'catch', 'try',
+    'func', 'class', 'struct', 'interface', 'enum', 'var', 'let'
+})
+
+
+class _LineCounter:
+    """Map offsets in a text to line numbers, counting newlines incrementally.
+
+    Matches from finditer arrive in increasing offset order, so each lookup
+    only counts the newlines since the previous one instead of rescanning
+    the text from the start.
+    """
+
+    def __init__(self, text: str, first_line: int):
+        self.text = text
+        self.offset = 0
+        self.line = first_line
+
+    def line_at(self, offset: int) -> int:
+        self.line += self.text.count('\n', self.offset, offset)
+        self.offset = offset
+        return self.line
+
 
 class CangjieCodeElementExtractor:
     """Extract code elements from Cangjie documentation chunks."""
@@ -48,6 +128,35 @@ class CangjieCodeElementExtractor:
         
         return elements
     
+    def extract_elements_cached(self, chunk: Chunk) -> List[CodeElement]:
+        """Return the chunk's code elements, extracting them only the first time."""
+        elements = chunk.metadata.extracted_elements
+        if elements is None:
+            elements = self.extract_elements(chunk)
+            chunk.metadata.extracted_elements = elements
+        return elements
+    
+    def extract_references_cached(self, chunk: Chunk) -> List[Reference]:
+        """Return the chunk's references, extracting them only the first time."""
+        references = chunk.metadata.extracted_references
+        if references is None:
+            if chunk.metadata.extracted_elements is None:
+                # Elements are wanted as well; share the function signature scan
+                chunk.metadata.extracted_elements, references = self.extract_all(chunk)
+            else:
+                references = self.extract_references(chunk)
+            chunk.metadata.extracted_references = references
+        return references
+    
+    def extract_all(self, chunk: Chunk) -> Tuple[List[CodeElement], List[Reference]]:
+        """Extract both code elements and references, scanning function signatures once."""
+        function_elements, type_references = self._scan_functions(chunk)
+        elements = function_elements + self._extract_type_definitions(chunk)
+        references = (self._extract_method_calls(chunk)
+                      + self._extract_function_calls(chunk)
+                      + type_references)
+        return elements, references
+    
     def extract_references(self, chunk: Chunk) -> List[Reference]:
         """Extract function calls and references from a chunk."""
         references = []
@@ -65,80 +174,99 @@ class CangjieCodeElementExtractor:
     
     def _extract_function_definitions(self, chunk: Chunk) -> List[CodeElement]:
         """Extract function definitions from chunk content."""
-        elements = []
+        return self._scan_functions(chunk, references=False)[0]
+
+    def _scan_functions(self, chunk: Chunk, elements: bool = True,
+                        references: bool = True) -> Tuple[List[CodeElement], List[Reference]]:
+        """Walk the function signatures of a chunk once.
+
+        Builds the function definition elements and/or the parameter and
+        return type references from the same FUNCTION_DEF matches.
+        """
+        function_elements: List[CodeElement] = []
+        type_references: List[Reference] = []
+        lines = _LineCounter(chunk.content, chunk.start_line)
         
         for match in self.patterns.FUNCTION_DEF.finditer(chunk.content):
-            name = match.group(1)
-            params = match.group(2) if match.group(2) else ""
-            return_type = match.group(3) if match.group(3) else ""
+            # One call for all groups; unmatched params/return type become ""
+            name, params, return_type = match.groups(default="")
             
-            # Build function signature
-            signature = f"func {name}({params})"
-            if return_type:
-                signature += f": {return_type.strip()}"
+            if elements:
+                # Build function signature
+                signature = f"func {name}({params})"
+                if return_type:
+                    signature += f": {return_type.strip()}"
+                
+                # Calculate line number
+                line_number = lines.line_at(match.start())
+                
+                # Models are built positionally in the extraction loops;
+                # keyword dispatch roughly doubles the construction cost
+                function_elements.append(CodeElement(
+                    name, ElementType.FUNCTION, signature, chunk.id, line_number
+                ))
+
+            if not references:
+                continue
             
-            # Calculate line number
-            line_number = chunk.content[:match.start()].count('\n') + chunk.start_line
+            # Extract parameter types
+            if params.strip():
+                param_types = self._parse_parameter_types(params)
+                for param_type in param_types:
+                    if self._is_custom_type(param_type):
+                        # Receiver is the function that uses this type
+                        type_references.append(Reference(
+                            chunk.id, param_type, ReferenceType.TYPE_REFERENCE, name, 0.9
+                        ))
             
-            elements.append(CodeElement(
-                name=name,
-                element_type=ElementType.FUNCTION,
-                signature=signature,
-                source_chunk=chunk.id,
-                line_number=line_number
-            ))
+            # Extract return type
+            if return_type.strip():
+                return_type_cleaned = self._clean_type_name(return_type.strip())
+                if return_type_cleaned and self._is_custom_type(return_type_cleaned):
+                    # Receiver is the function that returns this type
+                    type_references.append(Reference(
+                        chunk.id, return_type_cleaned, ReferenceType.TYPE_REFERENCE, name, 0.9
+                    ))
         
-        return elements
+        return function_elements, type_references
     
     def _extract_type_definitions(self, chunk: Chunk) -> List[CodeElement]:
         """Extract type definitions (class, struct, interface, enum) from chunk."""
-        elements = []
-        
-        # Define patterns and their corresponding element types
-        type_patterns = [
-            (self.patterns.CLASS_DEF, ElementType.CLASS),
-            (self.patterns.STRUCT_DEF, ElementType.STRUCT),
-            (self.patterns.INTERFACE_DEF, ElementType.INTERFACE),
-            (self.patterns.ENUM_DEF, ElementType.ENUM)
-        ]
-        
-        for pattern, element_type in type_patterns:
-            for match in pattern.finditer(chunk.content):
-                name = match.group(1)
-                line_number = chunk.content[:match.start()].count('\n') + chunk.start_line
-                
+        # One scan of the content; elements are grouped by type in the
+        # class, struct, interface, enum order the per-type scans produced
+        by_type: Dict[ElementType, List[CodeElement]] = {element_type: [] for element_type in _TYPE_DEF_KINDS.values()}
+        lines = _LineCounter(chunk.content, chunk.start_line)
+
+        for match in self.patterns.TYPE_DEF.finditer(chunk.content):
+            line_number = lines.line_at(match.start())
+            is_class, class_name, base, kind, name = match.groups()
+
+            if is_class:
+                element_type = ElementType.CLASS
+                name = class_name
                 # For classes, include inheritance info in signature
-                if element_type == ElementType.CLASS and match.lastindex >= 2 and match.group(2):
-                    signature = f"class {name} extends {match.group(2)}"
-                else:
-                    signature = f"{element_type.value} {name}"
-                
-                elements.append(CodeElement(
-                    name=name,
-                    element_type=element_type,
-                    signature=signature,
-                    source_chunk=chunk.id,
-                    line_number=line_number
-                ))
-        
-        return elements
+                signature = f"class {name} extends {base}" if base else f"class {name}"
+            else:
+                element_type = _TYPE_DEF_KINDS[kind]
+                signature = f"{element_type.value} {name}"
+
+            by_type[element_type].append(CodeElement(
+                name, element_type, signature, chunk.id, line_number
+            ))
+
+        return [element for elements in by_type.values() for element in elements]
     
     def _extract_method_calls(self, chunk: Chunk) -> List[Reference]:
         """Extract method calls (obj.method()) from chunk content."""
         references = []
         
         for match in self.patterns.METHOD_CALL.finditer(chunk.content):
-            receiver = match.group(1)
-            method_name = match.group(2)
+            receiver, method_name = match.groups()
             
             # Skip common non-method patterns
             if self._is_likely_method_call(receiver, method_name):
                 references.append(Reference(
-                    source_chunk=chunk.id,
-                    target_element=method_name,
-                    reference_type=ReferenceType.CALLS,
-                    receiver=receiver,
-                    confidence=0.8
+                    chunk.id, method_name, ReferenceType.CALLS, receiver, 0.8
                 ))
         
         return references
@@ -146,17 +274,21 @@ class CangjieCodeElementExtractor:
     def _extract_function_calls(self, chunk: Chunk) -> List[Reference]:
         """Extract function calls (function()) from chunk content."""
         references = []
+        content = chunk.content
+        first_colon = content.find(':')
+        # Only candidates before the first ':' can pass, and a match never
+        # contains one, so only that part is scanned
+        end = first_colon if first_colon >= 0 else len(content)
+        func_name_starts = self._func_name_starts(content, end)
         
-        for match in self.patterns.FUNCTION_CALL.finditer(chunk.content):
+        for match in self.patterns.FUNCTION_CALL.finditer(content, 0, end):
             function_name = match.group(1)
             
             # Filter out common keywords and patterns that aren't function calls
-            if self._is_likely_function_call(function_name, chunk.content, match):
+            if self._is_likely_function_call(function_name, content, match,
+                                             first_colon, func_name_starts):
                 references.append(Reference(
-                    source_chunk=chunk.id,
-                    target_element=function_name,
-                    reference_type=ReferenceType.CALLS,
-                    confidence=0.7
+                    chunk.id, function_name, ReferenceType.CALLS, None, 0.7
                 ))
         
         return references
@@ -164,107 +296,66 @@ class CangjieCodeElementExtractor:
     def _is_likely_method_call(self, receiver: str, method_name: str) -> bool:
         """Check if a pattern is likely a method call."""
         # Skip common false positives
-        false_positives = {
-            'if', 'for', 'while', 'switch', 'catch', 'try'
-        }
-        
-        return (method_name not in false_positives and 
+        return (method_name not in _METHOD_FALSE_POSITIVES and 
                 len(method_name) > 1 and 
                 receiver.isidentifier())
     
-    def _is_likely_function_call(self, function_name: str, content: str, match: re.Match) -> bool:
-        """Check if a pattern is likely a function call."""
+    def _is_likely_function_call(self, function_name: str, content: str, match: re.Match,
+                                 first_colon: Optional[int] = None,
+                                 func_name_starts: Optional[Set[int]] = None) -> bool:
+        """Check if a pattern is likely a function call.
+
+        ``first_colon`` and ``func_name_starts`` are per-chunk lookups computed
+        by the caller, so each check is a constant-time test instead of a
+        scan of the text before the match.
+        """
         # Skip keywords and common false positives
-        keywords = {
-            'if', 'for', 'while', 'switch', 'case', 'catch', 'try',
-            'func', 'class', 'struct', 'interface', 'enum', 'var', 'let'
-        }
-        
-        if function_name in keywords or len(function_name) <= 1:
+        if function_name in _CALL_KEYWORDS or len(function_name) <= 1:
             return False
         
-        # Check if preceded by 'func' keyword (function definition)
-        before_match = content[:match.start()]
-        if re.search(r'\bfunc\s*$', before_match):
+        start = match.start()
+
+        # Check if it's a type annotation (after :), i.e. any ':' precedes the match
+        if first_colon is None:
+            first_colon = content.find(':')
+        if 0 <= first_colon < start:
             return False
-        
-        # Check if it's a type annotation (after :)
-        if re.search(r':\s*[^:]*$', before_match):
+
+        # Check if preceded by 'func' keyword (function definition)
+        if func_name_starts is None:
+            func_name_starts = self._func_name_starts(content, len(content))
+        if start in func_name_starts:
             return False
         
         return True
     
+    def _func_name_starts(self, content: str, end: int) -> Set[int]:
+        """Offsets in content[:end] right after a 'func' keyword and its trailing whitespace."""
+        starts = set()
+        for match in self.patterns.FUNC_KEYWORD.finditer(content, 0, end):
+            before = match.start() - 1
+            # Word boundary before 'func', checked here since a literal-prefixed pattern scans faster
+            if before < 0 or not (content[before].isalnum() or content[before] == '_'):
+                starts.add(match.end())
+        return starts
+    
     def _extract_type_references(self, chunk: Chunk) -> List[Reference]:
         """Extract type references from function parameters and return types."""
-        references = []
-        
-        # Pattern to match function signatures with parameters and return types
-        # func name(param1: Type1, param2: Type2): ReturnType
-        func_sig_pattern = re.compile(
-            r'func\s+(\w+)\s*\(([^)]*)\)(?:\s*:\s*([^{\n]+))?',
-            re.MULTILINE
-        )
-        
-        for match in func_sig_pattern.finditer(chunk.content):
-            func_name = match.group(1)
-            params = match.group(2) if match.group(2) else ""
-            return_type = match.group(3) if match.group(3) else ""
-            
-            # Extract parameter types
-            if params.strip():
-                param_types = self._parse_parameter_types(params)
-                for param_type in param_types:
-                    if self._is_custom_type(param_type):
-                        references.append(Reference(
-                            source_chunk=chunk.id,
-                            target_element=param_type,
-                            reference_type=ReferenceType.TYPE_REFERENCE,
-                            receiver=func_name,  # Function that uses this type
-                            confidence=0.9
-                        ))
-            
-            # Extract return type
-            if return_type.strip():
-                return_type_cleaned = self._clean_type_name(return_type.strip())
-                if return_type_cleaned and self._is_custom_type(return_type_cleaned):
-                    references.append(Reference(
-                        source_chunk=chunk.id,
-                        target_element=return_type_cleaned,
-                        reference_type=ReferenceType.TYPE_REFERENCE,
-                        receiver=func_name,  # Function that returns this type
-                        confidence=0.9
-                    ))
-        
-        return references
+        return self._scan_functions(chunk, elements=False)[1]
     
     def _parse_parameter_types(self, params_str: str) -> List[str]:
         """Parse parameter types from function parameter string."""
         types = []
         
-        # Split by comma but be careful of nested generics like Array<String>
-        param_parts = []
-        current_param = ""
-        bracket_count = 0
-        
-        for char in params_str:
-            if char == '<':
-                bracket_count += 1
-            elif char == '>':
-                bracket_count -= 1
-            elif char == ',' and bracket_count == 0:
-                param_parts.append(current_param.strip())
-                current_param = ""
-                continue
-            current_param += char
-        
-        if current_param.strip():
-            param_parts.append(current_param.strip())
+        # Without generics a plain C-level split is enough
+        if '<' not in params_str and '>' not in params_str:
+            param_parts = params_str.split(',')
+        else:
+            param_parts = self._split_generic_params(params_str)
         
         # Extract type from each parameter (format: name: Type or name!: Type = default)
-        type_pattern = re.compile(r'\w+!?\s*:\s*([^=]+)(?:\s*=.*)?')
-        
         for param in param_parts:
-            match = type_pattern.match(param.strip())
+            match = self.patterns.PARAMETER_TYPE.match(param.strip())
             if match:
                 type_str = match.group(1).strip()
                 base_type = self._extract_base_type(type_str)
@@ -273,10 +364,30 @@ class CangjieCodeElementExtractor:
         
         return types
     
+    def _split_generic_params(self, params_str: str) -> List[str]:
+        """Split parameters by comma, keeping nested generics like Array<String> intact."""
+        # Only delimiter characters are visited and parts are sliced, not built up
+        param_parts = []
+        part_start = 0
+        bracket_count = 0
+        
+        for delimiter in self.patterns.PARAMETER_DELIMITER.finditer(params_str):
+            char = delimiter.group()
+            if char == '<':
+                bracket_count += 1
+            elif char == '>':
+                bracket_count -= 1
+            elif bracket_count == 0:
+                param_parts.append(params_str[part_start:delimiter.start()])
+                part_start = delimiter.end()
+        
+        param_parts.append(params_str[part_start:])
+        return param_parts
+    
     def _extract_base_type(self, type_str: str) -> str:
         """Extract base type name from complex type like Array<String> -> Array."""
         # Remove generic parameters for now, keep base type
-        base_match = re.match(r'(\w+)', type_str.strip())
+        base_match = self.patterns.BASE_TYPE.match(type_str.strip())
         if base_match:
             return base_match.group(1)
         return ""
@@ -286,35 +397,47 @@ class CangjieCodeElementExtractor:
         # Remove leading/trailing whitespace and extract main type
         cleaned = type_str.strip()
         # Handle generic types like Array<String> -> Array  
-        base_match = re.match(r'(\w+)', cleaned)
+        base_match = self.patterns.BASE_TYPE.match(cleaned)
         if base_match:
             return base_match.group(1)
         return ""
     
     def _is_custom_type(self, type_name: str) -> bool:
         """Check if a type is likely a custom/user-defined type."""
-        # Filter out primitive types
-        primitive_types = {
-            'Int8', 'Int16', 'Int32', 'Int64', 'IntNative',
-            'UInt8', 'UInt16', 'UInt32', 'UInt64', 'UIntNative', 
-            'Float16', 'Float32', 'Float64',
-            'String', 'Rune', 'Bool', 'Unit', 'Byte',
-            'Array', 'ArrayList', 'HashMap', 'HashSet',
-            'Option', 'Result', 'Iterator'
-        }
-        
-        # Consider it custom if:
-        # 1. Not a primitive type
-        # 2. Starts with uppercase (Cangjie naming convention)
-        # 3. Length > 1
-        return (type_name not in primitive_types and 
-                len(type_name) > 1 and 
+        if type_name in _PRIMITIVE_TYPES:
+            return False
+        # Consider it custom if it starts with uppercase (Cangjie naming
+        # convention), is longer than one character and is purely alphabetic
+        if type_name.isascii():
+            return self.patterns.CUSTOM_TYPE.match(type_name) is not None
+        return (len(type_name) > 1 and
                 type_name[0].isupper() and
-                type_name.isalpha())  # Only alphabetic characters
+                type_name.isalpha())
     
     def get_code_element_names(self, chunk: Chunk) -> List[str]:
         """Get a list of all unique code element names in a chunk."""
-        elements = self.extract_elements(chunk)
-        # Use set to remove duplicates, then convert back to list
-        unique_names = list(set(element.name for element in elements))
-        return sorted(unique_names)  # Sort for consistent output
\ No newline at end of file
+        elements = self.extract_elements_cached(chunk)
+        # Use set to remove duplicates; names are interned because the same
+        # element names recur across many chunks
+        unique_names = {sys.intern(element.name) for element in elements}
+        return sorted(unique_names)  # Sort for consistent output
+
+
+# Extractor used by worker processes, set once per process by _init_extract_worker
+_worker_extractor: Optional[CangjieCodeElementExtractor] = None
+
+
+def _init_extract_worker(extractor: CangjieCodeElementExtractor) -> None:
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _extract_all_worker(task: Tuple[str, str, int]) -> Tuple[List[CodeElement], List[Reference]]:
+    """Extract a chunk's elements and references in a worker process.
+
+    Only the fields the extractor reads are sent, as pickling whole chunks
+    would cost about as much as the extraction itself.
+    """
+    chunk_id, content, start_line = task
+    chunk = Chunk(chunk_id, content, '', start_line, start_line, '', ChunkMetadata([]))
+    return _worker_extractor.extract_all(chunk)
@@ -1,53 +1,560 @@
 """
 Graph construction and traversal system for connecting related chunks.
 """
+import heapq
 import networkx as nx
+import numpy as np
+import os
 import pickle
 import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set, Tuple, Optional
-from collections import defaultdict
+from typing import Callable, List, Dict, Set, Tuple, Optional
+from collections import OrderedDict, defaultdict
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+try:
+    import orjson
+    _json_dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    _json_dumps = lambda obj: json.dumps(obj, ensure_ascii=False).encode('utf-8')
 
 from .models import (
-    Chunk, CodeElement, Reference, GraphEdge, ChunkNode, 
+    Chunk, ChunkMetadata, CodeElement, Reference, GraphEdge, ChunkNode, 
     ReferenceType, ElementType
 )
-from .extractor import CangjieCodeElementExtractor
+from .extractor import CangjieCodeElementExtractor, _init_extract_worker, _extract_all_worker
+
+
+# Base edge weight per reference type; other types get 0.5. Type references
+# weigh high as they indicate strong structural relationships
+_REFERENCE_WEIGHTS = {
+    ReferenceType.CALLS: 0.9,
+    ReferenceType.TYPE_REFERENCE: 0.8,
+    ReferenceType.MENTIONS: 0.6,
+}
+
+
+class CSRGraph:
+    """Compressed sparse row adjacency for the directed chunk graph.
+
+    Out-edges of node ``i`` are ``indices[indptr[i]:indptr[i + 1]]`` with the
+    matching ``weight_codes``; in-edges are kept the same way in the ``rev_*``
+    arrays so traversal can follow both directions with contiguous slices.
+
+    Edge weights take only a few distinct values, so they are stored as small
+    integer codes into the sorted ``weight_values`` table. Codes order like
+    the weights they stand for, which keeps weight thresholds exact.
+    """
+
+    ARRAYS = ('indptr', 'indices', 'weight_codes', 'edge_elements', 'edge_types',
+              'rev_indptr', 'rev_indices', 'rev_weight_codes', 'weight_values')
+    REFERENCE_TYPES = list(ReferenceType)
+    # Frontiers touching more than 1 / BOTTOM_UP_RATIO of the edges scan all edges
+    BOTTOM_UP_RATIO = 4
+    # Traversal results kept per graph; retrieval asks for the same seeds repeatedly
+    NEIGHBORHOOD_CACHE_SIZE = 4096
+
+    def __init__(self, node_ids: List[str], element_names: List[str], **arrays: np.ndarray):
+        self.node_ids = node_ids
+        self.node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.element_names = element_names  # edge element codes -> names
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self._edge_sources: Optional[np.ndarray] = None
+        self._num_weak_components: Optional[int] = None
+        self._pagerank_operator: Optional[Tuple[Callable, np.ndarray]] = None
+        self._neighborhoods: OrderedDict = OrderedDict()  # (start, distance, weight) -> ids
+        self._neighborhoods_lock = threading.Lock()
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> 'CSRGraph':
+        """Build CSR arrays from a NetworkX graph, keeping node and edge order."""
+        node_ids = list(graph.nodes())
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        element_codes: Dict[str, int] = {}
+        type_codes = {ref_type.value: i for i, ref_type in enumerate(cls.REFERENCE_TYPES)}
+
+        num_edges = graph.number_of_edges()
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        indices = np.empty(num_edges, dtype=np.int32)
+        weights = np.empty(num_edges, dtype=np.float64)
+        edge_elements = np.empty(num_edges, dtype=np.int32)
+        edge_types = np.empty(num_edges, dtype=np.uint8)
+
+        pos = 0
+        for i, (node, successors) in enumerate(graph.adjacency()):
+            for neighbor, data in successors.items():
+                indices[pos] = node_index[neighbor]
+                weights[pos] = data.get('weight', 0)
+                edge_elements[pos] = element_codes.setdefault(data.get('element', ''), len(element_codes))
+                edge_types[pos] = type_codes.get(data.get('reference_type'), 0)
+                pos += 1
+            indptr[i + 1] = pos
+
+        # Reverse adjacency: stable sort of edges by target node
+        sources = np.repeat(np.arange(len(node_ids), dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind='stable')
+        rev_indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=len(node_ids)), out=rev_indptr[1:])
+
+        weight_values, weight_codes = cls._encode_weights(weights)
+        return cls(
+            node_ids, list(element_codes),
+            indptr=indptr, indices=indices, weight_codes=weight_codes,
+            edge_elements=edge_elements, edge_types=edge_types,
+            rev_indptr=rev_indptr, rev_indices=sources[order],
+            rev_weight_codes=weight_codes[order], weight_values=weight_values
+        )
+
+    @staticmethod
+    def _encode_weights(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted distinct weights and each edge's code into them (uint8 when they fit)."""
+        weight_values, weight_codes = np.unique(weights, return_inverse=True)
+        code_type = np.min_scalar_type(max(len(weight_values) - 1, 0))
+        return weight_values, weight_codes.astype(code_type)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Float weight of every edge, aligned with ``indices``."""
+        return self.weight_values[self.weight_codes]
+
+    def weight_floor(self, min_weight: float) -> int:
+        """Smallest weight code whose weight is >= min_weight."""
+        return int(np.searchsorted(self.weight_values, min_weight, side='left'))
+
+    def prefault(self) -> None:
+        """Touch every array so memory-mapped pages are resident before the first query."""
+        for name in self.ARRAYS:
+            np.asarray(getattr(self, name)).sum()
+
+    @property
+    def edge_sources(self) -> np.ndarray:
+        """Source node of every edge, aligned with ``indices`` (computed once)."""
+        if self._edge_sources is None:
+            self._edge_sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32),
+                                           np.diff(self.indptr))
+        return self._edge_sources
+
+    def expand(self, frontier: np.ndarray, min_weight: float) -> np.ndarray:
+        """Nodes linked to any frontier node in either direction with weight >= min_weight.
+
+        Small frontiers gather their own adjacency slices; once they touch a
+        large share of the edges, one masked scan over the whole edge list
+        is cheaper. Nodes may be returned more than once.
+        """
+        degrees = (self.indptr[frontier + 1] - self.indptr[frontier]
+                   + self.rev_indptr[frontier + 1] - self.rev_indptr[frontier])
+        if int(degrees.sum()) * self.BOTTOM_UP_RATIO > self.num_edges:
+            in_frontier = np.zeros(self.num_nodes, dtype=bool)
+            in_frontier[frontier] = True
+            sources = self.edge_sources
+            heavy = self.weight_codes >= self.weight_floor(min_weight)
+            return np.concatenate((self.indices[in_frontier[sources] & heavy],
+                                   sources[in_frontier[self.indices] & heavy]))
+        floor = self.weight_floor(min_weight)
+        return np.concatenate((
+            self._gather(self.indptr, self.indices, self.weight_codes, frontier, floor),
+            self._gather(self.rev_indptr, self.rev_indices, self.rev_weight_codes, frontier, floor)
+        ))
+
+    @staticmethod
+    def _slice_positions(indptr: np.ndarray, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Edge positions of the frontier nodes' adjacency slices, back to back.
+
+        Also returns the slice lengths, so callers can repeat per-node values
+        along the positions.
+        """
+        starts = indptr[frontier]
+        lengths = indptr[frontier + 1] - starts
+        # Each slice's start repeated over its length, plus the running
+        # position inside the output
+        positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions += np.arange(len(positions))
+        return positions, lengths
+
+    @classmethod
+    def _gather(cls, indptr: np.ndarray, indices: np.ndarray, weight_codes: np.ndarray,
+                frontier: np.ndarray, floor: int) -> np.ndarray:
+        """Concatenated adjacency slices of the frontier nodes, filtered by weight code."""
+        positions, _ = cls._slice_positions(indptr, frontier)
+        return indices[positions][weight_codes[positions] >= floor]
+
+    def shortest_path(self, source: int, target: int) -> List[int]:
+        """Fewest-hop directed path from source to target, or [] if there is none.
+
+        Bidirectional BFS: successors are expanded from the source and
+        predecessors from the target, a whole level at a time, always growing
+        the side whose frontier has fewer edges to scan.
+        """
+        if source == target:
+            return [source]
+        
+        # Per side: whether a node was reached and the neighbour one hop
+        # closer to that side's end (valid only where seen)
+        seen = (np.zeros(self.num_nodes, dtype=bool), np.zeros(self.num_nodes, dtype=bool))
+        parents = (np.empty(self.num_nodes, dtype=np.int64), np.empty(self.num_nodes, dtype=np.int64))
+        adjacency = ((self.indptr, self.indices), (self.rev_indptr, self.rev_indices))
+        frontiers = [np.array([source], dtype=np.int64), np.array([target], dtype=np.int64)]
+        seen[0][source] = seen[1][target] = True
+        parents[0][source] = parents[1][target] = -1
+        costs = [int(self.indptr[source + 1] - self.indptr[source]),
+                 int(self.rev_indptr[target + 1] - self.rev_indptr[target])]
+        # Scratch slots for dropping repeated nodes within a level
+        slots = np.empty(self.num_nodes, dtype=np.int64)
+        
+        while costs[0] and costs[1]:
+            side = 0 if costs[0] <= costs[1] else 1
+            indptr, indices = adjacency[side]
+            
+            positions, lengths = self._slice_positions(indptr, frontiers[side])
+            owners = np.repeat(frontiers[side], lengths)
+            nodes = indices[positions]
+            unseen = ~seen[side][nodes]
+            nodes = nodes[unseen]
+            owners = owners[unseen]
+            # Keep the last occurrence of each node
+            order = np.arange(len(nodes))
+            slots[nodes] = order
+            last = slots[nodes] == order
+            nodes = nodes[last]
+            parents[side][nodes] = owners[last]
+            seen[side][nodes] = True
+            
+            # Any node of the first level to touch the other side's search
+            # closes a shortest path
+            meets = seen[1 - side][nodes]
+            if meets.any():
+                return self._join_path(int(nodes[meets.argmax()]), *parents)
+            frontiers[side] = nodes
+            costs[side] = int((indptr[nodes + 1] - indptr[nodes]).sum())
+        
+        return []
+
+    @staticmethod
+    def _join_path(middle: int, forward_parent: np.ndarray, backward_parent: np.ndarray) -> List[int]:
+        """Walk the parent links from the meeting node back to both ends."""
+        path = []
+        node = middle
+        while node >= 0:
+            path.append(node)
+            node = int(forward_parent[node])
+        path.reverse()
+        node = int(backward_parent[middle])
+        while node >= 0:
+            path.append(node)
+            node = int(backward_parent[node])
+        return path
+
+    def neighborhood(self, start: int, max_distance: int, min_weight: float) -> Tuple[str, ...]:
+        """Ids of the nodes within max_distance hops of ``start``, in node order.
+
+        Edges are followed in both directions, a level at a time. Results are
+        cached (LRU, safe to share between threads); the arrays never change,
+        as the graph builds new ones after every modification.
+        """
+        key = (start, max_distance, min_weight)
+        with self._neighborhoods_lock:
+            cached = self._neighborhoods.get(key)
+            if cached is not None:
+                self._neighborhoods.move_to_end(key)
+                return cached
+        
+        reached = self.reach(np.array([start], dtype=np.int64), max_distance, min_weight)
+        node_ids = self.node_ids
+        result = tuple(node_ids[node] for node in np.flatnonzero(reached).tolist())
+        with self._neighborhoods_lock:
+            self._neighborhoods[key] = result
+            if len(self._neighborhoods) > self.NEIGHBORHOOD_CACHE_SIZE:
+                self._neighborhoods.popitem(last=False)
+        return result
+
+    def reach(self, starts: np.ndarray, max_distance: int, min_weight: float) -> np.ndarray:
+        """Mask of the nodes 1..max_distance hops from any of ``starts``.
+
+        One breadth-first search from all starts together, so nodes shared
+        by several starts are expanded once; ``expand`` scans bottom-up when
+        a level's frontier is large. Starts are set only if reached again.
+        """
+        reached = np.zeros(self.num_nodes, dtype=bool)
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[starts] = True
+        frontier = starts
+        
+        for distance in range(1, max_distance + 1):
+            next_level = self.expand(frontier, min_weight)
+            reached[next_level] = True
+            # Nodes seen at an earlier level were already expanded from there
+            frontier = np.unique(next_level[~visited[next_level]])
+            visited[frontier] = True
+            
+            if not frontier.size:
+                break
+        
+        return reached
+
+    def neighbors(self, node: int, min_weight: float) -> np.ndarray:
+        """Indices of nodes linked to ``node`` in either direction with weight >= min_weight."""
+        floor = self.weight_floor(min_weight)
+        start, end = self.indptr[node], self.indptr[node + 1]
+        out = self.indices[start:end][self.weight_codes[start:end] >= floor]
+        start, end = self.rev_indptr[node], self.rev_indptr[node + 1]
+        inc = self.rev_indices[start:end][self.rev_weight_codes[start:end] >= floor]
+        return np.concatenate((out, inc))
+
+    def _build_pagerank_operator(self) -> Tuple[Callable, np.ndarray]:
+        """Return (spread, dangling node indices) for the PageRank power iteration.
+
+        ``spread(rank)`` pushes each node's rank along its normalized out-weights.
+        """
+        n = self.num_nodes
+        sources = self.edge_sources
+        targets = np.asarray(self.indices)
+
+        out_weight = np.bincount(sources, weights=self.weights, minlength=n)
+        dangling = out_weight == 0
+        out_weight[dangling] = 1.0
+
+        if sparse is not None:
+            # Transposed transition matrix: its rows are the in-edges, which the
+            # reverse arrays already hold in CSR order, so no sort is needed.
+            # Each iteration is one sparse mat-vec
+            rev_indices = np.asarray(self.rev_indices)
+            rev_share = self.weight_values[self.rev_weight_codes] / out_weight[rev_indices]
+            transition = sparse.csr_matrix((rev_share, rev_indices, np.asarray(self.rev_indptr)),
+                                           shape=(n, n))
+            spread = transition.dot
+        else:
+            edge_share = self.weights / out_weight[sources]
+
+            def spread(rank: np.ndarray) -> np.ndarray:
+                return np.bincount(targets, weights=rank[sources] * edge_share, minlength=n)
+
+        return spread, np.flatnonzero(dangling)
+
+    def pagerank(self, alpha: float = 0.85, max_iter: int = 100, tol: float = 1.0e-6) -> np.ndarray:
+        """Weighted PageRank by power iteration over the CSR arrays.
+
+        Uses a scipy sparse matrix when scipy is installed and plain numpy
+        otherwise.
+
+        Follows ``nx.pagerank``: out-weights are normalized per node, dangling
+        nodes spread their rank uniformly, and iteration stops once the L1
+        change drops below ``num_nodes * tol``. Raises
+        ``nx.PowerIterationFailedToConverge`` otherwise. The transition operator
+        is built once per CSR and reused by later calls.
+        """
+        if self._pagerank_operator is None:
+            self._pagerank_operator = self._build_pagerank_operator()
+        spread, dangling_nodes = self._pagerank_operator
+
+        n = self.num_nodes
+        change = np.empty(n)
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            previous = x
+            x = spread(previous)
+            x *= alpha
+            x += (alpha * previous[dangling_nodes].sum() + (1 - alpha)) / n
+            np.subtract(x, previous, out=change)
+            if np.abs(change, out=change).sum() < n * tol:
+                return x
+        raise nx.PowerIterationFailedToConverge(max_iter)
+
+    def degree_centrality(self) -> np.ndarray:
+        """In- plus out-degree over n - 1, as ``nx.degree_centrality`` computes it."""
+        n = self.num_nodes
+        if n <= 1:
+            return np.ones(n)
+        degrees = np.diff(self.indptr) + np.diff(self.rev_indptr)
+        return degrees / (n - 1)
+
+    def num_weak_components(self) -> int:
+        """Count weakly connected components (computed once)."""
+        if self._num_weak_components is None:
+            self._num_weak_components = self._count_weak_components()
+        return self._num_weak_components
+
+    def _count_weak_components(self) -> int:
+        """Count weakly connected components by min-label propagation over the edges."""
+        labels = np.arange(self.num_nodes, dtype=np.int64)
+        sources = self.edge_sources
+        targets = self.indices
+        while True:
+            edge_labels = np.minimum(labels[sources], labels[targets])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, sources, edge_labels)
+            np.minimum.at(new_labels, targets, edge_labels)
+            new_labels = new_labels[new_labels]  # Pointer jumping shortens label chains
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+        return int(np.count_nonzero(labels == np.arange(self.num_nodes)))
+
+    def to_networkx(self, node_attributes: Dict[str, Dict]) -> nx.DiGraph:
+        """Materialize a NetworkX graph (used for statistics and path queries)."""
+        graph = nx.DiGraph()
+        for node_id in self.node_ids:
+            graph.add_node(node_id, **node_attributes.get(node_id, {}))
+
+        node_ids = self.node_ids
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        edge_elements = self.edge_elements.tolist()
+        edge_types = self.edge_types.tolist()
+        for i, source in enumerate(node_ids):
+            for pos in range(indptr[i], indptr[i + 1]):
+                graph.add_edge(source, node_ids[indices[pos]],
+                               element=self.element_names[edge_elements[pos]],
+                               weight=weights[pos],
+                               reference_type=self.REFERENCE_TYPES[edge_types[pos]].value)
+        return graph
+
+    def save(self, directory: Path) -> None:
+        """Write each array as .npy plus a JSON table of node ids and element names."""
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        with open(directory / "node_ids.json", 'w', encoding='utf-8') as f:
+            json.dump({'node_ids': self.node_ids, 'element_names': self.element_names},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Path) -> 'CSRGraph':
+        """Load arrays memory-mapped so pages are read on demand."""
+        with open(directory / "node_ids.json", 'r', encoding='utf-8') as f:
+            tables = json.load(f)
+        if not (directory / "weight_codes.npy").exists():
+            return cls._load_float_weights(directory, tables)
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in cls.ARRAYS}
+        return cls(tables['node_ids'], tables['element_names'], **arrays)
+
+    @classmethod
+    def _load_float_weights(cls, directory: Path, tables: Dict) -> 'CSRGraph':
+        """Load arrays saved before weights were encoded, encoding them now."""
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r')
+                  for name in cls.ARRAYS if name not in ('weight_codes', 'rev_weight_codes', 'weight_values')}
+        weight_values, weight_codes = cls._encode_weights(np.load(directory / "weights.npy"))
+        rev_weights = np.load(directory / "rev_weights.npy")
+        rev_weight_codes = np.searchsorted(weight_values, rev_weights).astype(weight_codes.dtype)
+        return cls(tables['node_ids'], tables['element_names'], weight_codes=weight_codes,
+                   rev_weight_codes=rev_weight_codes, weight_values=weight_values, **arrays)
 
 
 class CodeGraph:
     """Graph structure for representing relationships between code chunks."""
     
+    # Start line of chunks loaded from graphs saved without one; too far from
+    # any real line for the proximity boost
+    UNKNOWN_START_LINE = -(1 << 40)
+    
     def __init__(self):
-        self.graph = nx.DiGraph()  # Directed graph for code relationships
+        self._graph: Optional[nx.DiGraph] = nx.DiGraph()  # Directed graph for code relationships
+        self.csr: Optional[CSRGraph] = None  # Traversal arrays, rebuilt lazily after changes
+        self.node_attributes: Dict[str, Dict] = {}  # chunk_id -> node attributes
         self.element_index: Dict[str, List[str]] = defaultdict(list)  # element_name -> chunk_ids
         self.chunk_elements: Dict[str, List[str]] = {}  # chunk_id -> element_names
         self.chunk_metadata: Dict[str, ChunkNode] = {}  # chunk_id -> ChunkNode
+        # Chunk locations as int columns for computing edge weights in bulk
+        self.file_ids: Dict[str, int] = {}  # file_path -> interned file id
+        self.chunk_rows: Dict[str, int] = {}  # chunk_id -> row in the columns below
+        self.chunk_files: List[int] = []  # row -> file id
+        self.chunk_lines: List[int] = []  # row -> start line
+    
+    @property
+    def graph(self) -> nx.DiGraph:
+        """NetworkX view of the graph, materialized from CSR arrays on first use after loading."""
+        if self._graph is None:
+            self._graph = self.csr.to_networkx(self.node_attributes)
+        return self._graph
+    
+    @graph.setter
+    def graph(self, graph: nx.DiGraph) -> None:
+        self._graph = graph
+        self.csr = None
+    
+    def _get_csr(self) -> CSRGraph:
+        """Return CSR arrays for traversal, building them if the graph changed."""
+        if self.csr is None:
+            self.csr = CSRGraph.from_networkx(self._graph)
+        return self.csr
+    
+    def invalidate_csr(self) -> None:
+        """Drop cached CSR arrays after the NetworkX graph was modified directly."""
+        self.graph  # Make sure the NetworkX graph exists before dropping the arrays
+        self.csr = None
     
     def add_chunk(self, chunk: Chunk, elements: List[CodeElement]) -> None:
         """Add a chunk and its code elements to the graph."""
+        self.graph.add_node(chunk.id, **self._index_chunk(chunk, elements))
+        self.csr = None
+    
+    def add_chunks(self, chunks: List[Chunk], element_lists: List[List[CodeElement]]) -> None:
+        """Add many chunks and their code elements, inserting the nodes in one call."""
+        self.graph.add_nodes_from(
+            (chunk.id, self._index_chunk(chunk, elements))
+            for chunk, elements in zip(chunks, element_lists)
+        )
+        self.csr = None
+    
+    def _index_chunk(self, chunk: Chunk, elements: List[CodeElement]) -> Dict:
+        """Record a chunk's metadata and elements; returns its node attributes."""
         # Create node for the chunk
         element_names = [elem.name for elem in elements]
         
         chunk_node = ChunkNode(
             chunk_id=chunk.id,
-            code_elements=element_names,
             centrality_score=0.0
         )
         
         self.chunk_metadata[chunk.id] = chunk_node
-        self.chunk_elements[chunk.id] = element_names
+        self.chunk_elements[chunk.id] = element_names  # The one copy of the names
         
         # Add node to graph
-        self.graph.add_node(chunk.id, **{
+        attributes = {
             'chunk_type': chunk.chunk_type,
-            'file_path': chunk.file_path,
-            'elements': element_names
-        })
+            'file_path': chunk.file_path
+        }
+        self.node_attributes[chunk.id] = attributes
+        
+        # Record where the chunk is, interning its file path
+        file_id = self.file_ids.setdefault(chunk.file_path, len(self.file_ids))
+        row = self.chunk_rows.setdefault(chunk.id, len(self.chunk_rows))
+        if row == len(self.chunk_files):
+            self.chunk_files.append(file_id)
+            self.chunk_lines.append(chunk.start_line)
+        else:
+            self.chunk_files[row] = file_id
+            self.chunk_lines[row] = chunk.start_line
         
-        # Update element index
-        for element in elements:
-            self.element_index[element.name].append(chunk.id)
+        # Update element index; a chunk is listed once per element even when
+        # it defines the name more than once (overloads)
+        for element_name in dict.fromkeys(element_names):
+            self.element_index[element_name].append(chunk.id)
+        
+        return attributes
+    
+    def _restore_chunk_rows(self, start_lines: Dict[str, int]) -> None:
+        """Rebuild the chunk location columns of a loaded graph from its node attributes."""
+        for chunk_id, attributes in self.node_attributes.items():
+            file_id = self.file_ids.setdefault(attributes.get('file_path'), len(self.file_ids))
+            self.chunk_rows[chunk_id] = len(self.chunk_files)
+            self.chunk_files.append(file_id)
+            self.chunk_lines.append(start_lines.get(chunk_id, self.UNKNOWN_START_LINE))
     
     def add_reference_edge(self, source_chunk: str, target_chunk: str, 
                           element: str, weight: float, 
@@ -62,47 +569,64 @@ class CodeGraph:
             'weight': weight,
             'reference_type': reference_type.value
         })
+        self.csr = None
+    
+    def add_reference_edges(self, edges: List[Tuple[str, str, str, float, ReferenceType]]) -> None:
+        """Add (source, target, element, weight, reference_type) edges in one call."""
+        self.graph.add_edges_from(
+            (source_chunk, target_chunk, {
+                'element': element,
+                'weight': weight,
+                'reference_type': reference_type.value
+            })
+            for source_chunk, target_chunk, element, weight, reference_type in edges
+            if source_chunk != target_chunk  # Skip self-references
+        )
+        self.csr = None
     
     def build_references(self, chunks: List[Chunk], 
                         extractor: CangjieCodeElementExtractor) -> None:
         """Build reference edges between chunks based on code elements."""
-        chunk_dict = {chunk.id: chunk for chunk in chunks}
-        total_references = 0
-        edges_created = 0
+        chunk_rows = self.chunk_rows
+        type_codes = {ref_type: i for i, ref_type in enumerate(CSRGraph.REFERENCE_TYPES)}
+        # Rows of the chunks defining each element, converted on first use
+        element_targets: Dict[str, np.ndarray] = {}
+        # One entry per reference, flattened across all source chunks
+        ref_sources: List[int] = []
+        ref_elements: List[str] = []
+        ref_types: List[int] = []
+        ref_confidences: List[float] = []
+        target_lists: List[np.ndarray] = []
         
         for i, chunk in enumerate(chunks, 1):
-            if i % 50 == 0 or i == len(chunks):
-                print(f"  📊 Progress: {i}/{len(chunks)} chunks processed, {edges_created} edges created")
-            
-            references = extractor.extract_references(chunk)
-            total_references += len(references)
-            
+            references = extractor.extract_references_cached(chunk)
+            source = chunk_rows[chunk.id]
             for ref in references:
                 # Find chunks that define the target element
-                target_chunks = self.element_index.get(ref.target_element, [])
-                
-                for target_chunk_id in target_chunks:
-                    if target_chunk_id != chunk.id:  # Don't connect to self
-                        weight = self._calculate_edge_weight(
-                            chunk_dict[chunk.id], 
-                            chunk_dict[target_chunk_id],
-                            ref
-                        )
-                        
-                        self.add_reference_edge(
-                            chunk.id, 
-                            target_chunk_id, 
-                            ref.target_element,
-                            weight,
-                            ref.reference_type
-                        )
-                        edges_created += 1
+                targets = element_targets.get(ref.target_element)
+                if targets is None:
+                    targets = np.array([chunk_rows[chunk_id] for chunk_id in
+                                        self.element_index.get(ref.target_element, [])],
+                                       dtype=np.int64)
+                    element_targets[ref.target_element] = targets
+                ref_sources.append(source)
+                ref_elements.append(ref.target_element)
+                ref_types.append(type_codes[ref.reference_type])
+                ref_confidences.append(ref.confidence)
+                target_lists.append(targets)
+            
+            if i % 50 == 0 or i == len(chunks):
+                print(f"  📊 Progress: {i}/{len(chunks)} chunks processed, {len(ref_sources)} references found")
+        
+        edges_created = self._add_reference_edges(
+            ref_sources, ref_elements, ref_types, ref_confidences, target_lists
+        ) if ref_sources else 0
         
         # Count different types of references
-        call_refs = sum(1 for chunk in chunks for ref in extractor.extract_references(chunk) 
-                       if ref.reference_type.value == "calls")
-        type_refs = sum(1 for chunk in chunks for ref in extractor.extract_references(chunk) 
-                       if ref.reference_type.value == "type_reference")
+        total_references = len(ref_types)
+        reference_counts = np.bincount(ref_types, minlength=len(type_codes))
+        call_refs = int(reference_counts[type_codes[ReferenceType.CALLS]])
+        type_refs = int(reference_counts[type_codes[ReferenceType.TYPE_REFERENCE]])
         mention_refs = total_references - call_refs - type_refs
         
         print(f"\n  ✅ Reference Analysis Complete:")
@@ -113,66 +637,91 @@ class CodeGraph:
         print(f"     🔗 Graph edges created: {edges_created}")
         print()
     
-    def _calculate_edge_weight(self, source_chunk: Chunk, target_chunk: Chunk, 
-                              reference: Reference) -> float:
-        """Calculate edge weight based on relationship strength."""
-        base_weight = 0.5
+    def _add_reference_edges(self, ref_sources: List[int], ref_elements: List[str],
+                             ref_types: List[int], ref_confidences: List[float],
+                             target_lists: List[np.ndarray]) -> int:
+        """Add the edges for a batch of references; returns the edges written.
+
+        Reference ``k`` comes from chunk row ``ref_sources[k]`` and
+        ``target_lists[k]`` holds the rows of the chunks defining its element.
+        Every candidate edge is weighed and de-duplicated in one pass.
+        """
+        targets = np.concatenate(target_lists)
+        reference_ids = np.repeat(np.arange(len(target_lists)),
+                                  [len(targets) for targets in target_lists])
+        sources = np.array(ref_sources, dtype=np.int64)[reference_ids]
+        # Don't connect to self
+        keep = targets != sources
+        targets = targets[keep]
+        sources = sources[keep]
+        reference_ids = reference_ids[keep]
+        if not targets.size:
+            return 0
+        
+        types = np.array(ref_types, dtype=np.int64)[reference_ids]
+        confidences = np.array(ref_confidences)[reference_ids]
+        weights = self._edge_weights(sources, targets, types, confidences)
+        
+        # Writing an existing edge again keeps its position in the adjacency but
+        # replaces its attributes, so each (source, target) pair is added where
+        # it first appears with the attributes of its last write
+        pairs = sources * len(self.chunk_rows) + targets
+        _, first = np.unique(pairs, return_index=True)
+        _, last_from_end = np.unique(pairs[::-1], return_index=True)
+        last = len(pairs) - 1 - last_from_end
+        order = np.argsort(first, kind='stable')
         
+        chunk_ids = list(self.chunk_rows)
+        type_values = [ref_type.value for ref_type in CSRGraph.REFERENCE_TYPES]
+        firsts = first[order]
+        rows = last[order]
+        self.graph.add_edges_from(
+            (chunk_ids[source], chunk_ids[target], {
+                'element': ref_elements[reference_id],
+                'weight': weight,
+                'reference_type': type_values[ref_type]
+            })
+            for source, target, reference_id, ref_type, weight in zip(
+                sources[firsts].tolist(), targets[firsts].tolist(),
+                reference_ids[rows].tolist(), types[rows].tolist(), weights[rows].tolist())
+        )
+        self.csr = None
+        return len(targets)
+    
+    def _edge_weights(self, sources: np.ndarray, targets: np.ndarray,
+                      types: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+        """Calculate edge weights based on relationship strength, one per edge."""
         # Boost weight for function calls vs mentions vs type references
-        if reference.reference_type == ReferenceType.CALLS:
-            base_weight = 0.9
-        elif reference.reference_type == ReferenceType.TYPE_REFERENCE:
-            base_weight = 0.8  # High weight for type references as they indicate strong structural relationships
-        elif reference.reference_type == ReferenceType.MENTIONS:
-            base_weight = 0.6
+        type_weights = np.array([_REFERENCE_WEIGHTS.get(ref_type, 0.5)
+                                 for ref_type in CSRGraph.REFERENCE_TYPES])
+        base_weights = type_weights[types]
         
+        chunk_files = np.array(self.chunk_files, dtype=np.int64)
+        chunk_lines = np.array(self.chunk_lines, dtype=np.int64)
         # Boost weight for same file
-        if source_chunk.file_path == target_chunk.file_path:
-            base_weight += 0.2
-        
+        same_file = chunk_files[targets] == chunk_files[sources]
         # Boost weight for proximity in same file
-        if (source_chunk.file_path == target_chunk.file_path and 
-            abs(source_chunk.start_line - target_chunk.start_line) < 50):
-            base_weight += 0.1
+        nearby = same_file & (np.abs(chunk_lines[targets] - chunk_lines[sources]) < 50)
         
-        # Apply confidence score
-        base_weight *= reference.confidence
-        
-        return min(base_weight, 1.0)  # Cap at 1.0
+        # Same operation order as adding the boosts one by one, so the floats match
+        weights = (base_weights + 0.2 * same_file + 0.1 * nearby) * confidences
+        return np.minimum(weights, 1.0)  # Cap at 1.0
+    
+    def warmup(self) -> None:
+        """Build or prefault the traversal arrays ahead of the first query."""
+        self._get_csr().prefault()
     
     def get_neighbors(self, chunk_id: str, max_distance: int = 2, 
                      min_weight: float = 0.3) -> List[str]:
         """Get neighboring chunks within max_distance hops."""
-        if chunk_id not in self.graph:
+        csr = self._get_csr()
+        start = csr.node_index.get(chunk_id)
+        if start is None:
             return []
         
-        neighbors = set()
-        current_level = {chunk_id}
-        
-        for distance in range(1, max_distance + 1):
-            next_level = set()
-            
-            for node in current_level:
-                # Get outgoing edges (chunks this node references)
-                for neighbor in self.graph.successors(node):
-                    edge_data = self.graph.get_edge_data(node, neighbor)
-                    if edge_data and edge_data.get('weight', 0) >= min_weight:
-                        next_level.add(neighbor)
-                        neighbors.add(neighbor)
-                
-                # Get incoming edges (chunks that reference this node)
-                for neighbor in self.graph.predecessors(node):
-                    edge_data = self.graph.get_edge_data(neighbor, node)
-                    if edge_data and edge_data.get('weight', 0) >= min_weight:
-                        next_level.add(neighbor)
-                        neighbors.add(neighbor)
-            
-            current_level = next_level
-            
-            if not current_level:
-                break
-        
-        return list(neighbors)
+        # Follow both outgoing edges (chunks this node references) and
+        # incoming edges (chunks that reference this node)
+        return list(csr.neighborhood(start, max_distance, min_weight))
     
     def get_related_by_element(self, element_name: str, 
                               exclude_chunk: Optional[str] = None) -> List[str]:
@@ -187,18 +736,19 @@ class CodeGraph:
     
     def compute_centrality_scores(self) -> None:
         """Compute centrality scores for all chunks in the graph."""
-        if not self.graph.nodes():
+        csr = self._get_csr()
+        if not csr.num_nodes:
             return
         
         # Calculate PageRank centrality
         try:
-            pagerank_scores = nx.pagerank(self.graph, weight='weight')
+            scores = csr.pagerank()
         except nx.PowerIterationFailedToConverge:
             # Fallback to degree centrality if PageRank fails
-            pagerank_scores = nx.degree_centrality(self.graph)
+            scores = csr.degree_centrality()
         
         # Update chunk metadata with centrality scores
-        for chunk_id, score in pagerank_scores.items():
+        for chunk_id, score in zip(csr.node_ids, scores.tolist()):
             if chunk_id in self.chunk_metadata:
                 self.chunk_metadata[chunk_id].centrality_score = score
     
@@ -211,24 +761,46 @@ class CodeGraph:
         for element_name in element_names:
             relevant_chunks.update(self.element_index.get(element_name, []))
         
-        # Expand to include related chunks
+        # Expand to include related chunks; the chunks within max_depth of any
+        # seed are exactly the union of each seed's neighbors
+        csr = self._get_csr()
+        starts = np.array([csr.node_index[chunk_id] for chunk_id in relevant_chunks
+                           if chunk_id in csr.node_index], dtype=np.int64)
         expanded_chunks = set(relevant_chunks)
-        for chunk_id in relevant_chunks:
-            neighbors = self.get_neighbors(chunk_id, max_depth)
-            expanded_chunks.update(neighbors)
+        if starts.size:
+            reached = csr.reach(starts, max_depth, 0.3)
+            node_ids = csr.node_ids
+            expanded_chunks.update(node_ids[node] for node in np.flatnonzero(reached).tolist())
         
         return expanded_chunks
     
     def get_shortest_path(self, source_chunk: str, target_chunk: str) -> List[str]:
-        """Get shortest path between two chunks."""
-        try:
-            return nx.shortest_path(self.graph, source_chunk, target_chunk)
-        except (nx.NetworkXNoPath, nx.NodeNotFound):
+        """Get shortest path between two chunks.
+
+        NetworkX's own search is also bidirectional and its dict adjacency
+        beats numpy's per-call overhead on the small frontiers involved, so
+        it is used whenever the NetworkX graph exists. A graph loaded from
+        CSR arrays is searched on the arrays instead of being materialized.
+        """
+        if self._graph is not None:
+            try:
+                return nx.shortest_path(self._graph, source_chunk, target_chunk)
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                return []
+        
+        csr = self.csr
+        source = csr.node_index.get(source_chunk)
+        target = csr.node_index.get(target_chunk)
+        if source is None or target is None:
             return []
+        
+        node_ids = csr.node_ids
+        return [node_ids[node] for node in csr.shortest_path(source, target)]
     
     def get_graph_statistics(self) -> Dict[str, any]:
         """Get basic statistics about the graph."""
-        if not self.graph.nodes():
+        csr = self._get_csr()
+        if not csr.num_nodes:
             return {
                 'num_nodes': 0,
                 'num_edges': 0,
@@ -236,63 +808,118 @@ class CodeGraph:
                 'num_connected_components': 0
             }
         
+        # Every edge adds one to the out-degree and one to the in-degree
         return {
-            'num_nodes': self.graph.number_of_nodes(),
-            'num_edges': self.graph.number_of_edges(),
-            'avg_degree': sum(dict(self.graph.degree()).values()) / self.graph.number_of_nodes(),
-            'num_connected_components': nx.number_weakly_connected_components(self.graph),
+            'num_nodes': csr.num_nodes,
+            'num_edges': csr.num_edges,
+            'avg_degree': 2 * csr.num_edges / csr.num_nodes,
+            'num_connected_components': csr.num_weak_components(),
             'most_central_chunks': self._get_most_central_chunks(5)
         }
     
     def _get_most_central_chunks(self, top_k: int = 5) -> List[Tuple[str, float]]:
         """Get the most central chunks by centrality score."""
-        chunks_with_scores = [
+        chunks_with_scores = (
             (chunk_id, node.centrality_score) 
             for chunk_id, node in self.chunk_metadata.items()
-        ]
+        )
         
-        chunks_with_scores.sort(key=lambda x: x[1], reverse=True)
-        return chunks_with_scores[:top_k]
+        # Same result as a stable descending sort cut to top_k
+        return heapq.nlargest(top_k, chunks_with_scores, key=lambda x: x[1])
     
     def save_to_file(self, file_path: str) -> None:
-        """Save the graph to a file."""
-        file_path = Path(file_path)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        """Save the graph as CSR arrays in the directory next to file_path (graph.pkl -> graph.csr/)."""
+        csr_dir = Path(file_path).with_suffix('.csr')
         
-        print(f"\n💾 SAVING GRAPH TO: {file_path}")
+        print(f"\n💾 SAVING GRAPH TO: {csr_dir}")
         print("-" * 50)
         
-        # Prepare data to save
-        graph_data = {
-            'graph': nx.node_link_data(self.graph),  # NetworkX graph as JSON-serializable format
-            'element_index': dict(self.element_index),  # Convert defaultdict to regular dict
-            'chunk_elements': self.chunk_elements,
-            'chunk_metadata': {
-                chunk_id: {
-                    'chunk_id': node.chunk_id,
-                    'code_elements': node.code_elements,
-                    'centrality_score': node.centrality_score
-                }
-                for chunk_id, node in self.chunk_metadata.items()
-            }
-        }
-        
-        # Save to pickle file for Python objects
-        with open(file_path, 'wb') as f:
-            pickle.dump(graph_data, f)
+        self.save_csr(str(csr_dir))
         
         stats = self.get_graph_statistics()
+        size = sum(path.stat().st_size for path in csr_dir.iterdir())
         print(f"✅ GRAPH SAVED SUCCESSFULLY:")
         print(f"    📊 Nodes: {stats['num_nodes']}")
         print(f"    🔗 Edges: {stats['num_edges']}")
-        print(f"    📁 File size: {file_path.stat().st_size / 1024:.1f} KB")
+        print(f"    📁 File size: {size / 1024:.1f} KB")
         print("-" * 50)
     
+    @staticmethod
+    def exists(file_path: str) -> bool:
+        """Whether a graph was saved at file_path, as CSR arrays or a legacy pickle."""
+        file_path = Path(file_path)
+        return file_path.with_suffix('.csr').is_dir() or file_path.exists()
+    
+    def save_csr(self, directory: str) -> None:
+        """Save the graph as memory-mappable CSR arrays plus a JSON metadata file."""
+        directory = Path(directory)
+        self._get_csr().save(directory)
+        
+        metadata = {
+            'node_attributes': {
+                chunk_id: {'chunk_type': attrs.get('chunk_type'), 'file_path': attrs.get('file_path')}
+                for chunk_id, attrs in self.node_attributes.items()
+            },
+            # Kept so a loaded graph can weigh edges to new chunks (update_graph)
+            'start_lines': {
+                chunk_id: self.chunk_lines[row] for chunk_id, row in self.chunk_rows.items()
+                if chunk_id in self.node_attributes
+            },
+            'element_index': dict(self.element_index),
+            'chunk_metadata': {
+                chunk_id: [self.chunk_elements.get(chunk_id, []), node.centrality_score]
+                for chunk_id, node in self.chunk_metadata.items()
+            }
+        }
+        with open(directory / "graph_meta.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        
+        print(f"🧮 CSR graph arrays saved to: {directory}")
+    
+    @classmethod
+    def load_from_csr(cls, directory: str, silent: bool = False) -> 'CodeGraph':
+        """Load a graph saved by save_csr; arrays are memory-mapped, not unpickled."""
+        directory = Path(directory)
+        
+        if not silent:
+            print(f"\n📂 LOADING CSR GRAPH FROM: {directory}")
+            print("-" * 50)
+        
+        with open(directory / "graph_meta.json", 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        
+        code_graph = cls()
+        code_graph._graph = None  # Materialized from the arrays only if needed
+        code_graph.csr = CSRGraph.load(directory)
+        
+        code_graph.element_index = defaultdict(list, metadata['element_index'])
+        for chunk_id, (code_elements, centrality_score) in metadata['chunk_metadata'].items():
+            code_graph.chunk_elements[chunk_id] = code_elements
+            code_graph.chunk_metadata[chunk_id] = ChunkNode(
+                chunk_id=chunk_id,
+                centrality_score=centrality_score
+            )
+        code_graph.node_attributes = metadata['node_attributes']
+        code_graph._restore_chunk_rows(metadata.get('start_lines', {}))
+        
+        if not silent:
+            stats = code_graph.get_graph_statistics()
+            print(f"✅ GRAPH LOADED SUCCESSFULLY:")
+            print(f"    📊 Nodes: {stats['num_nodes']}")
+            print(f"    🔗 Edges: {stats['num_edges']}")
+            print("-" * 50)
+        
+        return code_graph
+    
     @classmethod
     def load_from_file(cls, file_path: str, silent: bool = False) -> 'CodeGraph':
-        """Load a graph from a file."""
+        """Load a graph from a file, preferring its CSR sidecar directory when present."""
         file_path = Path(file_path)
         
+        csr_dir = file_path.with_suffix('.csr')
+        if csr_dir.is_dir():
+            return cls.load_from_csr(csr_dir, silent=silent)
+        
         if not file_path.exists():
             raise FileNotFoundError(f"Graph file not found: {file_path}")
         
@@ -300,7 +927,7 @@ class CodeGraph:
             print(f"\n📂 LOADING GRAPH FROM: {file_path}")
             print("-" * 50)
         
-        # Load from pickle file
+        # Graphs saved before the CSR format are pickles; only load files you built yourself
         with open(file_path, 'rb') as f:
             graph_data = pickle.load(f)
         
@@ -309,6 +936,9 @@ class CodeGraph:
         
         # Restore NetworkX graph
         code_graph.graph = nx.node_link_graph(graph_data['graph'], edges="links")
+        for _, attrs in code_graph.graph.nodes(data=True):
+            attrs.pop('elements', None)  # Older graphs kept a copy of chunk_elements here
+        code_graph.node_attributes = dict(code_graph.graph.nodes(data=True))
         
         # Restore element index (convert back to defaultdict)
         code_graph.element_index = defaultdict(list)
@@ -323,9 +953,10 @@ class CodeGraph:
         for chunk_id, metadata in graph_data['chunk_metadata'].items():
             code_graph.chunk_metadata[chunk_id] = ChunkNode(
                 chunk_id=metadata['chunk_id'],
-                code_elements=metadata['code_elements'],
                 centrality_score=metadata['centrality_score']
             )
+        # Pickled graphs never stored start lines
+        code_graph._restore_chunk_rows({})
         
         if not silent:
             stats = code_graph.get_graph_statistics()
@@ -342,35 +973,34 @@ class CodeGraph:
         file_path = Path(file_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Create human-readable metadata
-        metadata = {
-            'statistics': self.get_graph_statistics(),
-            'nodes': [
-                {
+        # Written section by section, one node or edge record per line, so the
+        # whole document is never built in memory
+        with open(file_path, 'wb') as f:
+            f.write(b'{"statistics": ' + _json_dumps(self.get_graph_statistics()))
+            
+            f.write(b',\n"nodes": [')
+            separator = b'\n'
+            for chunk_id, node in self.chunk_metadata.items():
+                f.write(separator + _json_dumps({
                     'chunk_id': chunk_id,
-                    'code_elements': node.code_elements,
+                    'code_elements': self.chunk_elements.get(chunk_id, []),
                     'centrality_score': round(node.centrality_score, 4)
-                }
-                for chunk_id, node in self.chunk_metadata.items()
-            ],
-            'edges': [
-                {
+                }))
+                separator = b',\n'
+            
+            f.write(b'\n],\n"edges": [')
+            separator = b'\n'
+            for source, target, data in self.graph.edges(data=True):
+                f.write(separator + _json_dumps({
                     'source': source,
                     'target': target,
                     'element': data.get('element', ''),
                     'weight': data.get('weight', 0),
                     'reference_type': data.get('reference_type', '')
-                }
-                for source, target, data in self.graph.edges(data=True)
-            ],
-            'element_index': {
-                element: chunk_ids 
-                for element, chunk_ids in self.element_index.items()
-            }
-        }
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+                }))
+                separator = b',\n'
+            
+            f.write(b'\n],\n"element_index": ' + _json_dumps(dict(self.element_index)) + b'}\n')
         
         print(f"📋 Graph metadata saved to: {file_path}")
 
@@ -378,8 +1008,36 @@ class CodeGraph:
 class GraphBuilder:
     """Builder class for constructing code graphs from chunks."""
     
-    def __init__(self, extractor: Optional[CangjieCodeElementExtractor] = None):
+    # Below this many chunks, process start-up and pickling cost more than
+    # parallel extraction saves
+    PARALLEL_MIN_CHUNKS = 2000
+    
+    def __init__(self, extractor: Optional[CangjieCodeElementExtractor] = None,
+                 max_workers: Optional[int] = None):
         self.extractor = extractor or CangjieCodeElementExtractor()
+        self.max_workers = max_workers or os.cpu_count() or 1
+    
+    def _extract_in_parallel(self, chunks: List[Chunk]) -> None:
+        """Fill the extraction caches of many chunks across worker processes.
+
+        Elements and references come back together so neither graph phase
+        has to run the regex scans itself; chunks already extracted are
+        skipped. Graph mutation stays on this process.
+        """
+        pending = [chunk for chunk in chunks
+                   if chunk.metadata.extracted_elements is None
+                   and chunk.metadata.extracted_references is None]
+        if self.max_workers <= 1 or len(pending) < self.PARALLEL_MIN_CHUNKS:
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=_init_extract_worker,
+                                 initargs=(self.extractor,)) as executor:
+            tasks = [(chunk.id, chunk.content, chunk.start_line) for chunk in pending]
+            for chunk, (elements, references) in zip(
+                    pending, executor.map(_extract_all_worker, tasks, chunksize=32)):
+                chunk.metadata.extracted_elements = elements
+                chunk.metadata.extracted_references = references
     
     def build_graph(self, chunks: List[Chunk], parent_relationships: Optional[Dict[str, List[str]]] = None) -> CodeGraph:
         """Build a complete graph from a list of chunks."""
@@ -390,13 +1048,16 @@ class GraphBuilder:
         # First pass: add all chunks and their elements
         print(f"\n🏗️  PHASE 1: EXTRACTING CODE ELEMENTS")
         print("-" * 40)
+        self._extract_in_parallel(chunks)
         total_elements = 0
+        element_lists = []
         for i, chunk in enumerate(chunks, 1):
             if i % 20 == 0 or i == len(chunks):
                 print(f"  📊 Progress: {i}/{len(chunks)} chunks processed")
-            elements = self.extractor.extract_elements(chunk)
+            elements = self.extractor.extract_elements_cached(chunk)
             total_elements += len(elements)
-            graph.add_chunk(chunk, elements)
+            element_lists.append(elements)
+        graph.add_chunks(chunks, element_lists)
         
         print(f"\n  ✅ PHASE 1 COMPLETE: {total_elements} code elements extracted from {len(chunks)} chunks")
         
@@ -432,26 +1093,16 @@ class GraphBuilder:
         """Add parent-child relationships to the graph."""
         from .models import ReferenceType
         
-        edges_added = 0
-        for child_chunk, parent_chunks in parent_relationships.items():
-            for parent_chunk in parent_chunks:
-                # Add bidirectional edges with high weight for parent-child relationships
-                graph.add_reference_edge(
-                    source_chunk=child_chunk,
-                    target_chunk=parent_chunk,
-                    element="parent_relationship",
-                    weight=0.85,  # High weight for structural relationships
-                    reference_type=ReferenceType.MENTIONS
-                )
-                
-                graph.add_reference_edge(
-                    source_chunk=parent_chunk,
-                    target_chunk=child_chunk,
-                    element="child_relationship", 
-                    weight=0.85,
-                    reference_type=ReferenceType.MENTIONS
-                )
-                edges_added += 2
+        # One child -> parent edge per pair with high weight for structural
+        # relationships; traversal follows edges both ways, so the parent
+        # reaches its children through the same edge
+        edges = [
+            (child_chunk, parent_chunk, "parent_relationship", 0.85, ReferenceType.PARENT)
+            for child_chunk, parent_chunks in parent_relationships.items()
+            for parent_chunk in parent_chunks
+        ]
+        graph.add_reference_edges(edges)
+        edges_added = len(edges)
         
         print(f"\n  ✅ PHASE 2.5 COMPLETE: {edges_added} parent-child edges added from JSONL relationships")
     
@@ -460,23 +1111,32 @@ class GraphBuilder:
         """Update an existing graph with new chunks."""
         # Remove old chunks
         if removed_chunk_ids:
-            for chunk_id in removed_chunk_ids:
-                if chunk_id in graph.graph:
-                    # Remove from element index
-                    if chunk_id in graph.chunk_elements:
-                        for element in graph.chunk_elements[chunk_id]:
-                            if element in graph.element_index:
-                                graph.element_index[element] = [
-                                    cid for cid in graph.element_index[element] 
-                                    if cid != chunk_id
-                                ]
-                    
-                    # Remove from graph
-                    graph.graph.remove_node(chunk_id)
-                    
-                    # Clean up metadata
-                    graph.chunk_elements.pop(chunk_id, None)
-                    graph.chunk_metadata.pop(chunk_id, None)
+            removed = [chunk_id for chunk_id in dict.fromkeys(removed_chunk_ids)
+                       if chunk_id in graph.graph]
+            removed_set = set(removed)
+            
+            # Remove from element index, filtering each affected element once
+            affected = {
+                element
+                for chunk_id in removed
+                for element in graph.chunk_elements.get(chunk_id, ())
+                if element in graph.element_index
+            }
+            for element in affected:
+                graph.element_index[element] = [
+                    cid for cid in graph.element_index[element]
+                    if cid not in removed_set
+                ]
+            
+            # Remove from graph
+            graph.graph.remove_nodes_from(removed)
+            graph.invalidate_csr()
+            for chunk_id in removed:
+                graph.node_attributes.pop(chunk_id, None)
+                
+                # Clean up metadata
+                graph.chunk_elements.pop(chunk_id, None)
+                graph.chunk_metadata.pop(chunk_id, None)
         
         # Add new chunks
         all_chunks = new_chunks.copy()
@@ -488,9 +1148,9 @@ class GraphBuilder:
             pass
         
         # Add new chunks and elements
-        for chunk in new_chunks:
-            elements = self.extractor.extract_elements(chunk)
-            graph.add_chunk(chunk, elements)
+        self._extract_in_parallel(new_chunks)
+        graph.add_chunks(new_chunks, [self.extractor.extract_elements_cached(chunk)
+                                      for chunk in new_chunks])
         
         # Rebuild references for new chunks
         graph.build_references(new_chunks, self.extractor)
@@ -507,7 +1167,7 @@ class GraphBuilder:
         # Build the graph
         graph = self.build_graph(chunks, parent_relationships)
         
-        # Save the graph
+        # Save the graph as CSR arrays for fast memory-mapped loading
         graph.save_to_file(graph_file)
         
         # Optionally save human-readable metadata
@@ -517,6 +1177,11 @@ class GraphBuilder:
         
         return graph
     
+    @staticmethod
+    def save_graph_csr(graph: CodeGraph, graph_file: str) -> None:
+        """Save CSR arrays next to graph_file (graph.pkl -> graph.csr/)."""
+        graph.save_csr(str(Path(graph_file).with_suffix('.csr')))
+    
     @staticmethod
     def load_graph(graph_file: str, silent: bool = False) -> CodeGraph:
         """Convenience method to load a graph from file."""
@@ -2,139 +2,324 @@
 JSONL document processor for Graph RAG system.
 Handles DocumentModel schema with parent_ids relationships.
 """
+import bz2
+import gzip
+import io
 import json
-import uuid
-from typing import List, Optional, Dict
+import lzma
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Tuple
 from pathlib import Path
-from pydantic import BaseModel
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Files at least this large are parsed in parallel worker processes
+PARALLEL_LOAD_THRESHOLD = 64 * 1024 * 1024
+# Read buffer for streaming JSONL files line by line
+READ_BUFFER_SIZE = 1 << 20
+
+# Compressed JSONL inputs, by suffix; they are always streamed on one process
+_DECOMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
 
 from .models import Chunk, ChunkMetadata
-from .extractor import CangjieCodeElementExtractor
+from .extractor import (
+    CangjieCodeElementExtractor, CangjiePatterns, _init_extract_worker, _extract_all_worker
+)
 
 
-class DocumentModel(BaseModel):
-    """Pydantic model for JSONL document schema."""
+@dataclass(slots=True)
+class DocumentModel:
+    """A row of the JSONL document schema."""
     id: str
     text: str
     parent_ids: List[str]
     source: str
     short: str
+    url: str
     example_code: Optional[str] = None
     example_coding_problem: Optional[str] = None
-    url: str
+
+    REQUIRED_FIELDS = ('id', 'text', 'parent_ids', 'source', 'short', 'url')
+    STRING_FIELDS = ('id', 'text', 'source', 'short', 'url')
+    OPTIONAL_STRING_FIELDS = ('example_code', 'example_coding_problem')
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DocumentModel":
+        """Build a document from a parsed JSON object.
+
+        Checks that the required keys are present and that the fields have
+        their declared types (a ``null`` text is rejected, for instance);
+        raises ``ValueError`` naming the offending fields otherwise.
+        """
+        try:
+            document = cls(data['id'], data['text'], data['parent_ids'], data['source'],
+                           data['short'], data['url'],
+                           data.get('example_code'), data.get('example_coding_problem'))
+        except KeyError:
+            missing = [name for name in cls.REQUIRED_FIELDS if name not in data]
+            raise ValueError(f"missing required field(s): {', '.join(missing)}") from None
+        except TypeError:
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}") from None
+
+        invalid = [name for name in cls.STRING_FIELDS
+                   if not isinstance(getattr(document, name), str)]
+        invalid += [name for name in cls.OPTIONAL_STRING_FIELDS
+                    if not isinstance(getattr(document, name), (str, type(None)))]
+        if not isinstance(document.parent_ids, list) or \
+                not all(isinstance(parent_id, str) for parent_id in document.parent_ids):
+            invalid.append('parent_ids')
+        if invalid:
+            raise ValueError(f"invalid type for field(s): {', '.join(invalid)}")
+        return document
+
+
+def _parse_jsonl_lines(lines: List[bytes], first_line: int) -> Tuple[List[DocumentModel], List[str]]:
+    """Parse and validate JSONL lines, returning documents and log messages."""
+    documents = []
+    messages = []
+    from_dict = DocumentModel.from_dict
+
+    for line_num, line in enumerate(lines, first_line):
+        try:
+            documents.append(from_dict(_json_loads(line)))
+        except json.JSONDecodeError as e:
+            messages.append(f"⚠️  JSON decode error at line {line_num}: {e}")
+        except ValueError as e:
+            messages.append(f"⚠️  Validation error at line {line_num}: {e}")
+
+    return documents, messages
+
+
+def _open_jsonl(file_path: str):
+    """Open a JSONL file for binary line iteration, decompressing .gz, .bz2,
+    .xz and .zst files on the fly."""
+    suffix = Path(file_path).suffix.lower()
+    if suffix in _DECOMPRESSORS:
+        return _DECOMPRESSORS[suffix](file_path, 'rb')
+    if suffix == '.zst':
+        if zstandard is None:
+            raise ImportError("Reading .zst JSONL files requires the zstandard package")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+        return io.BufferedReader(reader, buffer_size=READ_BUFFER_SIZE)
+    return open(file_path, 'rb', buffering=READ_BUFFER_SIZE)
+
+
+def _is_compressed(file_path: str) -> bool:
+    suffix = Path(file_path).suffix.lower()
+    return suffix in _DECOMPRESSORS or suffix == '.zst'
+
+
+def _parse_jsonl_range(file_path: str, start: int, end: int,
+                       first_line: int) -> Tuple[List[DocumentModel], List[str]]:
+    """Worker entry point: parse the byte range [start, end) of a JSONL file."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return _parse_jsonl_lines(data.splitlines(), first_line)
+
+
+def _split_on_lines(f, size: int, parts: int) -> List[Tuple[int, int, int]]:
+    """Split an open file of ``size`` bytes into about ``parts`` (start, end,
+    first_line) ranges ending on newlines, reading it in bounded blocks."""
+    shards = []
+    step = max(1, size // parts)
+    start = 0
+    first_line = 1
+    while start < size:
+        # A range ends after the first newline at or past its nominal end
+        f.seek(min(start + step, size - 1))
+        f.readline()
+        end = f.tell()
+        shards.append((start, end, first_line))
+        f.seek(start)
+        remaining = end - start
+        while remaining:
+            block = f.read(min(READ_BUFFER_SIZE, remaining))
+            remaining -= len(block)
+            first_line += block.count(b'\n')
+        start = end
+    return shards
 
 
 class JSONLProcessor:
     """Process JSONL files containing DocumentModel data."""
 
-    def __init__(self):
+    # Documents are converted in batches of this size. A process pool is only
+    # started once a full batch shows the corpus is large enough to pay for it
+    PARALLEL_BATCH_SIZE = 2000
+
+    def __init__(self, max_workers: Optional[int] = None):
         self.extractor = CangjieCodeElementExtractor()
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def iter_jsonl(self, file_path: str, workers: Optional[int] = None) -> Iterator[DocumentModel]:
+        """Yield validated documents from a JSONL file in file order.
 
-    def load_jsonl(self, file_path: str) -> List[DocumentModel]:
-        """Load and validate JSONL file."""
+        Small files are read line by line. Large files (or any file when
+        ``workers`` > 1) are split on line boundaries and parsed in a process
+        pool, yielding one shard at a time. Compressed files (.gz, .bz2, .xz,
+        and .zst with the zstandard package) are decompressed while streaming
+        and always read line by line.
+        """
         print(f"\n📄 LOADING JSONL FILE: {file_path}")
         print("-" * 50)
-        documents = []
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    json_obj = json.loads(line.strip())
-                    # Validate with Pydantic model
-                    doc = DocumentModel(**json_obj)
-                    documents.append(doc)
-                except json.JSONDecodeError as e:
-                    print(f"⚠️  JSON decode error at line {line_num}: {e}")
-                    continue
-                except Exception as e:
-                    print(f"⚠️  Validation error at line {line_num}: {e}")
-                    # Try fallback for missing fields
-                    if 'long' not in json_obj and 'text' in json_obj:
-                        json_obj.setdefault('example_code', None)
-                        json_obj.setdefault('example_coding_problem', None)
-                        try:
-                            doc = DocumentModel(**json_obj)
-                            documents.append(doc)
-                        except Exception as e2:
-                            print(f"❌ Failed even with fallback at line {line_num}: {e2}")
-                            continue
-
-        print(f"\n✅ JSONL LOADING COMPLETE: {len(documents)} valid documents loaded")
-        print("-" * 50)
-        return documents
-
-    def convert_to_chunks(self, documents: List[DocumentModel]) -> List[Chunk]:
-        """Convert DocumentModel objects to Chunk objects."""
-        print(f"\n🔄 CONVERTING {len(documents)} DOCUMENTS TO CHUNKS")
+        count = 0
+
+        if _is_compressed(file_path):
+            workers = 1
+        elif workers is None:
+            workers = (os.cpu_count() or 1) if os.path.getsize(file_path) >= PARALLEL_LOAD_THRESHOLD else 1
+
+        if workers <= 1:
+            from_dict = DocumentModel.from_dict
+            with _open_jsonl(file_path) as f:
+                for line_num, line in enumerate(f, 1):
+                    try:
+                        document = from_dict(_json_loads(line))
+                    except ValueError:
+                        # Bad rows are rare; the shared parser words the message
+                        _, messages = _parse_jsonl_lines([line], line_num)
+                        for message in messages:
+                            print(message)
+                        continue
+                    count += 1
+                    yield document
+        else:
+            with open(file_path, 'rb') as f:
+                shards = _split_on_lines(f, os.fstat(f.fileno()).st_size, workers)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_parse_jsonl_range, file_path, start, end, first_line)
+                    for start, end, first_line in shards
+                ]
+                # Collect in submission order to keep documents in file order
+                for future in futures:
+                    shard_documents, messages = future.result()
+                    for message in messages:
+                        print(message)
+                    count += len(shard_documents)
+                    yield from shard_documents
+
+        print(f"\n✅ JSONL LOADING COMPLETE: {count} valid documents loaded")
         print("-" * 50)
-        chunks = []
-
-        for i, doc in enumerate(documents, 1):
-            if i % 50 == 0 or i == len(documents):
-                print(f"  📊 Progress: {i}/{len(documents)} documents converted")
-
-            # Combine text and example_code as full content
-            content_parts = [doc.text]
-            if doc.example_coding_problem:
-                content_parts.append("\n## Example Problem\n" + doc.example_coding_problem)
-            if doc.example_code:
-                content_parts.append("\n## Example Code\n```cangjie\n" + doc.example_code + "\n```")
-
-            full_content = "\n".join(content_parts)
-
-            # Extract code elements from both text and example_code
-            temp_chunk = Chunk(
-                id=doc.id,
-                content=full_content,
-                file_path=doc.source,
-                start_line=0,
-                end_line=0,
-                chunk_type=self._determine_chunk_type(doc),
-                metadata=ChunkMetadata(
-                    code_elements=[],  # Will be populated below
-                    language="cangjie",
-                    section_title=doc.short # Use short as section title
-                )
-            )
 
-            # Extract code elements
-            code_elements = self.extractor.get_code_element_names(temp_chunk)
-            temp_chunk.metadata.code_elements = code_elements
+    def load_jsonl(self, file_path: str, workers: Optional[int] = None) -> List[DocumentModel]:
+        """Load and validate a whole JSONL file, see ``iter_jsonl``."""
+        return list(self.iter_jsonl(file_path, workers))
 
-            # Log code elements found
-            if code_elements and (i <= 5 or i % 20 == 0):  # Show for first 5 and every 20th
-                elements_preview = code_elements[:3]
-                more_indicator = f" + {len(code_elements) - 3} more" if len(code_elements) > 3 else ""
-                print(f"      📝 Doc {doc.id}: {len(code_elements)} elements found: {elements_preview}{more_indicator}")
+    def convert_to_chunks(self, documents: Iterable[DocumentModel]) -> List[Chunk]:
+        """Convert DocumentModel objects to Chunk objects."""
+        return list(self.iter_chunks(documents))
 
-            chunks.append(temp_chunk)
+    def iter_chunks(self, documents: Iterable[DocumentModel]) -> Iterator[Chunk]:
+        """Convert documents to chunks as they arrive, so a document can be
+        dropped as soon as its chunk is built.
 
-        # Calculate total code elements extracted
-        total_elements = sum(len(chunk.metadata.code_elements) for chunk in chunks)
-        chunks_with_elements = sum(1 for chunk in chunks if chunk.metadata.code_elements)
+        Code element extraction for large corpora runs in worker processes,
+        one batch at a time; chunks keep document order.
+        """
+        print(f"\n🔄 CONVERTING DOCUMENTS TO CHUNKS")
+        print("-" * 50)
+        documents = iter(documents)
+        executor = None
+        i = 0
+        total_elements = 0
+        chunks_with_elements = 0
+
+        try:
+            while True:
+                batch = [self._document_to_chunk(doc)
+                         for doc in islice(documents, self.PARALLEL_BATCH_SIZE)]
+                if not batch:
+                    break
+                if (executor is None and self.max_workers > 1
+                        and len(batch) == self.PARALLEL_BATCH_SIZE):
+                    executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                   initializer=_init_extract_worker,
+                                                   initargs=(self.extractor,))
+                if executor is not None:
+                    tasks = [(chunk.id, chunk.content, chunk.start_line) for chunk in batch]
+                    for chunk, (elements, references) in zip(
+                            batch, executor.map(_extract_all_worker, tasks, chunksize=64)):
+                        chunk.metadata.extracted_elements = elements
+                        chunk.metadata.extracted_references = references
+
+                for chunk in batch:
+                    i += 1
+                    if i % 50 == 0:
+                        print(f"  📊 Progress: {i} documents converted")
+
+                    # Extract code elements (already cached when a worker did it)
+                    code_elements = self.extractor.get_code_element_names(chunk)
+                    chunk.metadata.code_elements = code_elements
+
+                    # Log code elements found
+                    if code_elements and (i <= 5 or i % 20 == 0):  # Show for first 5 and every 20th
+                        elements_preview = code_elements[:3]
+                        more_indicator = f" + {len(code_elements) - 3} more" if len(code_elements) > 3 else ""
+                        print(f"      📝 Doc {chunk.id}: {len(code_elements)} elements found: {elements_preview}{more_indicator}")
+
+                    total_elements += len(code_elements)
+                    chunks_with_elements += bool(code_elements)
+                    yield chunk
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
         print(f"\n✅ CHUNK CONVERSION COMPLETE:")
-        print(f"    📦 Total chunks created: {len(chunks)}")
+        print(f"    📦 Total chunks created: {i}")
         print(f"    🔧 Code elements extracted: {total_elements}")
         print(f"    📝 Chunks with elements: {chunks_with_elements}")
         print("-" * 50)
-        return chunks
+
+    def _document_to_chunk(self, doc: DocumentModel) -> Chunk:
+        """Build a document's chunk; code elements are filled in by iter_chunks."""
+        # Combine text, example problem and example code as full content; text
+        # alone is the common case and is used as is
+        problem = doc.example_coding_problem
+        code = doc.example_code
+        if problem and code:
+            content = f"{doc.text}\n\n## Example Problem\n{problem}\n\n## Example Code\n```cangjie\n{code}\n```"
+        elif problem:
+            content = f"{doc.text}\n\n## Example Problem\n{problem}"
+        elif code:
+            content = f"{doc.text}\n\n## Example Code\n```cangjie\n{code}\n```"
+        else:
+            content = doc.text
+
+        return Chunk(
+            id=doc.id,
+            content=content,
+            file_path=sys.intern(doc.source),  # Many docs share a source file
+            start_line=0,
+            end_line=0,
+            chunk_type=self._determine_chunk_type(doc),
+            metadata=ChunkMetadata(
+                code_elements=[],  # Populated by iter_chunks
+                language="cangjie",
+                section_title=doc.short # Use short as section title
+            )
+        )
 
     def _determine_chunk_type(self, doc: DocumentModel) -> str:
         """Determine chunk type based on content."""
         has_example_code = bool(doc.example_code)
 
-        # Check if main text contains code patterns - updated patterns
-        code_patterns = [
-            r'func\s+\w+\s*\(',
-            r'class\s+\w+(?:\s+extends\s+\w+)?(?:\s*\{|\s*$|\s+)',
-            r'struct\s+\w+(?:\s*\{|\s*$|\s+)',
-            r'interface\s+\w+(?:\s*\{|\s*$|\s+)',
-            r'enum\s+\w+(?:\s*\{|\s*$|\s+)'
-        ]
-
-        import re
-        has_code_in_text = any(re.search(pattern, doc.text) for pattern in code_patterns)
+        # Check if main text contains code patterns
+        has_code_in_text = CangjiePatterns.DECLARATION_HINT.search(doc.text) is not None
 
         if has_example_code and has_code_in_text:
             return "MIXED"
@@ -150,31 +335,39 @@ class JSONLGraphBuilder:
     def __init__(self):
         pass
 
-    def build_parent_relationships(self, chunks: List[Chunk], documents: List[DocumentModel]) -> Dict[str, List[str]]:
-        """Build parent-child relationships from JSONL parent_ids."""
+    def build_parent_relationships(self, chunks: List[Chunk],
+                                   parent_links: List[Tuple[str, List[str]]]) -> Dict[str, List[str]]:
+        """Build parent-child relationships from JSONL parent_ids.
+
+        ``parent_links`` holds one (doc.id, doc.parent_ids) pair per chunk, in
+        chunk order.
+        """
         print(f"\n🔗 BUILDING PARENT-CHILD RELATIONSHIPS")
         print("-" * 50)
 
-        # Create mapping from doc_id to chunk_id
-        doc_to_chunk = {doc.id: chunk.id for doc, chunk in zip(documents, chunks)}
+        # Create mapping from doc_id to chunk_id. A position index plus a list of
+        # chunk ids would still hash every parent id once, then add a list
+        # subscript, so the direct mapping is the cheaper lookup
+        doc_to_chunk = {doc_id: chunk.id for (doc_id, _), chunk in zip(parent_links, chunks)}
 
         # Build parent-child relationships
         parent_relationships = {}
         total_relationships = 0
 
-        for doc in documents:
-            if doc.parent_ids:
-                chunk_id = doc_to_chunk.get(doc.id)
-                if chunk_id:
-                    parent_chunks = []
-                    for parent_id in doc.parent_ids:
-                        parent_chunk_id = doc_to_chunk.get(parent_id)
-                        if parent_chunk_id:
-                            parent_chunks.append(parent_chunk_id)
-                            total_relationships += 1
-
-                    if parent_chunks:
-                        parent_relationships[chunk_id] = parent_chunks
+        get_chunk = doc_to_chunk.get  # Bound once, called for every parent id
+        for doc_id, parent_ids in parent_links:
+            if not parent_ids:
+                continue
+            chunk_id = get_chunk(doc_id)
+            if chunk_id:
+                parent_chunks = []
+                for parent_id in parent_ids:
+                    parent_chunk_id = get_chunk(parent_id)
+                    if parent_chunk_id:
+                        parent_chunks.append(parent_chunk_id)
+                if parent_chunks:
+                    parent_relationships[chunk_id] = parent_chunks
+                    total_relationships += len(parent_chunks)
 
         print(f"\n✅ RELATIONSHIP MAPPING COMPLETE:")
         print(f"    🔗 Total relationships: {total_relationships}")
@@ -212,17 +405,29 @@ class HybridProcessor:
 
         # Process JSONL file if provided
         if jsonl_file and Path(jsonl_file).exists():
-            documents = self.jsonl_processor.load_jsonl(jsonl_file)
-            jsonl_chunks = self.jsonl_processor.convert_to_chunks(documents)
+            # Stream documents straight into chunks, keeping only their parent links
+            parent_links = []
+            documents = self.jsonl_processor.iter_jsonl(jsonl_file)
+            jsonl_chunks = list(self.jsonl_processor.iter_chunks(
+                self._record_parent_links(documents, parent_links)
+            ))
             all_chunks.extend(jsonl_chunks)
 
             # Build parent relationships
             parent_relationships = self.jsonl_graph_builder.build_parent_relationships(
-                jsonl_chunks, documents
+                jsonl_chunks, parent_links
             )
             print(f"\n  ✅ JSONL COMPLETE: {len(jsonl_chunks)} chunks added")
 
         print(f"\n🎯 HYBRID PROCESSING COMPLETE")
         print(f"    📦 Total chunks from all sources: {len(all_chunks)}")
         print("=" * 60)
-        return all_chunks, parent_relationships
\ No newline at end of file
+        return all_chunks, parent_relationships
+
+    @staticmethod
+    def _record_parent_links(documents: Iterable[DocumentModel],
+                             parent_links: List[Tuple[str, List[str]]]) -> Iterator[DocumentModel]:
+        """Pass documents through, appending each (id, parent_ids) to parent_links."""
+        for doc in documents:
+            parent_links.append((doc.id, doc.parent_ids))
+            yield doc
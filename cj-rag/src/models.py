@@ -1,8 +1,10 @@
 """
 Core data models for the Graph RAG system.
 """
-from dataclasses import dataclass
-from typing import List, Optional
+import bisect
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import List, Optional, Tuple
 from enum import Enum
 
 
@@ -20,17 +22,37 @@ class ReferenceType(Enum):
     CALLS = "calls"
     MENTIONS = "mentions"
     TYPE_REFERENCE = "type_reference"  # For parameter types and return types
+    PARENT = "parent"  # Child chunk -> parent chunk, from JSONL parent_ids
 
 
-@dataclass
+@dataclass(slots=True)
 class ChunkMetadata:
     """Additional metadata for a chunk."""
     code_elements: List[str]  # Names of extracted code elements
     language: str = "cangjie"
     section_title: Optional[str] = None  # Markdown header if applicable
-
-
-@dataclass
+    # Code elements and references extracted from the chunk, kept so later
+    # passes reuse them
+    extracted_elements: Optional[List["CodeElement"]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    extracted_references: Optional[List["Reference"]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # (start, end, language) of fenced code bodies in the chunk content, in order
+    code_ranges: Optional[List[Tuple[int, int, str]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def in_code_block(self, pos: int) -> bool:
+        """Check whether an offset into the chunk content lies in a fenced code body."""
+        if not self.code_ranges:
+            return False
+        index = bisect.bisect_right(self.code_ranges, pos, key=itemgetter(0)) - 1
+        return index >= 0 and pos < self.code_ranges[index][1]
+
+
+@dataclass(slots=True)
 class Chunk:
     """A chunk of documentation content."""
     id: str
@@ -42,7 +64,7 @@ class Chunk:
     metadata: ChunkMetadata
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeElement:
     """A code element extracted from documentation."""
     name: str
@@ -52,7 +74,7 @@ class CodeElement:
     line_number: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Reference:
     """A reference from one chunk to a code element."""
     source_chunk: str
@@ -62,7 +84,7 @@ class Reference:
     confidence: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ChunkResult:
     """Result from vector search with similarity score."""
     id: str
@@ -71,7 +93,7 @@ class ChunkResult:
     metadata: ChunkMetadata
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalConfig:
     """Configuration for the retrieval system."""
     initial_k: int = 5  # Initial semantic search results
@@ -79,9 +101,12 @@ class RetrievalConfig:
     relevance_threshold: float = 0.3  # Minimum score for graph expansion
     max_total_chunks: int = 20  # Maximum final results
     rerank_by_graph: bool = True  # Re-rank using graph centrality
+    max_query_variants: int = 1  # Query variants searched together and fused with RRF
+    search_ef: int = 64  # HNSW search breadth (raised to at least initial_k)
+    search_nprobe: int = 16  # IVF clusters probed per query
 
 
-@dataclass
+@dataclass(slots=True)
 class GraphEdge:
     """An edge in the code graph."""
     source: str
@@ -91,9 +116,11 @@ class GraphEdge:
     reference_type: ReferenceType
 
 
-@dataclass
+@dataclass(slots=True)
 class ChunkNode:
-    """A node in the code graph representing a chunk."""
+    """A node in the code graph representing a chunk.
+
+    Its element names live in ``CodeGraph.chunk_elements``.
+    """
     chunk_id: str
-    code_elements: List[str]
     centrality_score: float = 0.0
\ No newline at end of file
@@ -1,11 +1,14 @@
 """
 Two-stage retrieval system combining semantic search with graph traversal.
 """
+import functools
 import re
+import threading
+import time
 from typing import List, Dict, Set, Tuple, Optional
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
-from .models import Chunk, ChunkResult, RetrievalConfig
+from .models import Chunk, ChunkNode, ChunkResult, RetrievalConfig
 from .vector_store import MilvusVectorStore
 from .graph import CodeGraph
 from .extractor import CangjieCodeElementExtractor
@@ -14,63 +17,109 @@ from .extractor import CangjieCodeElementExtractor
 class QueryAnalyzer:
     """Analyze queries to extract code elements and intent."""
     
+    # Patterns for identifying code elements in queries, compiled once per process
+    function_mention_pattern = re.compile(r'\b(\w+)\s*\(.*?\)', re.DOTALL)
+    type_mention_pattern = re.compile(r'\b(?:class|struct|interface|enum)\s+(\w+)', re.IGNORECASE)
+    # Word runs; identifiers are picked from these by character checks
+    word_pattern = re.compile(r'\w+')
+    
+    # Intent keywords
+    intent_patterns = {
+        'definition': ('what is', 'define', 'definition of', 'explain'),
+        'usage': ('how to use', 'example', 'usage', 'use', 'implement'),
+        'troubleshooting': ('error', 'problem', 'issue', 'debug', 'fix', 'troubleshoot'),
+        'comparison': ('vs', 'versus', 'compare', 'difference', 'between')
+    }
+    # One alternation per intent, so each intent costs a single scan of the query
+    intent_regexes = {
+        intent: re.compile('|'.join(map(re.escape, keywords)))
+        for intent, keywords in intent_patterns.items()
+    }
+    
     def __init__(self):
         self.extractor = CangjieCodeElementExtractor()
-        
-        # Patterns for identifying code elements in queries
-        self.function_mention_pattern = re.compile(r'\b(\w+)\s*\(.*?\)', re.DOTALL)
-        self.type_mention_pattern = re.compile(r'\b(?:class|struct|interface|enum)\s+(\w+)', re.IGNORECASE)
-        self.identifier_pattern = re.compile(r'\b([A-Z][a-zA-Z0-9_]*|[a-z][a-zA-Z0-9_]*[A-Z][a-zA-Z0-9_]*)\b')
-        
-        # Intent keywords
-        self.intent_patterns = {
-            'definition': ['what is', 'define', 'definition of', 'explain'],
-            'usage': ['how to use', 'example', 'usage', 'use', 'implement'],
-            'troubleshooting': ['error', 'problem', 'issue', 'debug', 'fix', 'troubleshoot'],
-            'comparison': ['vs', 'versus', 'compare', 'difference', 'between']
-        }
     
     def analyze_query(self, query: str) -> Dict[str, any]:
-        """Analyze query to extract elements and intent."""
-        query_lower = query.lower()
-        
-        # Extract mentioned code elements
-        code_elements = set()
-        
-        # Look for function calls
-        for match in self.function_mention_pattern.finditer(query):
-            code_elements.add(match.group(1))
-        
-        # Look for type mentions
-        for match in self.type_mention_pattern.finditer(query):
-            code_elements.add(match.group(1))
-        
-        # Look for likely identifiers (CamelCase, etc.)
-        for match in self.identifier_pattern.finditer(query):
-            identifier = match.group(1)
-            if len(identifier) > 2 and not identifier.lower() in {'the', 'and', 'for', 'can', 'how'}:
-                code_elements.add(identifier)
-        
-        # Determine query intent
-        intent = 'general'
-        for intent_type, keywords in self.intent_patterns.items():
-            if any(keyword in query_lower for keyword in keywords):
-                intent = intent_type
-                break
-        
+        """Analyze query to extract elements and intent.
+
+        The analysis is memoized per query string; every call still gets its
+        own lists, so callers may modify the result.
+        """
+        code_elements, intent, query_terms = _analyze_query(query)
         return {
             'code_elements': list(code_elements),
             'intent': intent,
             'original_query': query,
-            'query_terms': query_lower.split()
+            'query_terms': list(query_terms)
         }
+    
+    def get_query_variants(self, query_analysis: Dict[str, any], max_variants: int = 1) -> List[str]:
+        """Get the query strings to search with: the original query, then its code elements."""
+        variants = [query_analysis['original_query']]
+        if max_variants > 1 and query_analysis['code_elements']:
+            variants.append(" ".join(sorted(query_analysis['code_elements'])))
+        return variants[:max(1, max_variants)]
+
+
+@functools.lru_cache(maxsize=1024)
+def _analyze_query(query: str) -> Tuple[Tuple[str, ...], str, Tuple[str, ...]]:
+    """Return (code elements, intent, query terms) for a query string."""
+    query_lower = query.lower()
+    
+    # Extract mentioned code elements
+    code_elements = set()
+    
+    # Look for function calls
+    for match in QueryAnalyzer.function_mention_pattern.finditer(query):
+        code_elements.add(match.group(1))
+    
+    # Look for type mentions
+    for match in QueryAnalyzer.type_mention_pattern.finditer(query):
+        code_elements.add(match.group(1))
+    
+    # Look for likely identifiers (CamelCase, etc.): whole ASCII word runs that
+    # start uppercase, or start lowercase and contain an uppercase letter
+    for identifier in QueryAnalyzer.word_pattern.findall(query):
+        if (len(identifier) > 2 and identifier.isascii()
+                and (identifier[0].isupper() or (identifier[0].islower() and not identifier.islower()))
+                and not identifier.lower() in {'the', 'and', 'for', 'can', 'how'}):
+            code_elements.add(identifier)
+    
+    # Determine query intent
+    intent = 'general'
+    for intent_type, pattern in QueryAnalyzer.intent_regexes.items():
+        if pattern.search(query_lower):
+            intent = intent_type
+            break
+    
+    return tuple(code_elements), intent, tuple(query_lower.split())
 
 
 class ResultRanker:
     """Rank and filter retrieval results."""
     
+    # Content indicators per query intent. Chunk contents are long, so plain
+    # substring checks beat a fused regex here
+    intent_indicators = {
+        'definition': ('definition', 'is a', 'represents', 'type of'),
+        'usage': ('example', 'use', 'usage', 'implement', 'call'),
+        'troubleshooting': ('error', 'problem', 'issue', 'solution', 'fix'),
+        'comparison': ('vs', 'versus', 'compare', 'difference', 'unlike')
+    }
+    
+    # Intent scores kept across rankings, so a chunk that keeps showing up is
+    # not lowercased again for every query
+    INTENT_SCORE_CACHE_SIZE = 8192
+    
     def __init__(self, graph: CodeGraph):
         self.graph = graph
+        self._intent_scores: OrderedDict = OrderedDict()  # (chunk id, intent) -> score
+        self._intent_lock = threading.Lock()
+    
+    def clear_cache(self) -> None:
+        """Drop cached intent scores, e.g. after the indexed chunks were replaced."""
+        with self._intent_lock:
+            self._intent_scores.clear()
     
     def rank_results(self, chunks: List[ChunkResult], query_analysis: Dict[str, any], 
                     config: RetrievalConfig) -> List[ChunkResult]:
@@ -78,10 +127,19 @@ class ResultRanker:
         if not chunks:
             return []
         
+        # Element sets are built once per chunk (ids are unique here) and shared
+        # by scoring and the pairwise diversity checks
+        element_sets = {chunk.id: frozenset(chunk.metadata.code_elements) for chunk in chunks}
+        query_elements = frozenset(query_analysis['code_elements'])
+        chunk_metadata = self.graph.chunk_metadata
+        
         # Calculate combined scores
         scored_chunks = []
         for chunk in chunks:
-            combined_score = self._calculate_combined_score(chunk, query_analysis, config)
+            combined_score = self._calculate_combined_score(
+                chunk, query_analysis, config, element_sets[chunk.id], query_elements,
+                chunk_metadata.get(chunk.id)
+            )
             chunk.score = combined_score
             scored_chunks.append(chunk)
         
@@ -92,27 +150,28 @@ class ResultRanker:
         if config.max_total_chunks < len(scored_chunks):
             scored_chunks = self._apply_diversity_filter(
                 scored_chunks[:config.max_total_chunks * 2],  # Consider more candidates
-                config.max_total_chunks
+                config.max_total_chunks,
+                element_sets
             )
         
         return scored_chunks[:config.max_total_chunks]
     
     def _calculate_combined_score(self, chunk: ChunkResult, query_analysis: Dict[str, any], 
-                                 config: RetrievalConfig) -> float:
-        """Calculate combined score from semantic similarity and graph features."""
+                                 config: RetrievalConfig, chunk_elements: frozenset,
+                                 query_elements: frozenset, node: Optional[ChunkNode]) -> float:
+        """Calculate combined score from semantic similarity and graph features.
+
+        ``node`` is the chunk's graph node, or None when it is not in the graph.
+        """
         semantic_score = chunk.score
         
         # Graph-based features
         graph_score = 0.0
-        if config.rerank_by_graph and chunk.id in self.graph.chunk_metadata:
+        if config.rerank_by_graph and node is not None:
             # Centrality score
-            centrality = self.graph.chunk_metadata[chunk.id].centrality_score
-            graph_score += centrality * 0.3
+            graph_score += node.centrality_score * 0.3
             
             # Code element overlap score
-            chunk_elements = set(chunk.metadata.code_elements)
-            query_elements = set(query_analysis['code_elements'])
-            
             if query_elements:
                 overlap_ratio = len(chunk_elements & query_elements) / len(query_elements)
                 graph_score += overlap_ratio * 0.4
@@ -128,57 +187,69 @@ class ResultRanker:
     
     def _calculate_intent_score(self, chunk: ChunkResult, intent: str) -> float:
         """Calculate score based on query intent."""
-        content_lower = chunk.content.lower()
-        
-        intent_indicators = {
-            'definition': ['definition', 'is a', 'represents', 'type of'],
-            'usage': ['example', 'use', 'usage', 'implement', 'call'],
-            'troubleshooting': ['error', 'problem', 'issue', 'solution', 'fix'],
-            'comparison': ['vs', 'versus', 'compare', 'difference', 'unlike']
-        }
-        
-        indicators = intent_indicators.get(intent, [])
+        indicators = self.intent_indicators.get(intent)
         if not indicators:
             return 0.5  # Neutral score for unknown intents
         
+        key = (chunk.id, intent)
+        with self._intent_lock:
+            cached = self._intent_scores.get(key)
+            if cached is not None:
+                self._intent_scores.move_to_end(key)
+                return cached
+        
+        content_lower = chunk.content.lower()
         score = sum(1 for indicator in indicators if indicator in content_lower)
-        return min(score / len(indicators), 1.0)
+        score = min(score / len(indicators), 1.0)
+        
+        with self._intent_lock:
+            self._intent_scores[key] = score
+            if len(self._intent_scores) > self.INTENT_SCORE_CACHE_SIZE:
+                self._intent_scores.popitem(last=False)
+        return score
     
-    def _apply_diversity_filter(self, chunks: List[ChunkResult], target_count: int) -> List[ChunkResult]:
+    def _apply_diversity_filter(self, chunks: List[ChunkResult], target_count: int,
+                                element_sets: Dict[str, frozenset]) -> List[ChunkResult]:
         """Apply diversity filtering to avoid too many similar chunks."""
         if len(chunks) <= target_count:
             return chunks
         
         selected = [chunks[0]]  # Always include the top result
+        selected_ids = {chunks[0].id}
         
         for chunk in chunks[1:]:
             if len(selected) >= target_count:
                 break
             
             # Check diversity with already selected chunks
-            is_diverse = self._is_diverse_enough(chunk, selected)
+            is_diverse = self._is_diverse_enough(chunk, selected, element_sets)
             if is_diverse:
                 selected.append(chunk)
+                selected_ids.add(chunk.id)
         
-        # Fill remaining slots if needed
-        while len(selected) < target_count and len(selected) < len(chunks):
-            for chunk in chunks:
-                if chunk not in selected:
-                    selected.append(chunk)
-                    break
+        # Fill remaining slots if needed, in score order
+        for chunk in chunks:
+            if len(selected) >= target_count:
+                break
+            if chunk.id not in selected_ids:
+                selected.append(chunk)
+                selected_ids.add(chunk.id)
         
         return selected
     
-    def _is_diverse_enough(self, candidate: ChunkResult, selected: List[ChunkResult]) -> bool:
+    def _is_diverse_enough(self, candidate: ChunkResult, selected: List[ChunkResult],
+                           element_sets: Dict[str, frozenset]) -> bool:
         """Check if a candidate chunk is diverse enough from selected chunks."""
-        candidate_elements = set(candidate.metadata.code_elements)
+        chunk_metadata = self.graph.chunk_metadata
+        candidate_elements = element_sets[candidate.id]
+        if not candidate_elements or candidate.id not in chunk_metadata:
+            return True
         
         for selected_chunk in selected:
-            selected_elements = set(selected_chunk.metadata.code_elements)
+            selected_elements = element_sets[selected_chunk.id]
             
             # If chunks are from the same file and have high element overlap, not diverse
-            if (candidate.id in self.graph.chunk_metadata and 
-                selected_chunk.id in self.graph.chunk_metadata):
+            if selected_chunk.id in chunk_metadata:
                 
                 # Check if chunks are too similar
                 if candidate_elements and selected_elements:
@@ -192,23 +263,108 @@ class ResultRanker:
 class GraphRAGRetriever:
     """Main retrieval system combining semantic search with graph traversal."""
     
+    # Graph-expanded chunks were not matched against the query, so they rank on
+    # this fraction of the weakest seed's similarity instead of a score of their own
+    EXPANDED_SCORE_FACTOR = 0.5
+    
     def __init__(self, vector_store: MilvusVectorStore, graph: CodeGraph):
         self.vector_store = vector_store
         self.graph = graph
         self.query_analyzer = QueryAnalyzer()
         self.result_ranker = ResultRanker(graph)
     
+    def reload(self, vector_store: MilvusVectorStore, graph: CodeGraph) -> None:
+        """Switch to a freshly loaded vector store and graph.
+
+        Chunk ids are deterministic, so scores cached against the old index
+        would be served for the new one; the ranker's cache is cleared.
+        """
+        self.vector_store = vector_store
+        self.graph = graph
+        self.result_ranker.graph = graph
+        self.result_ranker.clear_cache()
+    
+    def warmup(self, query: str = "hello world") -> float:
+        """Run a canned query through the whole pipeline so the first real request is not cold.
+        
+        Returns the warmup time in seconds.
+        """
+        start = time.perf_counter()
+        self.vector_store.prefetch()
+        self.graph.warmup()
+        self.retrieve(query)
+        return time.perf_counter() - start
+    
     def retrieve(self, query: str, config: Optional[RetrievalConfig] = None) -> List[ChunkResult]:
         """Perform two-stage retrieval: semantic search + graph expansion."""
         if config is None:
             config = RetrievalConfig()
         
-        # Analyze query
-        query_analysis = self.query_analyzer.analyze_query(query)
+        return self.retrieve_batch([query], [config])[0]
+    
+    def retrieve_batch(self, queries: List[str],
+                       configs: List[RetrievalConfig]) -> List[List[ChunkResult]]:
+        """Perform retrieval for several queries, sharing one batched semantic search."""
+        if not queries:
+            return []
         
-        # Stage 1: Semantic search
-        initial_chunks = self.vector_store.semantic_search(query, config.initial_k)
+        # Analyze queries
+        analyses = [self.query_analyzer.analyze_query(query) for query in queries]
+        variants = [
+            self.query_analyzer.get_query_variants(analysis, config.max_query_variants)
+            for analysis, config in zip(analyses, configs)
+        ]
+        
+        # Stage 1: Semantic search for every query variant in one batch,
+        # trimmed afterwards to each query's own initial_k
+        max_k = max(config.initial_k for config in configs)
+        search_params = {
+            'ef': max(max(config.search_ef for config in configs), max_k),
+            'nprobe': max(config.search_nprobe for config in configs)
+        }
+        flat_variants = [variant for query_variants in variants for variant in query_variants]
+        flat_results = self.vector_store.semantic_search_batch(flat_variants, max_k, search_params)
+        
+        results = []
+        pos = 0
+        for analysis, config, query_variants in zip(analyses, configs, variants):
+            variant_results = flat_results[pos:pos + len(query_variants)]
+            pos += len(query_variants)
+            
+            if len(variant_results) == 1:
+                initial_chunks = variant_results[0][:config.initial_k]
+            else:
+                initial_chunks = self._fuse_results(variant_results, config.initial_k)
+            
+            results.append(self._expand_and_rank(initial_chunks, analysis, config))
         
+        return results
+    
+    @staticmethod
+    def _fuse_results(result_lists: List[List[ChunkResult]], top_k: int,
+                      rrf_k: int = 60) -> List[ChunkResult]:
+        """Merge per-variant hit lists with reciprocal rank fusion.
+        
+        Each chunk keeps its best similarity score so thresholds and ranking
+        downstream still see a cosine similarity.
+        """
+        fused: Dict[str, list] = {}
+        for hits in result_lists:
+            for rank, chunk in enumerate(hits, 1):
+                entry = fused.get(chunk.id)
+                if entry is None:
+                    fused[chunk.id] = [1.0 / (rrf_k + rank), chunk]
+                else:
+                    entry[0] += 1.0 / (rrf_k + rank)
+                    if chunk.score > entry[1].score:
+                        entry[1] = chunk
+        
+        ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+        return [chunk for _, chunk in ranked[:top_k]]
+    
+    def _expand_and_rank(self, initial_chunks: List[ChunkResult], query_analysis: Dict[str, any],
+                         config: RetrievalConfig) -> List[ChunkResult]:
+        """Run graph expansion and ranking on the semantic search results of one query."""
         if not initial_chunks:
             return []
         
@@ -225,7 +381,11 @@ class GraphRAGRetriever:
     
     def _graph_expand(self, seed_chunks: List[ChunkResult], query_analysis: Dict[str, any],
                      config: RetrievalConfig) -> Set[str]:
-        """Expand initial results using graph traversal."""
+        """Expand initial results using graph traversal.
+
+        Every strategy runs against the in-memory graph arrays and holds the
+        GIL, so they run one after another rather than on a thread pool.
+        """
         expanded = set(chunk.id for chunk in seed_chunks)
         
         # Strategy 1: Neighbor expansion
@@ -240,15 +400,15 @@ class GraphRAGRetriever:
         
         # Strategy 2: Element-based expansion
         mentioned_elements = query_analysis['code_elements']
+        chunk_metadata = self.graph.chunk_metadata
         if mentioned_elements:
             for element in mentioned_elements:
                 related_chunks = self.graph.get_related_by_element(element)
                 # Add high-quality related chunks
                 for chunk_id in related_chunks:
-                    if chunk_id in self.graph.chunk_metadata:
-                        centrality = self.graph.chunk_metadata[chunk_id].centrality_score
-                        if centrality > 0.1:  # Only add reasonably central chunks
-                            expanded.add(chunk_id)
+                    node = chunk_metadata.get(chunk_id)
+                    if node is not None and node.centrality_score > 0.1:  # Only add reasonably central chunks
+                        expanded.add(chunk_id)
         
         # Strategy 3: Subgraph expansion for complex queries
         if len(mentioned_elements) > 1:
@@ -269,12 +429,11 @@ class GraphRAGRetriever:
         for chunk in initial_chunks:
             chunks[chunk.id] = chunk
         
-        # Retrieve additional chunks
-        for chunk_id in chunk_ids:
-            if chunk_id not in chunks:
-                chunk = self.vector_store.get_chunk_by_id(chunk_id)
-                if chunk:
-                    chunks[chunk_id] = chunk
+        # Retrieve additional chunks in one batched lookup
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in chunks]
+        expanded_score = min(chunk.score for chunk in initial_chunks) * self.EXPANDED_SCORE_FACTOR
+        for chunk in self.vector_store.get_chunks_by_ids(missing, score=expanded_score):
+            chunks[chunk.id] = chunk
         
         return list(chunks.values())
     
@@ -1,24 +1,133 @@
 """
 Milvus vector storage for semantic search functionality.
 """
+import hashlib
 import json
-from typing import List, Optional, Dict, Any, Callable, Union
+import os
+import platform
+import sqlite3
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Callable, Union, Iterable, Tuple
 import numpy as np
 
+try:
+    import orjson
+    _json_dumps = lambda obj: orjson.dumps(obj).decode('utf-8')
+    _json_loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 from .models import Chunk, ChunkResult, ChunkMetadata
 
 
+# Field order of the rows inserted by MilvusVectorStore.store_chunks
+_INSERT_FIELDS = ("id", "vector", "chunk_id", "content", "file_path",
+                  "start_line", "end_line", "chunk_type", "code_elements", "section_title")
+# Fields read back into ChunkResult objects
+_RESULT_FIELDS = _INSERT_FIELDS[2:]
+
+
+class EmbeddingCache:
+    """Persistent SQLite store of embeddings keyed by a hash of model and text."""
+
+    # Stay below SQLite's limit on bound parameters per statement
+    QUERY_BATCH = 500
+
+    def __init__(self, path: str, model_key: str):
+        self.path = path
+        self.model_key = model_key
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+
+    def hash_text(self, text: str) -> str:
+        """Hash the text together with the model so a model change never reuses vectors."""
+        return hashlib.blake2b(f"{self.model_key}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Fetch the cached vectors for whichever hashes are present."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), self.QUERY_BATCH):
+            batch = unique[start:start + self.QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Store vectors as raw float32 bytes in a single transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                ((text_hash, np.asarray(vector, dtype=np.float32).tobytes()) for text_hash, vector in items)
+            )
+
+
 class MilvusVectorStore:
     """Vector storage using Milvus for semantic search."""
 
+    # Chunk IDs per filtered query in get_chunks_by_ids, keeping filter
+    # expressions and result sets well below Milvus' limits
+    ID_QUERY_BATCH = 1000
+    # Stored rows widened to FP32 at a time when scoring FP16 fallback vectors
+    FALLBACK_SCORE_BLOCK = 1024
+
     def __init__(self,
                  db_path: str = "milvus_cangjie_docs.db",
                  collection_name: str = "cangjie_docs",
-                 embedding_model_path: str = "./model/Conan-embedding-v1"):
-        """Initialize Milvus connection and embedding model."""
+                 embedding_model_path: str = "./model/Conan-embedding-v1",
+                 embedding_batch_size: int = 64,
+                 insert_batch_size: int = 1000,
+                 query_cache_size: int = 4096,
+                 embedding_cache_path: Optional[str] = None,
+                 use_embedding_cache: bool = True,
+                 vector_dtype: str = "float32",
+                 embedding_backend: str = "torch",
+                 cpu_bf16: bool = False):
+        """Initialize Milvus connection and embedding model.
+
+        ``vector_dtype`` selects how new collections store vectors: "float32",
+        or "float16" to halve storage and search memory bandwidth.
+
+        ``embedding_backend`` is "torch", or "onnx" for ONNX Runtime with INT8
+        weights quantized for this CPU. The ONNX vectors differ slightly from
+        the PyTorch ones, so queries should use the backend the index was
+        built with. ``cpu_bf16`` runs the PyTorch model in BF16 on CPUs with
+        native BF16 matmuls; like ONNX it shifts the vectors slightly.
+        """
+        if vector_dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector_dtype: {vector_dtype}")
+        if embedding_backend not in ("torch", "onnx"):
+            raise ValueError(f"Unsupported embedding_backend: {embedding_backend}")
+        self.requested_backend = embedding_backend
+        self.cpu_bf16 = cpu_bf16
         self.db_path = db_path
         self.collection_name = collection_name
         self.embedding_model_path = embedding_model_path
+        self.embedding_batch_size = embedding_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.vector_dtype = vector_dtype
+        # Vector dtype of the existing collection, detected on first use
+        self._collection_vector_dtype: Optional[str] = None
+
+        # Persistent cache so rebuilds only embed new or changed texts
+        self.use_embedding_cache = use_embedding_cache
+        self.embedding_cache_path = embedding_cache_path or str(
+            Path(db_path).parent / "embeddings_cache.sqlite"
+        )
+        self._embedding_cache: Optional[EmbeddingCache] = None
+
+        # LRU cache of query embeddings; clients often repeat the same query
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
 
         # Initialize embedding model with fallback mechanism (like original code)
         self.embedding_model = None
@@ -29,51 +138,267 @@ class MilvusVectorStore:
         self.client = None
         self._setup_client()
 
+    @staticmethod
+    def _cpu_flags() -> set:
+        """Read the CPU feature flags from /proc/cpuinfo (empty where unavailable)."""
+        try:
+            with open("/proc/cpuinfo") as cpuinfo:
+                for line in cpuinfo:
+                    if line.startswith(("flags", "Features")):
+                        return set(line.split(":", 1)[1].split())
+        except OSError:
+            pass
+        return set()
+
+    @classmethod
+    def _cpu_supports_bf16(cls, torch) -> bool:
+        """Check for AMX tiles or AVX512-BF16, where BF16 matmuls beat FP32."""
+        is_amx_supported = getattr(torch.cpu, "_is_amx_tile_supported", None)
+        if is_amx_supported is not None and is_amx_supported():
+            return True
+        flags = cls._cpu_flags()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+
+    @classmethod
+    def _onnx_quantization_config(cls) -> Optional[str]:
+        """Pick the dynamic INT8 quantization config matching this CPU, if any."""
+        machine = platform.machine().lower()
+        if machine in ("arm64", "aarch64"):
+            return "arm64"
+        if machine not in ("x86_64", "amd64"):
+            return None
+        flags = cls._cpu_flags()
+        if "avx512_vnni" in flags:
+            return "avx512_vnni"
+        if "avx512f" in flags:
+            return "avx512"
+        return "avx2"
+
+    def _setup_onnx_model(self) -> bool:
+        """Load the embedding model on ONNX Runtime with dynamic INT8 quantization.
+
+        The quantized graph is written next to the model on first use so later
+        runs skip the export. Returns False when the ONNX backend is unavailable.
+        """
+        try:
+            import onnxruntime  # noqa: F401
+            from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+        except ImportError:
+            return False
+
+        model_kwargs = {"provider": "CPUExecutionProvider"}
+        config = self._onnx_quantization_config()
+        quantized_file = f"onnx/model_qint8_{config}.onnx"
+        try:
+            if config is not None and not (Path(self.embedding_model_path) / quantized_file).exists():
+                model = SentenceTransformer(self.embedding_model_path, device='cpu', backend="onnx",
+                                            model_kwargs=model_kwargs)
+                export_dynamic_quantized_onnx_model(model, config, self.embedding_model_path)
+            if config is not None:
+                model_kwargs["file_name"] = quantized_file
+            self.embedding_model = SentenceTransformer(self.embedding_model_path, device='cpu',
+                                                       backend="onnx", model_kwargs=model_kwargs)
+        except Exception as e:
+            print(f"ONNX Runtime backend unavailable, using PyTorch: {e}")
+            return False
+
+        self.use_langchain = True  # sentence-transformers uses .encode() method
+        self.embedding_backend = f"onnx-qint8-{config}" if config is not None else "onnx"
+        return True
+
+    @classmethod
+    def _select_device(cls, cpu_bf16: bool = False) -> tuple:
+        """Pick the inference device and dtype.
+
+        FP16 on CUDA/ROCm and Apple MPS, BF16 on CPUs with native BF16 matmuls
+        when ``cpu_bf16`` is set, FP32 otherwise (BF16 emulation on older CPUs
+        is slower than FP32).
+        """
+        try:
+            import torch
+        except ImportError:
+            return 'cpu', None
+
+        # ROCm builds of torch also report their GPUs through torch.cuda
+        if torch.cuda.is_available():
+            return 'cuda', torch.float16
+        mps = getattr(torch.backends, 'mps', None)
+        if mps is not None and mps.is_available():
+            return 'mps', torch.float16
+        if cpu_bf16 and cls._cpu_supports_bf16(torch):
+            return 'cpu', torch.bfloat16
+        return 'cpu', None
+
     def _setup_embedding_model(self) -> None:
-        """Initialize embedding model with langchain-huggingface fallback to transformers."""
+        """Initialize embedding model: ONNX Runtime when requested, else langchain-huggingface with fallback to transformers."""
+        self.device, self.torch_dtype = self._select_device(self.cpu_bf16)
+        # Keeps cached FP32 and BF16 query vectors apart
+        cpu_bf16 = self.device == 'cpu' and self.torch_dtype is not None
+        self.embedding_backend = "torch-bf16" if cpu_bf16 else "torch"
+        # ONNX Runtime with INT8 weights runs the CPU forward pass several times faster
+        if self.requested_backend == "onnx" and self._setup_onnx_model():
+            self.device, self.torch_dtype = 'cpu', None
+            return
         try:
             from langchain_huggingface import HuggingFaceEmbeddings
             # print("Using HuggingFaceEmbeddings from langchain-huggingface")
+            model_kwargs = {'device': self.device}
+            if self.torch_dtype is not None:
+                model_kwargs['model_kwargs'] = {'torch_dtype': self.torch_dtype}
             self.embedding_model = HuggingFaceEmbeddings(
                 model_name=self.embedding_model_path,
-                model_kwargs={'device': 'cpu'},
+                model_kwargs=model_kwargs,
                 encode_kwargs={'normalize_embeddings': True}
             )
             self.use_langchain = True
         except ImportError:
             self.use_langchain = False
             try:
+                import torch
                 from transformers import AutoModel, AutoTokenizer
                 # print("Using transformers directly")
                 tokenizer = AutoTokenizer.from_pretrained(self.embedding_model_path)
-                model = AutoModel.from_pretrained(self.embedding_model_path)
-
-                def embed_text(text: str) -> List[float]:
-                    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-                    outputs = model(**inputs)
-                    return outputs.last_hidden_state.mean(dim=1).squeeze().detach().numpy().tolist()
-
-                self.embedding_model = embed_text
+                model = AutoModel.from_pretrained(
+                    self.embedding_model_path,
+                    torch_dtype=self.torch_dtype
+                ).to(self.device).eval()
+                device = self.device
+                if device == 'cpu':
+                    # A single forward pass at a time: intra-op threads do the work
+                    try:
+                        torch.set_num_interop_threads(1)
+                    except RuntimeError:
+                        pass  # Only settable before torch runs any parallel work
+
+                def embed_texts(texts: List[str]) -> np.ndarray:
+                    inputs = tokenizer(texts, return_tensors="pt", padding=True,
+                                       truncation=True, max_length=512).to(device)
+                    with torch.inference_mode():
+                        outputs = model(**inputs)
+                        # Pool in FP32: summing BF16/FP16 hidden states loses precision
+                        hidden = outputs.last_hidden_state.to(torch.float32)
+                        # Mean-pool over real tokens only so padding does not skew shorter texts
+                        mask = inputs["attention_mask"].unsqueeze(-1).to(torch.float32)
+                        summed = (hidden * mask).sum(dim=1)
+                        pooled = summed / mask.sum(dim=1).clamp(min=1)
+                        # Unit-normalize so inner product equals cosine similarity
+                        pooled = torch.nn.functional.normalize(pooled, dim=-1)
+                    return pooled.cpu().numpy()
+
+                self.embedding_model = embed_texts
 
             except ImportError:
                 # print("Warning: Neither langchain-huggingface nor transformers available.")
                 # print("Falling back to sentence-transformers")
                 try:
                     from sentence_transformers import SentenceTransformer
-                    self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+                    self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2", device=self.device)
                     self.use_langchain = True  # sentence-transformers uses .encode() method
                 except ImportError:
                     raise ImportError("No embedding library available. Install langchain-huggingface, transformers, or sentence-transformers.")
 
-    def _encode_text(self, text: str) -> List[float]:
-        """Encode text using the appropriate embedding model."""
+    def _encode_text(self, text: str) -> np.ndarray:
+        """Encode text into a 1-D float32 vector using the appropriate embedding model."""
         if self.use_langchain:
             if hasattr(self.embedding_model, 'embed_query'):
-                return self.embedding_model.embed_query(text)
+                return np.asarray(self.embedding_model.embed_query(text), dtype=np.float32)
+            else:  # sentence-transformers
+                return self.embedding_model.encode([text], normalize_embeddings=True)[0].astype(np.float32, copy=False)
+        else:
+            return self.embedding_model([text])[0]
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Encode a search query, reusing the cached embedding for repeated queries."""
+        key = query.strip()
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return cached
+
+        embedding = self._encode_text(key)
+        if self.query_cache_size > 0:
+            self._query_cache[key] = embedding
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def _encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Encode several search queries, batching the ones missing from the cache."""
+        keys = [query.strip() for query in queries]
+        missing = list(dict.fromkeys(key for key in keys if key not in self._query_cache))
+        fresh = dict(zip(missing, self._encode_texts(missing)))
+
+        embeddings = []
+        for key in keys:
+            if key in fresh:
+                embedding = fresh[key]
+                if self.query_cache_size > 0:
+                    self._query_cache[key] = embedding
+            else:
+                embedding = self._query_cache[key]
+                self._query_cache.move_to_end(key)
+            embeddings.append(embedding)
+
+        while len(self._query_cache) > self.query_cache_size:
+            self._query_cache.popitem(last=False)
+        return embeddings
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts in a single model call into an (N, D) float32 matrix."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.use_langchain:
+            if hasattr(self.embedding_model, 'embed_documents'):
+                return np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
             else:  # sentence-transformers
-                return self.embedding_model.encode([text])[0].tolist()
+                return self.embedding_model.encode(texts, normalize_embeddings=True).astype(np.float32, copy=False)
         else:
-            return self.embedding_model(text)
+            return self.embedding_model(texts)
+
+    def _embed_all(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into an (N, D) float32 matrix, reusing persisted embeddings."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if not self.use_embedding_cache:
+            return self._embed_batches(texts)
+
+        if self._embedding_cache is None:
+            # Vectors are unit-normalized and differ per backend; the suffixes keep
+            # unnormalized or differently quantized entries from matching
+            self._embedding_cache = EmbeddingCache(self.embedding_cache_path,
+                                                   f"{self.embedding_model_path}|normalized|{self.embedding_backend}")
+        cache = self._embedding_cache
+
+        hashes = [cache.hash_text(text) for text in texts]
+        vectors = cache.get_many(hashes)
+        missing = {text_hash: text for text_hash, text in zip(hashes, texts) if text_hash not in vectors}
+        print(f"  ♻️  Reusing {len(texts) - len(missing)} cached embeddings, generating {len(missing)}")
+
+        if missing:
+            fresh = self._embed_batches(list(missing.values()))
+            cache.put_many(zip(missing, fresh))
+            vectors.update(zip(missing, fresh))
+
+        return np.vstack([vectors[text_hash] for text_hash in hashes])
+
+    def _embed_batches(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in embedding_batch_size batches into an (N, D) float32 matrix.
+
+        Texts are batched in order of length so each batch pads to a similar
+        token count; rows come back in the original order.
+        """
+        batch_size = self.embedding_batch_size
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            batches.append(self._encode_texts(batch))
+            print(f"  📊 Progress: {min(start + batch_size, len(texts))}/{len(texts)} embeddings generated")
+
+        stacked = np.vstack(batches)
+        embeddings = np.empty_like(stacked)
+        embeddings[order] = stacked
+        return embeddings
 
     def _setup_client(self) -> None:
         """Set up Milvus client using MilvusClient (simpler approach)."""
@@ -91,24 +416,61 @@ class MilvusVectorStore:
             print(f"Warning: Failed to connect to Milvus: {e}")
             self.client = None
 
-    def _create_collection_if_needed(self) -> None:
-        """Create collection if it doesn't exist."""
+    def _create_collection_if_needed(self, dimension: Optional[int] = None) -> None:
+        """Create collection if it doesn't exist.
+
+        Every embedding path returns unit-length vectors, so the collection
+        uses the inner product (IP) metric, which then equals cosine
+        similarity without Milvus normalizing vectors on insert and search.
+        ``dimension`` is the embedding size when already known; otherwise a
+        test vector is encoded to find it.
+        """
         if self.client is None:
             return
 
         if not self.client.has_collection(collection_name=self.collection_name):
-            # Get embedding dimension from a test vector
-            test_vector = self._encode_text("test")
-
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                dimension=len(test_vector),
-                metric_type="COSINE"
-            )
-            print(f"Created collection: {self.collection_name}")
+            if dimension is None:
+                dimension = len(self._encode_text("test"))
+
+            if self.vector_dtype == "float16":
+                # The quick-setup helper only creates FLOAT_VECTOR fields
+                from pymilvus import DataType
+
+                schema = self.client.create_schema(auto_id=False, enable_dynamic_field=True)
+                schema.add_field(field_name="id", datatype=DataType.INT64, is_primary=True)
+                schema.add_field(field_name="vector", datatype=DataType.FLOAT16_VECTOR,
+                                 dim=dimension)
+                index_params = self.client.prepare_index_params()
+                index_params.add_index(field_name="vector", index_type="AUTOINDEX", metric_type="IP")
+
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    schema=schema,
+                    index_params=index_params
+                )
+            else:
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    dimension=dimension,
+                    metric_type="IP"
+                )
+            self._collection_vector_dtype = self.vector_dtype
+            print(f"Created collection: {self.collection_name} ({self.vector_dtype} vectors)")
         else:
             print(f"Collection {self.collection_name} already exists")
 
+    def _get_collection_vector_dtype(self) -> str:
+        """Return "float16" or "float32" for the vector field of the existing collection."""
+        if self._collection_vector_dtype is None:
+            from pymilvus import DataType
+
+            self._collection_vector_dtype = "float32"
+            description = self.client.describe_collection(collection_name=self.collection_name)
+            for field in description.get("fields", []):
+                if field.get("name") == "vector" and field.get("type") == DataType.FLOAT16_VECTOR:
+                    self._collection_vector_dtype = "float16"
+        return self._collection_vector_dtype
+
     def store_chunks(self, chunks: List[Chunk]) -> None:
         """Store chunks in the vector database."""
         if not chunks:
@@ -118,108 +480,154 @@ class MilvusVectorStore:
             self._store_chunks_fallback(chunks)
             return
 
-        # Create collection if needed
-        print(f"🗄️  Setting up Milvus collection: {self.collection_name}")
-        self._create_collection_if_needed()
-
-        # Generate embeddings for all chunks
+        # Generate embeddings for all chunks up front as one float32 matrix
         print(f"🧠 Generating embeddings for {len(chunks)} chunks...")
-        embeddings = []
-        for i, chunk in enumerate(chunks, 1):
-            if i % 10 == 0 or i == len(chunks):
-                print(f"  📊 Progress: {i}/{len(chunks)} embeddings generated")
-
-            # Use section_title (short summary) for embedding if available, otherwise use content
-            text_for_embedding = (chunk.metadata.section_title
-                                 if chunk.metadata.section_title and len(chunk.metadata.section_title) > 30
-                                 else chunk.content)
-
-            embedding = self._encode_text(text_for_embedding)
-            embeddings.append(embedding)
+        # Use section_title (short summary) for embedding if available, otherwise use content
+        texts_for_embedding = [
+            chunk.metadata.section_title
+            if chunk.metadata.section_title and len(chunk.metadata.section_title) > 30
+            else chunk.content
+            for chunk in chunks
+        ]
+        embeddings = self._embed_all(texts_for_embedding)
+
+        # Create collection if needed, sized from the embeddings just computed
+        print(f"🗄️  Setting up Milvus collection: {self.collection_name}")
+        self._create_collection_if_needed(dimension=embeddings.shape[1])
+
+        if self._get_collection_vector_dtype() == "float16":
+            # pymilvus takes float16 numpy rows for FLOAT16_VECTOR fields
+            embeddings = embeddings.astype(np.float16)
+
+        # Insert in bounded batches; rows of the matrix are passed as numpy
+        # arrays so no per-element Python floats are materialized
+        print(f"💾 Inserting {len(chunks)} records into Milvus...")
+        batch_size = self.insert_batch_size
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+
+            # Build each field as a column, in schema order. MilvusClient.insert
+            # only takes row dicts, so the columns are zipped into rows that
+            # share one key tuple instead of being built field by field.
+            columns = (
+                range(start, start + len(batch)),  # Numeric IDs for MilvusClient
+                embeddings[start:start + len(batch)],
+                [chunk.id for chunk in batch],  # Original chunk ID as metadata
+                [chunk.content for chunk in batch],
+                [chunk.file_path for chunk in batch],
+                [chunk.start_line for chunk in batch],
+                [chunk.end_line for chunk in batch],
+                [chunk.chunk_type for chunk in batch],
+                [_json_dumps(chunk.metadata.code_elements) for chunk in batch],
+                [chunk.metadata.section_title or "" for chunk in batch],
+            )
+            data = [dict(zip(_INSERT_FIELDS, row)) for row in zip(*columns)]
 
-        # Prepare data for insertion (using simpler MilvusClient format)
-        data = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            data.append({
-                "id": i,  # Use numeric ID for MilvusClient
-                "vector": embedding,
-                "chunk_id": chunk.id,  # Store original chunk ID as metadata
-                "content": chunk.content,
-                "file_path": chunk.file_path,
-                "start_line": chunk.start_line,
-                "end_line": chunk.end_line,
-                "chunk_type": chunk.chunk_type,
-                "code_elements": json.dumps(chunk.metadata.code_elements),
-                "section_title": chunk.metadata.section_title or ""
-            })
-
-        # Insert data using MilvusClient
-        print(f"💾 Inserting {len(data)} records into Milvus...")
-        self.client.insert(
-            collection_name=self.collection_name,
-            data=data
-        )
+            # Insert data using MilvusClient
+            self.client.insert(
+                collection_name=self.collection_name,
+                data=data
+            )
 
         print(f"✅ Successfully stored {len(chunks)} chunks in Milvus collection: {self.collection_name}")
 
-    def semantic_search(self, query: str, top_k: int = 10) -> List[ChunkResult]:
+    def semantic_search(self, query: str, top_k: int = 10,
+                        search_params: Optional[Dict[str, Any]] = None) -> List[ChunkResult]:
         """Perform semantic search for similar chunks."""
         if self.client is None:
             return self._semantic_search_fallback(query, top_k)
 
-        # Generate query embedding
-        query_embedding = self._encode_text(query)
+        return self.semantic_search_batch([query], top_k, search_params)[0]
+
+    def semantic_search_batch(self, queries: List[str], top_k: int = 10,
+                              search_params: Optional[Dict[str, Any]] = None) -> List[List[ChunkResult]]:
+        """Perform semantic search for several queries with one embedding call and one Milvus search.
+
+        ``search_params`` holds index parameters such as ``ef`` (HNSW) or ``nprobe`` (IVF).
+        """
+        if not queries:
+            return []
+
+        if self.client is None:
+            return self._semantic_search_fallback_batch(queries, top_k)
 
-        # Perform search using MilvusClient
+        # Generate query embeddings
+        query_embeddings = self._encode_queries(queries)
+        if self._get_collection_vector_dtype() == "float16":
+            query_embeddings = list(np.asarray(query_embeddings, dtype=np.float16))
+
+        # Perform search using MilvusClient; Milvus returns one hit list per query vector
         results = self.client.search(
             collection_name=self.collection_name,
-            data=[query_embedding],
+            data=query_embeddings,
             limit=top_k,
-            output_fields=["chunk_id", "content", "file_path", "start_line", "end_line",
-                          "chunk_type", "code_elements", "section_title"]
+            # The metric comes from the collection's index (IP, or COSINE for older collections)
+            search_params={"params": search_params or {}},
+            output_fields=list(_RESULT_FIELDS)
         )
 
-        # Convert results to ChunkResult objects
-        chunk_results = []
-        for result in results[0]:  # results[0] contains the list of matches
-            entity = result["entity"]
-
-            # Parse code elements from JSON
-            try:
-                code_elements = json.loads(entity.get("code_elements", "[]"))
-            except json.JSONDecodeError:
-                code_elements = []
-
-            metadata = ChunkMetadata(
-                code_elements=code_elements,
-                language="cangjie",
-                section_title=entity.get("section_title") or None
-            )
-
-            # Convert distance to similarity score (for COSINE metric, higher is better)
-            # For COSINE distance in Milvus, smaller distance = more similar
-            similarity_score = 1.0 - result["distance"]
-
-            chunk_result = ChunkResult(
-                id=entity.get("chunk_id", str(result["id"])),
-                content=entity.get("content", ""),
-                score=similarity_score,
-                metadata=metadata
-            )
-            chunk_results.append(chunk_result)
+        return [self._hits_to_chunk_results(hits) for hits in results]
+
+    def _hits_to_chunk_results(self, hits) -> List[ChunkResult]:
+        """Convert the Milvus hits for one query to ChunkResult objects."""
+        # For IP (and COSINE) Milvus reports the similarity itself, higher is better
+        return [
+            self._entity_to_chunk_result(result["entity"], result["distance"], result["id"])
+            for result in hits
+        ]
+
+    @staticmethod
+    def _entity_to_chunk_result(entity: Dict[str, Any], score: float, row_id: Any) -> ChunkResult:
+        """Build a ChunkResult from the output fields of a Milvus row."""
+        # Parse code elements from JSON; names and titles repeat across
+        # hits, so they are interned like the ones built at indexing time
+        try:
+            code_elements = [sys.intern(name) for name in _json_loads(entity.get("code_elements", "[]"))]
+        except json.JSONDecodeError:
+            code_elements = []
+
+        section_title = entity.get("section_title")
+        metadata = ChunkMetadata(
+            code_elements=code_elements,
+            language="cangjie",
+            section_title=sys.intern(section_title) if section_title else None
+        )
 
-        return chunk_results
+        return ChunkResult(
+            id=entity.get("chunk_id", str(row_id)),
+            content=entity.get("content", ""),
+            score=score,
+            metadata=metadata
+        )
 
     def get_chunk_by_id(self, chunk_id: str) -> Optional[ChunkResult]:
         """Retrieve a specific chunk by ID."""
+        results = self.get_chunks_by_ids([chunk_id])
+        return results[0] if results else None
+
+    def get_chunks_by_ids(self, chunk_ids: List[str], score: float = 1.0) -> List[ChunkResult]:
+        """Retrieve several chunks by ID, in the order given; unknown IDs are skipped.
+
+        A lookup by ID measures no similarity, so every result carries ``score``.
+        With Milvus this is one filtered query per ``ID_QUERY_BATCH`` IDs
+        instead of a round trip per chunk.
+        """
         if self.client is None:
-            return self._get_chunk_by_id_fallback(chunk_id)
+            chunks = (self._get_chunk_by_id_fallback(chunk_id, score) for chunk_id in chunk_ids)
+            return [chunk for chunk in chunks if chunk]
 
-        # Note: MilvusClient doesn't support direct query by custom field
-        # This is a limitation of the simpler client approach
-        # In practice, you might need to maintain a mapping or use the full pymilvus approach
-        # For now, we'll return None and rely on fallback
-        return self._get_chunk_by_id_fallback(chunk_id)
+        found = {}
+        for start in range(0, len(chunk_ids), self.ID_QUERY_BATCH):
+            batch = chunk_ids[start:start + self.ID_QUERY_BATCH]
+            rows = self.client.query(
+                collection_name=self.collection_name,
+                filter=f"chunk_id in {json.dumps(batch)}",
+                output_fields=list(_RESULT_FIELDS)
+            )
+            for row in rows:
+                chunk = self._entity_to_chunk_result(row, score, row.get("id"))
+                found[chunk.id] = chunk
+        return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
 
     def get_all_chunk_ids(self) -> List[str]:
         """Get all chunk IDs in the collection."""
@@ -230,6 +638,17 @@ class MilvusVectorStore:
         # Return fallback storage keys if available
         return list(self.fallback_storage.keys()) if hasattr(self, 'fallback_storage') else []
 
+    def prefetch(self) -> None:
+        """Ask the OS to read the database file into the page cache ahead of the first search."""
+        db_file = Path(self.db_path)
+        if not db_file.is_file() or not hasattr(os, 'posix_fadvise'):
+            return
+        fd = os.open(db_file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
     def delete_collection(self) -> None:
         """Delete the entire collection."""
         if self.client is not None:
@@ -242,53 +661,108 @@ class MilvusVectorStore:
 
     # Fallback methods for when Milvus is not available
     def _store_chunks_fallback(self, chunks: List[Chunk]) -> None:
-        """Fallback storage in memory when Milvus is not available."""
+        """Fallback storage in memory when Milvus is not available.
+
+        Embeddings are kept as unit rows of one contiguous ``vector_dtype``
+        matrix that grows by doubling, so searches scan it without repacking;
+        re-stored chunk IDs overwrite their row in place.
+        """
         if not hasattr(self, 'fallback_storage'):
             self.fallback_storage = {}
-            self.fallback_embeddings = {}
+            self._fallback_ids: List[str] = []
+            self._fallback_rows: Dict[str, int] = {}
+            self._fallback_vectors: Optional[np.ndarray] = None
 
-        # Generate embeddings
+        # Generate embeddings, stored as unit rows so scoring is a plain dot product
+        embeddings = self._embed_all([chunk.content for chunk in chunks])
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+        rows = []
         for chunk in chunks:
-            embedding = self._encode_text(chunk.content)
             self.fallback_storage[chunk.id] = chunk
-            self.fallback_embeddings[chunk.id] = np.array(embedding)
+            row = self._fallback_rows.get(chunk.id)
+            if row is None:
+                row = self._fallback_rows[chunk.id] = len(self._fallback_ids)
+                self._fallback_ids.append(chunk.id)
+            rows.append(row)
+
+        count = len(self._fallback_ids)
+        vectors = self._fallback_vectors
+        if vectors is None or vectors.shape[0] < count:
+            capacity = max(count, 2 * (0 if vectors is None else vectors.shape[0]))
+            grown = np.empty((capacity, embeddings.shape[1]), dtype=self.vector_dtype)
+            if vectors is not None:
+                grown[:vectors.shape[0]] = vectors
+            self._fallback_vectors = vectors = grown
+        vectors[rows] = embeddings
 
         print(f"Stored {len(chunks)} chunks in fallback storage")
 
+    def _get_fallback_matrix(self) -> Tuple[List[str], np.ndarray]:
+        """The fallback chunk IDs and the (N, D) matrix of their unit embeddings.
+
+        Rows are stored as ``vector_dtype``, so "float16" halves the memory
+        the scan streams through, as it does for Milvus collections.
+        """
+        return self._fallback_ids, self._fallback_vectors[:len(self._fallback_ids)]
+
+    @classmethod
+    def _score_rows(cls, query_matrix: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """Inner products of FP32 queries against stored rows, widening FP16 rows per block."""
+        if matrix.dtype == np.float32:
+            return query_matrix @ matrix.T
+        # NumPy has no FP16 BLAS; upcast bounded blocks so the FP32 copy stays cache sized
+        block = cls.FALLBACK_SCORE_BLOCK
+        scores = np.empty((len(query_matrix), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), block):
+            rows = matrix[start:start + block].astype(np.float32)
+            np.matmul(query_matrix, rows.T, out=scores[:, start:start + block])
+        return scores
+
     def _semantic_search_fallback(self, query: str, top_k: int = 10) -> List[ChunkResult]:
         """Fallback semantic search using in-memory storage."""
-        if not hasattr(self, 'fallback_storage') or not self.fallback_storage:
-            return []
-
-        # Generate query embedding
-        query_embedding = np.array(self._encode_text(query))
+        return self._semantic_search_fallback_batch([query], top_k)[0]
 
-        # Calculate similarities
-        similarities = []
-        for chunk_id, chunk_embedding in self.fallback_embeddings.items():
-            similarity = np.dot(query_embedding, chunk_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(chunk_embedding)
-            )
-            similarities.append((chunk_id, similarity))
-
-        # Sort by similarity and take top_k
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        top_similarities = similarities[:top_k]
+    def _semantic_search_fallback_batch(self, queries: List[str], top_k: int = 10) -> List[List[ChunkResult]]:
+        """Fallback brute-force search: one matrix product scores every chunk for every query."""
+        if not hasattr(self, 'fallback_storage') or not self.fallback_storage:
+            return [[] for _ in queries]
+
+        chunk_ids, matrix = self._get_fallback_matrix()
+        query_matrix = np.array(self._encode_queries(queries), dtype=np.float32)
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        query_matrix /= np.where(norms == 0, 1, norms)
+        # Cosine similarity of every query against every chunk
+        scores = self._score_rows(query_matrix, matrix)
+
+        top_k = min(top_k, len(chunk_ids))
+        if top_k <= 0:
+            return [[] for _ in queries]
+        # Partial selection of every query's top_k in one call, then order only those
+        top = np.argpartition(scores, len(chunk_ids) - top_k, axis=1)[:, -top_k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
 
-        # Convert to ChunkResult objects
         results = []
-        for chunk_id, similarity in top_similarities:
-            chunk = self.fallback_storage[chunk_id]
-            results.append(ChunkResult(
-                id=chunk_id,
-                content=chunk.content,
-                score=similarity,
-                metadata=chunk.metadata
-            ))
+        for indices, row_scores in zip(top.tolist(), top_scores.tolist()):
+            query_results = []
+            for index, score in zip(indices, row_scores):
+                chunk_id = chunk_ids[index]
+                chunk = self.fallback_storage[chunk_id]
+                query_results.append(ChunkResult(
+                    id=chunk_id,
+                    content=chunk.content,
+                    score=score,
+                    metadata=chunk.metadata
+                ))
+            results.append(query_results)
 
         return results
 
-    def _get_chunk_by_id_fallback(self, chunk_id: str) -> Optional[ChunkResult]:
+    def _get_chunk_by_id_fallback(self, chunk_id: str, score: float = 1.0) -> Optional[ChunkResult]:
         """Fallback method to get chunk by ID."""
         if not hasattr(self, 'fallback_storage') or chunk_id not in self.fallback_storage:
             return None
@@ -297,6 +771,6 @@ class MilvusVectorStore:
         return ChunkResult(
             id=chunk_id,
             content=chunk.content,
-            score=1.0,
+            score=score,
             metadata=chunk.metadata
         )
\ No newline at end of file
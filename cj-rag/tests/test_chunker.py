@@ -0,0 +1,40 @@
+"""Tests for the markdown chunker."""
+
+import pickle
+
+from src.chunker import MarkdownChunker
+
+
+CONTENT = """# Title
+
+Intro paragraph that is long enough to survive the minimum chunk size filter.
+
+## Section
+
+```cangjie
+func main() {
+    println("hello")
+}
+```
+
+More text so this section is kept as its own chunk as well.
+"""
+
+
+def test_chunker_pickles_after_chunking():
+    # Worker pools pickle the chunker; it must not hold per-call state such as itertools counters
+    chunker = MarkdownChunker(min_chunk_size=10, progress=False)
+    chunks = chunker.chunk_content(CONTENT, "docs/example.md")
+
+    restored = pickle.loads(pickle.dumps(chunker))
+
+    assert [c.id for c in restored.chunk_content(CONTENT, "docs/example.md")] == [c.id for c in chunks]
+
+
+def test_chunk_ids_restart_per_call():
+    chunker = MarkdownChunker(min_chunk_size=10, progress=False)
+    first = chunker.chunk_content(CONTENT, "docs/example.md")
+    second = chunker.chunk_content(CONTENT, "docs/example.md")
+
+    assert len(first) == 2
+    assert [c.id for c in first] == [c.id for c in second]
@@ -7,22 +7,44 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+import asyncio
 import sqlite3
 import json
-import uuid
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import secrets
 from datetime import datetime
 import uvicorn
 import logging
 import os
 from pathlib import Path
 
+# Use orjson for JSON responses and stored steps when it is installed
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj)
+
+    _json_loads = json.loads
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
 # Data models
 class Message(BaseModel):
     role: str  # "system", "user", "assistant", "function", etc.
@@ -30,24 +52,87 @@ class Message(BaseModel):
     image: Optional[str] = None
     reason: Optional[str] = None
 
+
 class FixSummary(BaseModel):
     content: str
 
+
 class AgentChatRound(BaseModel):
     question: Message
     answer: Message
     steps: List[Message]
 
+
+def new_record_id() -> str:
+    """Random 128-bit record ID as 32 hex characters.
+
+    Hex-encodes os.urandom directly instead of building a uuid.UUID, about
+    4x cheaper per record; stored IDs are opaque strings either way.
+    """
+    return secrets.token_hex(16)
+
+
 # Lightweight data server
 class SimpleDataServer:
+    FIX_SUMMARY_INSERT = """
+        INSERT INTO fix_summaries (id, content, timestamp)
+        VALUES (?, ?, ?)
+    """
+    CHAT_ROUND_INSERT = """
+        INSERT INTO agent_chat_rounds (id, query, answer, steps, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    # Tables whose row counts are maintained in the stats table
+    COUNTED_TABLES = ("fix_summaries", "agent_chat_rounds")
+    # Background writer: seconds to wait for more rows, rows per transaction,
+    # and queued rows beyond which inserts run synchronously
+    WRITE_FLUSH_INTERVAL = 0.005
+    WRITE_BATCH_SIZE = 500
+    MAX_PENDING_WRITES = 10000
+    # Seconds before retrying a flush that failed, e.g. on "database is locked"
+    WRITE_RETRY_DELAY = 1.0
+
+    # Recently read records kept for repeated detail views
+    RECORD_CACHE_SIZE = 1024
+
     def __init__(self, db_path: str = "cj_data.db"):
         self.db_path = db_path
+        # One reused connection per thread instead of a connect per call
+        self._local = threading.local()
+        # Inserts waiting for the background writer, set while run_writer is active
+        self._pending_writes: List[Tuple[str, tuple]] = []
+        self._write_ready: Optional[asyncio.Event] = None
+        # LRU of records read by ID, keyed by (table, id)
+        self._record_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = (
+            OrderedDict()
+        )
         self.init_database()
 
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's database connection, opening it on first use.
+
+        Use it as ``with server.connection() as conn:``; the block commits
+        on success and rolls back on error, and the connection stays open.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            # WAL lets readers proceed while a write is in progress; NORMAL
+            # sync is durable across application crashes under WAL
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA mmap_size = 268435456")
+            self._local.conn = conn
+        return conn
+
     def init_database(self):
         """Initialize SQLite database"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
+        with self.connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS fix_summaries (
                     id TEXT PRIMARY KEY,
@@ -67,120 +152,317 @@ class SimpleDataServer:
             """)
 
             # Create indexes to improve query performance
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_fix_summaries_timestamp ON fix_summaries(timestamp)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_chat_rounds_timestamp ON agent_chat_rounds(timestamp)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_fix_summaries_timestamp"
+                " ON fix_summaries(timestamp)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_chat_rounds_timestamp"
+                " ON agent_chat_rounds(timestamp)"
+            )
+
+            # Row counts kept up to date by triggers, so pages read them
+            # instead of scanning the tables with COUNT(*)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    table_name TEXT PRIMARY KEY,
+                    n INTEGER NOT NULL
+                )
+            """)
+            for table in self.COUNTED_TABLES:
+                # Seed from the existing rows the first time only
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO stats (table_name, n)
+                    SELECT '{table}', COUNT(*) FROM {table}
+                """)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_count_insert
+                    AFTER INSERT ON {table}
+                    BEGIN UPDATE stats SET n = n + 1 WHERE table_name = '{table}'; END
+                """)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_count_delete
+                    AFTER DELETE ON {table}
+                    BEGIN UPDATE stats SET n = n - 1 WHERE table_name = '{table}'; END
+                """)
 
             conn.commit()
             logger.info("Database initialization completed")
 
-
     def create_fix_summary(self, summary: FixSummary) -> str:
-        """Create fix summary"""
-        summary_id = str(uuid.uuid4())
+        """Create fix summary; the row may still be queued, see _write"""
+        summary_id = new_record_id()
         timestamp = datetime.now().astimezone().isoformat()
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO fix_summaries (id, content, timestamp)
-                VALUES (?, ?, ?)
-            """, (
-                summary_id,
-                summary.content,
-                timestamp
-            ))
-            conn.commit()
+        self._write(self.FIX_SUMMARY_INSERT, (summary_id, summary.content, timestamp))
 
         logger.info(f"Created fix summary: {summary_id}")
         return summary_id
 
     def log_agent_chat_round(self, chat_round: AgentChatRound) -> str:
-        """Log agent chat round"""
-        chat_round_id = str(uuid.uuid4())
+        """Log agent chat round; the row may still be queued, see _write"""
+        chat_round_id = new_record_id()
         timestamp = datetime.now().astimezone().isoformat()
 
         # Convert steps list to JSON string
-        steps_json = json.dumps([step.dict() for step in chat_round.steps])
+        steps_json = _json_dumps([step.model_dump() for step in chat_round.steps])
 
         # Extract question and answer content for query and answer fields
         query_content = chat_round.question.content
         answer_content = chat_round.answer.content
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT INTO agent_chat_rounds (id, query, answer, steps, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                chat_round_id,
-                query_content,
-                answer_content,
-                steps_json,
-                timestamp
-            ))
-            conn.commit()
+        self._write(
+            self.CHAT_ROUND_INSERT,
+            (chat_round_id, query_content, answer_content, steps_json, timestamp),
+        )
 
         logger.info(f"Logged agent chat round: {chat_round_id}")
         return chat_round_id
 
+    def _write(self, sql: str, params: tuple) -> None:
+        """Queue an insert for the background writer, or run it now without one.
+
+        Queued rows are written at most once: callers get their record ID
+        before the row is committed, so a crash or kill during the flush
+        interval or a retry pause loses it. Reads flush the queue first, so a
+        returned ID is always readable while the process is alive.
+        """
+        if (
+            self._write_ready is None
+            or len(self._pending_writes) >= self.MAX_PENDING_WRITES
+        ):
+            with self.connection() as conn:
+                conn.execute(sql, params)
+            return
+        self._pending_writes.append((sql, params))
+        self._write_ready.set()
+
+    def flush_writes(self) -> None:
+        """Insert all queued rows, one executemany per statement, one commit per batch.
+
+        Rows leave the queue only once committed. If a batch fails because of a
+        bad row, its rows are retried one by one and only the failing rows are
+        dropped; an OperationalError such as "database is locked" leaves the
+        uncommitted rows queued and is raised.
+        """
+        while self._pending_writes:
+            batch = self._pending_writes[: self.WRITE_BATCH_SIZE]
+            rows_by_sql: Dict[str, List[tuple]] = {}
+            for sql, params in batch:
+                rows_by_sql.setdefault(sql, []).append(params)
+            try:
+                with self.connection() as conn:
+                    for sql, rows in rows_by_sql.items():
+                        conn.executemany(sql, rows)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error:
+                self._insert_rows_singly(batch)
+            else:
+                del self._pending_writes[: len(batch)]
+
+    def _insert_rows_singly(self, batch: List[Tuple[str, tuple]]) -> None:
+        """Insert the queued rows at the head of the queue one transaction each"""
+        for sql, params in batch:
+            try:
+                with self.connection() as conn:
+                    conn.execute(sql, params)
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error as e:
+                logger.error(f"Dropped queued row that failed to insert: {e}")
+            del self._pending_writes[0]
+
+    async def run_writer(self) -> None:
+        """Coalesce queued inserts, flushing them every WRITE_FLUSH_INTERVAL seconds"""
+        self._write_ready = asyncio.Event()
+        try:
+            while True:
+                await self._write_ready.wait()
+                # Let a burst of requests queue up behind the first one
+                await asyncio.sleep(self.WRITE_FLUSH_INTERVAL)
+                self._write_ready.clear()
+                try:
+                    self.flush_writes()
+                except Exception as e:
+                    # The rows stay queued; try again after a pause
+                    logger.error(f"Failed to flush queued writes, retrying: {e}")
+                    await asyncio.sleep(self.WRITE_RETRY_DELAY)
+                    self._write_ready.set()
+        finally:
+            self._write_ready = None
+            try:
+                self.flush_writes()
+            except Exception:
+                dropped = len(self._pending_writes)
+                logger.exception(f"Final flush failed, dropping {dropped} queued rows")
+
+    def count_rows(self) -> Dict[str, int]:
+        """Row count of each counted table"""
+        self.flush_writes()
+        with self.connection() as conn:
+            return {
+                row[0]: row[1]
+                for row in conn.execute("SELECT table_name, n FROM stats")
+            }
+
     def get_fix_summary(self, summary_id: str) -> Optional[Dict[str, Any]]:
         """Get fix summary"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            result = conn.execute("""
+        key = ("fix_summaries", summary_id)
+        cached = self._cached_record(key)
+        if cached is not None:
+            return cached
+
+        self.flush_writes()
+        with self.connection() as conn:
+            result = conn.execute(
+                """
                 SELECT id, content, timestamp
                 FROM fix_summaries WHERE id = ?
-            """, (summary_id,)).fetchone()
+            """,
+                (summary_id,),
+            ).fetchone()
 
             if result:
-                return dict(result)
+                return self._cache_record(key, dict(result))
             return None
 
     def get_agent_chat_round(self, chat_round_id: str) -> Optional[Dict[str, Any]]:
         """Get agent chat round record"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            result = conn.execute("""
+        key = ("agent_chat_rounds", chat_round_id)
+        cached = self._cached_record(key)
+        if cached is not None:
+            return cached
+
+        self.flush_writes()
+        with self.connection() as conn:
+            result = conn.execute(
+                """
                 SELECT id, query, answer, steps, timestamp
                 FROM agent_chat_rounds WHERE id = ?
-            """, (chat_round_id,)).fetchone()
+            """,
+                (chat_round_id,),
+            ).fetchone()
 
             if result:
                 data = dict(result)
                 # Parse steps JSON
-                data['steps'] = json.loads(data['steps'])
-                return data
+                data["steps"] = _json_loads(data["steps"])
+                return self._cache_record(key, data)
             return None
 
-    def list_fix_summary(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    def _cached_record(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Copy of a recently read record, or None when it is not cached"""
+        record = self._record_cache.get(key)
+        if record is None:
+            return None
+        self._record_cache.move_to_end(key)
+        return self._copy_record(record)
+
+    def _cache_record(
+        self, key: Tuple[str, str], record: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Remember a read record; records are never updated, so entries stay fresh"""
+        self._record_cache[key] = record
+        if len(self._record_cache) > self.RECORD_CACHE_SIZE:
+            self._record_cache.popitem(last=False)
+        return self._copy_record(record)
+
+    @staticmethod
+    def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a record so callers cannot modify the cached one.
+
+        Steps are flat message dicts with scalar values, so copying the list
+        and each step is a full copy without the cost of copy.deepcopy.
+        """
+        copy = dict(record)
+        steps = copy.get("steps")
+        if isinstance(steps, list):
+            copy["steps"] = [
+                dict(step) if isinstance(step, dict) else step for step in steps
+            ]
+        return copy
+
+    def list_fix_summary(
+        self, limit: int = 50, offset: int = 0
+    ) -> List[Dict[str, Any]]:
         """List fix summaries"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            result = conn.execute("""
+        self.flush_writes()
+        with self.connection() as conn:
+            # Page through the timestamp index alone and fetch only the
+            # selected rows, so skipped OFFSET rows never load their content
+            result = conn.execute(
+                """
                 SELECT id, content, timestamp
                 FROM fix_summaries
-                ORDER BY timestamp DESC LIMIT ? OFFSET ?
-            """, (limit, offset)).fetchall()
+                WHERE rowid IN (
+                    SELECT rowid FROM fix_summaries
+                    ORDER BY timestamp DESC LIMIT ? OFFSET ?
+                )
+                ORDER BY timestamp DESC
+            """,
+                (limit, offset),
+            ).fetchall()
 
             return [dict(row) for row in result]
 
-    def list_agent_chat_round(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """List agent chat rounds"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            result = conn.execute("""
-                SELECT id, query, answer, steps, timestamp
+    def list_agent_chat_round(
+        self, limit: int = 50, offset: int = 0, include_steps: bool = True
+    ) -> List[Dict[str, Any]]:
+        """List agent chat rounds
+
+        With ``include_steps=False`` rows carry ``steps_count`` instead of the
+        parsed steps, counted by SQLite without decoding them in Python.
+        """
+        self.flush_writes()
+        steps_column = (
+            "steps" if include_steps else "json_array_length(steps) AS steps_count"
+        )
+        with self.connection() as conn:
+            # Same index-only paging as list_fix_summary
+            result = conn.execute(
+                f"""
+                SELECT id, query, answer, {steps_column}, timestamp
                 FROM agent_chat_rounds
-                ORDER BY timestamp DESC LIMIT ? OFFSET ?
-            """, (limit, offset)).fetchall()
+                WHERE rowid IN (
+                    SELECT rowid FROM agent_chat_rounds
+                    ORDER BY timestamp DESC LIMIT ? OFFSET ?
+                )
+                ORDER BY timestamp DESC
+            """,
+                (limit, offset),
+            ).fetchall()
 
             data_list = [dict(row) for row in result]
-            # Parse steps JSON
-            for data in data_list:
-                data['steps'] = json.loads(data['steps'])
+            if include_steps:
+                # Parse steps JSON
+                for data in data_list:
+                    data["steps"] = _json_loads(data["steps"])
             return data_list
 
+
 # Initialize server and database (respect DB_PATH environment variable)
 server = SimpleDataServer(os.getenv("DB_PATH", "cj_data.db"))
-app = FastAPI(title="Magic CLI Data Backend", version="2.0.0")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the batched insert writer for the lifetime of the app"""
+    writer = asyncio.create_task(server.run_writer())
+    yield
+    writer.cancel()
+    try:
+        await writer
+    except asyncio.CancelledError:
+        pass
+
+
+app = FastAPI(
+    title="Magic CLI Data Backend",
+    version="2.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
 
 # Set up static files and templates
 static_dir = Path(__file__).parent / "static"
@@ -215,7 +497,6 @@ async def create_fix_summary(summary: FixSummary):
         raise HTTPException(status_code=500, detail="Failed to create fix summary")
 
 
-
 @app.post("/api/agent-chat-round")
 async def log_agent_chat_round(chat_round: AgentChatRound):
     """Log agent chat round"""
@@ -226,13 +507,18 @@ async def log_agent_chat_round(chat_round: AgentChatRound):
         logger.error(f"Failed to log agent chat round: {e}")
         raise HTTPException(status_code=500, detail="Failed to log agent chat round")
 
+
 @app.get("/api/fix-summary/{summary_id}")
 async def get_fix_summary(summary_id: str):
-    """Get fix summary"""
+    """Get fix summary
+
+    Read endpoints return the response object directly, so rows go straight
+    to the JSON encoder without a jsonable_encoder pass.
+    """
     try:
         summary = server.get_fix_summary(summary_id)
         if summary:
-            return summary
+            return FastJSONResponse(summary)
         raise HTTPException(status_code=404, detail="Fix summary not found")
     except Exception as e:
         logger.error(f"Failed to get fix summary: {e}")
@@ -245,7 +531,7 @@ async def get_agent_chat_round(chat_round_id: str):
     try:
         chat_round = server.get_agent_chat_round(chat_round_id)
         if chat_round:
-            return chat_round
+            return FastJSONResponse(chat_round)
         raise HTTPException(status_code=404, detail="Agent chat round record not found")
     except Exception as e:
         logger.error(f"Failed to get agent chat round: {e}")
@@ -257,35 +543,42 @@ async def list_fix_summary_api(limit: int = 50, offset: int = 0):
     """List fix summaries (API endpoint)"""
     try:
         summaries = server.list_fix_summary(limit, offset)
-        return {"summaries": summaries, "limit": limit, "offset": offset}
+        return FastJSONResponse(
+            {"summaries": summaries, "limit": limit, "offset": offset}
+        )
     except Exception as e:
         logger.error(f"Failed to list fix summaries: {e}")
         raise HTTPException(status_code=500, detail="Failed to list fix summaries")
 
+
 @app.get("/api/agent-chat-round")
 async def list_agent_chat_round_api(limit: int = 50, offset: int = 0):
     """List agent chat rounds (API endpoint)"""
     try:
         chat_rounds = server.list_agent_chat_round(limit, offset)
-        return {"chat_rounds": chat_rounds, "limit": limit, "offset": offset}
+        return FastJSONResponse(
+            {"chat_rounds": chat_rounds, "limit": limit, "offset": offset}
+        )
     except Exception as e:
         logger.error(f"Failed to list agent chat rounds: {e}")
         raise HTTPException(status_code=500, detail="Failed to list agent chat rounds")
 
+
 @app.get("/health")
 async def health_check():
     """Health check"""
     return {"status": "healthy", "timestamp": datetime.now().astimezone().isoformat()}
 
+
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
     """Data dashboard"""
     try:
-        # Get basic statistics
-        with sqlite3.connect(server.db_path) as conn:
-            fix_count = conn.execute("SELECT COUNT(*) FROM fix_summaries").fetchone()[0]
-            agent_count = conn.execute("SELECT COUNT(*) FROM agent_chat_rounds").fetchone()[0]
-
+        # Get basic statistics, including rows still queued for the writer
+        counts = server.count_rows()
+        fix_count = counts["fix_summaries"]
+        agent_count = counts["agent_chat_rounds"]
+        with server.connection() as conn:
             # Get recent fix summaries
             recent_fixes = conn.execute("""
                 SELECT id, content, timestamp
@@ -300,17 +593,21 @@ async def dashboard(request: Request):
                 ORDER BY timestamp DESC LIMIT 5
             """).fetchall()
 
-        return templates.TemplateResponse("dashboard.html", {
-            "request": request,
-            "fix_count": fix_count,
-            "agent_count": agent_count,
-            "recent_fixes": recent_fixes,
-            "recent_agents": recent_agents
-        })
+        return templates.TemplateResponse(
+            "dashboard.html",
+            {
+                "request": request,
+                "fix_count": fix_count,
+                "agent_count": agent_count,
+                "recent_fixes": recent_fixes,
+                "recent_agents": recent_agents,
+            },
+        )
     except Exception as e:
         logger.error(f"Failed to load dashboard: {e}")
         return HTMLResponse(f"<h1>Error</h1><p>Failed to load dashboard: {e}</p>")
 
+
 @app.get("/fix-summaries", response_class=HTMLResponse)
 async def fix_summaries_page(request: Request, page: int = 1, limit: int = 20):
     """Fix summaries page"""
@@ -319,19 +616,21 @@ async def fix_summaries_page(request: Request, page: int = 1, limit: int = 20):
         summaries = server.list_fix_summary(limit, offset)
 
         # Get total count for pagination
-        with sqlite3.connect(server.db_path) as conn:
-            total = conn.execute("SELECT COUNT(*) FROM fix_summaries").fetchone()[0]
+        total = server.count_rows()["fix_summaries"]
 
         total_pages = (total + limit - 1) // limit
 
-        return templates.TemplateResponse("fix_summaries.html", {
-            "request": request,
-            "summaries": summaries,
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "total_pages": total_pages
-        })
+        return templates.TemplateResponse(
+            "fix_summaries.html",
+            {
+                "request": request,
+                "summaries": summaries,
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "total_pages": total_pages,
+            },
+        )
     except Exception as e:
         logger.error(f"Failed to load fix summaries page: {e}")
         return HTMLResponse(f"<h1>Error</h1><p>Failed to load page: {e}</p>")
@@ -342,22 +641,25 @@ async def agent_chat_round_page(request: Request, page: int = 1, limit: int = 20
     """Agent chat round page"""
     try:
         offset = (page - 1) * limit
-        chat_rounds = server.list_agent_chat_round(limit, offset)
+        # The page only shows how many steps each round has
+        chat_rounds = server.list_agent_chat_round(limit, offset, include_steps=False)
 
         # Get total count for pagination
-        with sqlite3.connect(server.db_path) as conn:
-            total = conn.execute("SELECT COUNT(*) FROM agent_chat_rounds").fetchone()[0]
+        total = server.count_rows()["agent_chat_rounds"]
 
         total_pages = (total + limit - 1) // limit
 
-        return templates.TemplateResponse("agent_chat_rounds.html", {
-            "request": request,
-            "chat_rounds": chat_rounds,
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "total_pages": total_pages
-        })
+        return templates.TemplateResponse(
+            "agent_chat_rounds.html",
+            {
+                "request": request,
+                "chat_rounds": chat_rounds,
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "total_pages": total_pages,
+            },
+        )
     except Exception as e:
         logger.error(f"Failed to load agent chat round page: {e}")
         return HTMLResponse(f"<h1>Error</h1><p>Failed to load page: {e}</p>")
@@ -369,44 +671,44 @@ async def fix_summary_detail(request: Request, summary_id: str):
     try:
         summary = server.get_fix_summary(summary_id)
         if not summary:
-            return HTMLResponse("<h1>Not Found</h1><p>The specified fix summary does not exist</p>")
+            return HTMLResponse(
+                "<h1>Not Found</h1><p>The specified fix summary does not exist</p>"
+            )
 
-        return templates.TemplateResponse("fix_summary_detail.html", {
-            "request": request,
-            "summary": summary
-        })
+        return templates.TemplateResponse(
+            "fix_summary_detail.html", {"request": request, "summary": summary}
+        )
     except Exception as e:
         logger.error(f"Failed to load fix summary detail: {e}")
         return HTMLResponse(f"<h1>Error</h1><p>Failed to load detail: {e}</p>")
 
+
 @app.get("/agent-chat-rounds/{chat_round_id}", response_class=HTMLResponse)
 async def agent_chat_round_detail(request: Request, chat_round_id: str):
     """Agent chat round detail"""
     try:
         chat_round = server.get_agent_chat_round(chat_round_id)
         if not chat_round:
-            return HTMLResponse("<h1>Not Found</h1><p>The specified agent chat round does not exist</p>")
-
-        return templates.TemplateResponse("agent_chat_round_detail.html", {
-            "request": request,
-            "chat_round": chat_round
-        })
+            return HTMLResponse(
+                "<h1>Not Found</h1><p>The specified agent chat round does not exist</p>"
+            )
+
+        return templates.TemplateResponse(
+            "agent_chat_round_detail.html",
+            {"request": request, "chat_round": chat_round},
+        )
     except Exception as e:
         logger.error(f"Failed to load agent chat round detail: {e}")
         return HTMLResponse(f"<h1>Error</h1><p>Failed to load detail: {e}</p>")
 
+
 @app.get("/api", response_class=HTMLResponse)
 async def api_documentation(request: Request):
     """API documentation page"""
-    return templates.TemplateResponse("api_documentation.html", {
-        "request": request
-    })
+    return templates.TemplateResponse("api_documentation.html", {"request": request})
+
 
 if __name__ == "__main__":
     uvicorn.run(
-        "simple_server:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+        "simple_server:app", host="0.0.0.0", port=8000, reload=True, log_level="info"
     )
@@ -1,26 +1,256 @@
-import argparse
+# argparse, concurrent.futures and urllib.request are imported where they are
+# first needed, so importing this module as a library stays cheap
+import enum
+import functools
+import http.client
+import io
 import json
+import os
 import pathlib
+import socket
 import sys
+import threading
+import time
 from typing import Optional
-import urllib.error
 import urllib.parse
-import urllib.request
+
+# Use orjson for request and response bodies when it is installed
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _json_loads = json.loads
 
 API_ROOT = "https://api.gitcode.com/api/v5"
+# Bytes read from a file body per socket send
+SEND_BLOCK_SIZE = 1 << 16
+# Attempts to open a connection, and the base of the exponential backoff between them
+CONNECT_ATTEMPTS = 4
+CONNECT_BACKOFF = 0.3
+# Seconds to wait for "100 Continue" before sending an upload body anyway
+EXPECT_CONTINUE_TIMEOUT = 1.0
+# Seconds a resolved host address is reused for new connections
+DNS_CACHE_TTL = 300
+# Redirects followed for GET and HEAD requests, as urllib.request did
+MAX_REDIRECTS = 10
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# The User-Agent urllib.request sends
+USER_AGENT = f"Python-urllib/{sys.version_info.major}.{sys.version_info.minor}"
+
+_JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
+
+@functools.lru_cache(maxsize=4)
+def _token_query(access_token: str) -> str:
+    return urllib.parse.urlencode({"access_token": access_token})
+
+
+# (host, port) -> (expiry, getaddrinfo results), shared by all threads
+_dns_cache: dict[tuple[str, int], tuple[float, list]] = {}
+_dns_lock = threading.Lock()
+
+
+def _resolve(host: str, port: int) -> list:
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, addresses)
+    return addresses
+
+
+def _create_connection(address, timeout, source_address=None) -> socket.socket:
+    # Stands in for socket.create_connection; connecting to the numeric address skips the lookup
+    host, port = address
+    last_error = None
+    for *_, sockaddr in _resolve(host, port):
+        try:
+            return socket.create_connection(sockaddr[:2], timeout, source_address)
+        except OSError as exc:
+            last_error = exc
+    # The cached addresses may be stale; resolve again on the next attempt
+    with _dns_lock:
+        _dns_cache.pop((host, port), None)
+    raise last_error or OSError(f"No addresses for {host}:{port}")
+
+
+# Keep-alive connections reused across calls, per thread and keyed by (scheme, host, port)
+_local = threading.local()
+
+
+def _connection(scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (scheme, host, port)
+    conn = connections.get(key)
+    if conn is None:
+        import urllib.request
+
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        # Honor the *_proxy environment variables like urllib.request does
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and not urllib.request.proxy_bypass(host):
+            proxy_url = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            conn = connection_class(proxy_url.hostname, proxy_url.port or 80, blocksize=SEND_BLOCK_SIZE)
+            conn.set_tunnel(host, port)
+        else:
+            conn = connection_class(host, port, blocksize=SEND_BLOCK_SIZE)
+        conn._create_connection = _create_connection
+        connections[key] = conn
+    return conn
+
+
+def _ensure_connected(conn: http.client.HTTPConnection) -> None:
+    # Nothing has been sent before the connection is up, so retrying is safe for any method
+    for attempt in range(CONNECT_ATTEMPTS):
+        if conn.sock is not None:
+            return
+        try:
+            conn.connect()
+        except OSError:
+            conn.close()
+            if attempt == CONNECT_ATTEMPTS - 1:
+                raise
+            time.sleep(CONNECT_BACKOFF * 2 ** attempt)
+
+
+class _ReplayReader(io.RawIOBase):
+    """Raw stream that replays bytes already read before reading on from fp."""
+
+    def __init__(self, consumed: bytes, fp) -> None:
+        self._consumed = consumed
+        self._fp = fp
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._consumed:
+            size = min(len(buffer), len(self._consumed))
+            buffer[:size] = self._consumed[:size]
+            self._consumed = self._consumed[size:]
+            return size
+        return self._fp.readinto1(buffer)
+
+    def close(self) -> None:
+        self._fp.close()
+        super().close()
+
+
+def _await_continue(conn: http.client.HTTPConnection, method: str) -> Optional[http.client.HTTPResponse]:
+    """Wait for the interim answer to "Expect: 100-continue".
+
+    Returns None when the body should be sent, or the final response when the
+    server rejected the request before seeing the body.
+    """
+    # A bounded read rather than select(): on TLS the socket also turns readable
+    # for post-handshake records such as session tickets, which carry no HTTP bytes
+    fp = conn.sock.makefile("rb")
+    previous_timeout = conn.sock.gettimeout()
+    conn.sock.settimeout(EXPECT_CONTINUE_TIMEOUT)
+    try:
+        status_line = fp.readline(65537)
+        parts = status_line.split(None, 2)
+        interim = len(parts) >= 2 and parts[1] == b"100"
+        if interim:
+            # Nothing follows the interim response until the body is sent
+            while fp.readline() not in (b"\r\n", b"\n", b""):
+                pass
+    except socket.timeout:
+        # Servers may ignore Expect entirely; send the body after the timeout
+        fp.close()
+        return None
+    finally:
+        conn.sock.settimeout(previous_timeout)
+    if interim:
+        fp.close()
+        return None
+    # Let http.client parse the final response, status line included
+    response = conn.response_class(conn.sock, method=method)
+    response.fp.close()
+    response.fp = io.BufferedReader(_ReplayReader(status_line, fp))
+    response.begin()
+    return response
+
+
+def _send(
+    conn: http.client.HTTPConnection, method: str, target: str, body, headers: dict
+) -> Optional[http.client.HTTPResponse]:
+    """Send a request; returns a response only if the server answered before the body went out."""
+    if not hasattr(body, "fileno"):
+        conn.request(method, target, body=body, headers=headers)
+        return None
+    # File bodies go out through socket.sendfile: sendfile(2) straight from the
+    # page cache on plain sockets, a buffered send loop on TLS sockets
+    conn.putrequest(method, target)
+    for key, value in headers.items():
+        conn.putheader(key, value)
+    conn.endheaders()
+    if headers.get("Expect") == "100-continue":
+        early_response = _await_continue(conn, method)
+        if early_response is not None:
+            return early_response
+    conn.sock.sendfile(body)
+    return None
+
+
+def request(method: str, url: str, body=None, headers: Optional[dict] = None) -> tuple[int, bytes]:
+    """Send a request over a reused connection and return the status code and body.
+
+    GET and HEAD requests follow up to MAX_REDIRECTS redirects.
+    """
+    headers = {"User-Agent": USER_AGENT, **(headers or {})}
+    for _ in range(MAX_REDIRECTS):
+        status, payload, location = _request_once(method, url, body, headers)
+        if method not in ("GET", "HEAD") or status not in REDIRECT_CODES or not location:
+            return status, payload
+        url = urllib.parse.urljoin(url, location)
+    return _request_once(method, url, body, headers)[:2]
+
+
+def _request_once(method: str, url: str, body, headers: dict) -> tuple[int, bytes, Optional[str]]:
+    """Send one request; returns the status code, body and Location header."""
+    parts = urllib.parse.urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+    conn = _connection(parts.scheme, parts.hostname, port)
+    reused = conn.sock is not None
+    _ensure_connected(conn)
+    try:
+        early_response = _send(conn, method, target, body, headers)
+        response = early_response or conn.getresponse()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+        conn.close()
+        # The server may drop an idle keep-alive connection; retry once on a fresh one
+        if not reused:
+            raise
+        if hasattr(body, "seek"):
+            body.seek(0)
+        _ensure_connected(conn)
+        early_response = _send(conn, method, target, body, headers)
+        response = early_response or conn.getresponse()
+    payload = response.read()
+    # A request rejected before its body was sent leaves the connection unusable
+    if early_response is not None or response.will_close:
+        conn.close()
+    return response.status, payload, response.getheader("Location")
 
 
 def delete_tag(owner: str, repo: str, tag: str, access_token: str) -> tuple[int, bytes]:
-    params = urllib.parse.urlencode({"access_token": access_token})
+    params = _token_query(access_token)
     encoded_tag = urllib.parse.quote(tag, safe="")
     url = f"{API_ROOT}/repos/{owner}/{repo}/tags/{encoded_tag}?{params}"
-    request = urllib.request.Request(url, method="DELETE")
-    request.add_header("Accept", "*/*")
-    try:
-        with urllib.request.urlopen(request) as response:
-            return response.getcode(), response.read()
-    except urllib.error.HTTPError as err:
-        return err.code, err.read()
+    return request("DELETE", url, headers={"Accept": "*/*"})
 
 
 def request_upload_info(owner: str, repo: str, tag: str, access_token: str, file_name: str) -> dict:
@@ -29,40 +259,36 @@ def request_upload_info(owner: str, repo: str, tag: str, access_token: str, file
         "file_name": file_name,
     })
     url = f"{API_ROOT}/repos/{owner}/{repo}/releases/{tag}/upload_url?{params}"
-    req = urllib.request.Request(url, headers={"Accept": "application/json"})
-    with urllib.request.urlopen(req) as response:
-        body = response.read()
+    status_code, body = request("GET", url, headers={"Accept": "application/json"})
+    if status_code >= 300:
+        raise RuntimeError(f"Upload info API returned status {status_code}: {body!r}")
     try:
-        return json.loads(body)
+        return _json_loads(body)
     except json.JSONDecodeError as exc:
         raise RuntimeError(f"Upload info API returned invalid JSON: {body!r}") from exc
 
 
 def upload_blob(upload_url: str, headers: dict, file_path: pathlib.Path) -> tuple[int, bytes]:
+    # Stream the file into the socket instead of reading it into memory first;
+    # the body is sent with an explicit Content-Length, never chunked. Expect
+    # lets the server refuse the upload before the file is transmitted.
     with file_path.open("rb") as fh:
-        data = fh.read()
-    request = urllib.request.Request(upload_url, data=data, method="PUT")
-    for key, value in headers.items():
-        request.add_header(key, value)
-    try:
-        with urllib.request.urlopen(request) as response:
-            return response.getcode(), response.read()
-    except urllib.error.HTTPError as err:
-        return err.code, err.read()
+        # The same handle, seeked back, serves a retried send; read it ahead sequentially
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        headers = {
+            **headers,
+            "Content-Length": str(file_path.stat().st_size),
+            "Expect": "100-continue",
+        }
+        return request("PUT", upload_url, body=fh, headers=headers)
 
 
 def create_tag(owner: str, repo: str, tag: str, ref: str, access_token: str) -> tuple[int, bytes]:
-    params = urllib.parse.urlencode({"access_token": access_token})
+    params = _token_query(access_token)
     url = f"{API_ROOT}/repos/{owner}/{repo}/tags?{params}"
-    payload = json.dumps({"refs": ref, "tag_name": tag}).encode()
-    request = urllib.request.Request(url, data=payload, method="POST")
-    request.add_header("Content-Type", "application/json")
-    request.add_header("Accept", "application/json")
-    try:
-        with urllib.request.urlopen(request) as response:
-            return response.getcode(), response.read()
-    except urllib.error.HTTPError as err:
-        return err.code, err.read()
+    payload = _json_dumps({"refs": ref, "tag_name": tag})
+    return request("POST", url, body=payload, headers=_JSON_HEADERS)
 
 
 def create_release(
@@ -73,32 +299,31 @@ def create_release(
     body: str,
     access_token: str,
 ) -> tuple[int, bytes]:
-    params = urllib.parse.urlencode({"access_token": access_token})
+    params = _token_query(access_token)
     url = f"{API_ROOT}/repos/{owner}/{repo}/releases?{params}"
-    payload = json.dumps(
+    payload = _json_dumps(
         {
             "tag_name": tag,
             "name": name,
             "body": body
         }
-    ).encode()
-    request = urllib.request.Request(url, data=payload, method="POST")
-    request.add_header("Content-Type", "application/json")
-    request.add_header("Accept", "application/json")
-    try:
-        with urllib.request.urlopen(request) as response:
-            return response.getcode(), response.read()
-    except urllib.error.HTTPError as err:
-        return err.code, err.read()
+    )
+    return request("POST", url, body=payload, headers=_JSON_HEADERS)
+
+
+def _say(message: str, file=None) -> None:
+    # Message and newline in one write, so lines from parallel uploads never merge
+    print(message + "\n", end="", file=file or sys.stdout, flush=True)
 
 
 def print_result(action: str, status_code: int, payload: Optional[bytes]) -> None:
-    print(f"{action} finished with status {status_code}")
+    lines = [f"{action} finished with status {status_code}"]
     if payload:
         try:
-            print(payload.decode())
+            lines.append(payload.decode())
         except UnicodeDecodeError:
-            print(payload)
+            lines.append(str(payload))
+    _say("\n".join(lines))
 
 
 def upload_asset(
@@ -108,25 +333,103 @@ def upload_asset(
     access_token: str,
     file_path: pathlib.Path,
     remote_name: Optional[str],
-) -> None:
+    name_messages: bool = False,
+) -> bool:
     remote = remote_name or file_path.name
-    print("Requesting upload URL...", flush=True)
+    # Parallel uploads name their file so interleaved messages stay traceable
+    suffix = f" for {file_path.name}" if name_messages else ""
+    _say(f"Requesting upload URL{suffix}...")
     upload_info = request_upload_info(owner, repo, tag, access_token, remote)
 
     upload_url = upload_info.get("url")
     headers = upload_info.get("headers")
     if not upload_url or not isinstance(headers, dict):
-        print(f"Unexpected upload info payload: {upload_info}", file=sys.stderr)
-        sys.exit(1)
+        _say(f"Unexpected upload info payload{suffix}: {upload_info}", file=sys.stderr)
+        return False
 
-    print("Uploading file...", flush=True)
+    _say(f"Uploading file{suffix}...")
     status_code, payload = upload_blob(upload_url, headers, file_path)
-    print_result("Upload", status_code, payload)
+    print_result(f"Upload{suffix}", status_code, payload)
+    return status_code < 300
+
+
+def upload_assets(
+    owner: str,
+    repo: str,
+    tag: str,
+    access_token: str,
+    file_paths: list[pathlib.Path],
+    max_parallel: int = 4,
+) -> bool:
+    """Upload several files to one release, at most max_parallel at a time."""
+    if len(file_paths) == 1:
+        return upload_asset(owner, repo, tag, access_token, file_paths[0], None)
+
+    def upload_one(file_path: pathlib.Path) -> bool:
+        try:
+            return upload_asset(owner, repo, tag, access_token, file_path, None, name_messages=True)
+        except (OSError, RuntimeError, http.client.HTTPException) as exc:
+            _say(f"Upload of {file_path.name} failed: {exc}", file=sys.stderr)
+            return False
+
+    import concurrent.futures
+
+    # Each worker thread keeps its own connections
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        return all(list(executor.map(upload_one, file_paths)))
+
+
+class ReleaseStatus(enum.Enum):
+    CREATED = "created"
+    TAG_EXISTS = "tag exists"
+    FAILED = "failed"
+
+
+# Conflict statuses for a tag name that is already taken
+TAG_EXISTS_STATUSES = frozenset({409, 422})
+
+
+def _is_tag_exists(status_code: int, payload: bytes) -> bool:
+    if status_code in TAG_EXISTS_STATUSES:
+        return True
+    if status_code != 400:
+        return False
+    # Some GitCode deployments answer 400 with the reason in the JSON message
+    try:
+        error = _json_loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return False
+    if not isinstance(error, dict):
+        return False
+    message = error.get("message") or error.get("error_message") or ""
+    return isinstance(message, str) and "already exists" in message.lower()
+
+
+def release(
+    owner: str,
+    repo: str,
+    tag: str,
+    name: Optional[str],
+    body: str,
+    access_token: str,
+    ref: str = "main",
+) -> ReleaseStatus:
+    """Create the tag and then its release."""
+    print("Creating tag...", flush=True)
+    status_code, payload = create_tag(owner, repo, tag, ref, access_token)
+    print_result("Create tag", status_code, payload)
     if status_code >= 300:
-        sys.exit(1)
+        return ReleaseStatus.TAG_EXISTS if _is_tag_exists(status_code, payload) else ReleaseStatus.FAILED
+
+    print("Creating release...", flush=True)
+    status_code, payload = create_release(owner, repo, tag, name, body, access_token)
+    print_result("Create release", status_code, payload)
+    if status_code >= 300:
+        return ReleaseStatus.FAILED
+    return ReleaseStatus.CREATED
 
 
-def add_repo_arguments(parser: argparse.ArgumentParser) -> None:
+def add_repo_arguments(parser: "argparse.ArgumentParser") -> None:
     parser.add_argument("--owner", required=True, help="Repository owner")
     parser.add_argument("--repo", required=True, help="Repository name")
     parser.add_argument("--tag", required=True, help="Tag identifier")
@@ -134,6 +437,8 @@ def add_repo_arguments(parser: argparse.ArgumentParser) -> None:
 
 
 def main() -> None:
+    import argparse
+
     parser = argparse.ArgumentParser(description="GitCode release utilities")
     subparsers = parser.add_subparsers(dest="command")
     subparsers.required = True
@@ -152,10 +457,15 @@ def main() -> None:
         help="Release notes body to include when creating a release",
     )
 
-    upload_parser = subparsers.add_parser("upload", help="Upload an asset to an existing release")
-    upload_parser.add_argument("file", help="Local file to upload")
+    upload_parser = subparsers.add_parser("upload", help="Upload assets to an existing release")
+    upload_parser.add_argument("file", nargs="+", help="Local files to upload")
     add_repo_arguments(upload_parser)
-    upload_parser.add_argument("--remote-name", help="Remote file name; defaults to local name")
+    upload_parser.add_argument(
+        "--remote-name", help="Remote file name for a single file; defaults to local name"
+    )
+    upload_parser.add_argument(
+        "--max-parallel", type=int, default=4, help="Files uploaded concurrently (default: 4)"
+    )
 
     delete_parser = subparsers.add_parser("delete-tag", help="Delete a tag from the repository")
     add_repo_arguments(delete_parser)
@@ -172,35 +482,38 @@ def main() -> None:
         return
 
     if args.command == "upload":
-        file_path = pathlib.Path(args.file)
-        if not file_path.is_file():
-            print(f"File not found: {file_path}", file=sys.stderr)
+        file_paths = [pathlib.Path(file) for file in args.file]
+        for file_path in file_paths:
+            if not file_path.is_file():
+                print(f"File not found: {file_path}", file=sys.stderr)
+                sys.exit(1)
+        if args.remote_name and len(file_paths) > 1:
+            print("--remote-name only applies to a single file", file=sys.stderr)
             sys.exit(1)
 
-        upload_asset(
-            args.owner,
-            args.repo,
-            args.tag,
-            args.access_token,
-            file_path,
-            args.remote_name,
-        )
+        if len(file_paths) == 1:
+            uploaded = upload_asset(
+                args.owner,
+                args.repo,
+                args.tag,
+                args.access_token,
+                file_paths[0],
+                args.remote_name,
+            )
+        else:
+            uploaded = upload_assets(
+                args.owner,
+                args.repo,
+                args.tag,
+                args.access_token,
+                file_paths,
+                max(1, args.max_parallel),
+            )
+        if not uploaded:
+            sys.exit(1)
         return
 
-    print("Creating tag...", flush=True)
-    status_code, payload = create_tag(
-        args.owner,
-        args.repo,
-        args.tag,
-        'main',
-        args.access_token,
-    )
-    print_result("Create tag", status_code, payload)
-    if status_code >= 300:
-        sys.exit(1)
-
-    print("Creating release...", flush=True)
-    status_code, payload = create_release(
+    status = release(
         args.owner,
         args.repo,
         args.tag,
@@ -208,8 +521,7 @@ def main() -> None:
         args.release_body,
         args.access_token,
     )
-    print_result("Create release", status_code, payload)
-    if status_code >= 300:
+    if status is not ReleaseStatus.CREATED:
         sys.exit(1)
 
 
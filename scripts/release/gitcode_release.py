@@ -9,8 +9,32 @@ import sys
 import subprocess
 import platform
 import argparse
+import functools
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
+import http.client
+
+# gitcode.py sits next to this script, which puts it on sys.path
+import gitcode
+
+
+# platform.system() / platform.machine() values mapped to release platform names
+OS_MAPPING = {
+    'darwin': 'macos',
+    'linux': 'linux',
+    'windows': 'windows',
+    'freebsd': 'freebsd'
+}
+ARCH_MAPPING = {
+    'x86_64': 'x86_64',
+    'x64': 'x86_64',
+    'aarch64': 'aarch64',
+    'arm64': 'aarch64',
+    'armv7l': 'armv7',
+    'armv6l': 'armv6',
+    'i386': 'x86',
+    'i686': 'x86'
+}
 
 
 class Colors:
@@ -25,6 +49,12 @@ class Colors:
     GRAY = '\033[0;37m'
     NC = '\033[0m'  # No Color
 
+    @classmethod
+    def disable(cls) -> None:
+        """Blank every color code, e.g. when output is not a terminal"""
+        cls.RED = cls.GREEN = cls.YELLOW = cls.BLUE = cls.PURPLE = ''
+        cls.CYAN = cls.WHITE = cls.GRAY = cls.NC = ''
+
 
 class ReleaseManager:
     """Manages the release process for Magic CLI"""
@@ -37,6 +67,9 @@ class ReleaseManager:
         self.version = version
         self.platform = self.get_platform()
         self.tag = f"{version}-{self.platform}"
+        # Highlighted forms used throughout the step messages
+        self._tag_styled = f"{Colors.CYAN}{self.tag}{Colors.NC}"
+        self._platform_styled = f"{Colors.CYAN}{self.platform}{Colors.NC}"
 
     # Colored output functions
     @staticmethod
@@ -65,32 +98,13 @@ class ReleaseManager:
         print(f"{Colors.WHITE}{message}{Colors.NC}")
         print(f"{Colors.WHITE}================================{Colors.NC}")
 
-    def get_platform(self) -> str:
+    @staticmethod
+    @functools.cache
+    def get_platform() -> str:
         """Detect current platform (OS-architecture combination)"""
-        # Get operating system
-        os_name = platform.system().lower()
-        os_mapping = {
-            'darwin': 'macos',
-            'linux': 'linux',
-            'windows': 'windows',
-            'freebsd': 'freebsd'
-        }
-        os_name = os_mapping.get(os_name, 'unknown')
-
-        # Get architecture
+        os_name = OS_MAPPING.get(platform.system().lower(), 'unknown')
         arch = platform.machine().lower()
-        arch_mapping = {
-            'x86_64': 'x86_64',
-            'x64': 'x86_64',
-            'aarch64': 'aarch64',
-            'arm64': 'aarch64',
-            'armv7l': 'armv7',
-            'armv6l': 'armv6',
-            'i386': 'x86',
-            'i686': 'x86'
-        }
-        arch = arch_mapping.get(arch, arch)
-
+        arch = ARCH_MAPPING.get(arch, arch)
         return f"{os_name}-{arch}"
 
     def display_config(self) -> None:
@@ -98,9 +112,9 @@ class ReleaseManager:
         self.print_info("Configuration:")
         print(f"  {Colors.GRAY}Owner:{Colors.NC} {Colors.CYAN}{self.owner}{Colors.NC}")
         print(f"  {Colors.GRAY}Repository:{Colors.NC} {Colors.CYAN}{self.repo}{Colors.NC}")
-        print(f"  {Colors.GRAY}Tag:{Colors.NC} {Colors.CYAN}{self.tag}{Colors.NC}")
-        print(f"  {Colors.GRAY}Platform:{Colors.NC} {Colors.CYAN}{self.platform}{Colors.NC}")
-        print(f"  {Colors.GRAY}Release Name:{Colors.NC} {Colors.CYAN}{self.tag}{Colors.NC}")
+        print(f"  {Colors.GRAY}Tag:{Colors.NC} {self._tag_styled}")
+        print(f"  {Colors.GRAY}Platform:{Colors.NC} {self._platform_styled}")
+        print(f"  {Colors.GRAY}Release Name:{Colors.NC} {self._tag_styled}")
         print()
 
     def run_command(self, command: list, capture_output: bool = True) -> Tuple[int, str, str]:
@@ -121,7 +135,7 @@ class ReleaseManager:
 
     def build_magic_cli(self) -> bool:
         """Build magic-cli using the build script"""
-        self.print_step(f"Step 1: Building magic-cli for {Colors.CYAN}{self.platform}{Colors.NC}")
+        self.print_step(f"Step 1: Building magic-cli for {self._platform_styled}")
         print()
 
         build_script = self.script_dir / "../build-static/build-magic-cli.sh"
@@ -142,112 +156,90 @@ class ReleaseManager:
         print()
         return True
 
+    def release_once(self) -> gitcode.ReleaseStatus:
+        """Create the tag and release through the in-process GitCode client"""
+        try:
+            return gitcode.release(
+                self.owner,
+                self.repo,
+                self.tag,
+                self.tag,
+                f"Release {self.tag}",
+                self.access_token,
+            )
+        except (OSError, http.client.HTTPException) as e:
+            self.print_error(f"GitCode request failed: {e}")
+            return gitcode.ReleaseStatus.FAILED
+
     def create_release(self) -> bool:
         """Create release on GitCode"""
-        self.print_step(f"Step 2: Creating release {Colors.CYAN}{self.tag}{Colors.NC} for {Colors.CYAN}{self.platform}{Colors.NC}")
+        self.print_step(f"Step 2: Creating release {self._tag_styled} for {self._platform_styled}")
         print()
 
-        gitcode_script = self.script_dir / "gitcode.py"
-        if not gitcode_script.exists():
-            self.print_error(f"gitcode.py script not found: {gitcode_script}")
-            return False
-
         # First attempt to create release
-        exit_code, stdout, stderr = self.run_command([
-            "python3", str(gitcode_script), "release",
-            "--owner", self.owner,
-            "--repo", self.repo,
-            "--tag", self.tag,
-            "--access-token", self.access_token,
-            "--release-name", self.tag,
-            "--release-body", f"Release {self.tag}"
-        ])
-
-        if exit_code == 0:
+        status = self.release_once()
+        if status is gitcode.ReleaseStatus.CREATED:
             self.print_success("Release created successfully!")
             print()
             return True
 
-        # Check if tag already exists
-        if "tag already exists" in stderr.lower() or "tag already exists" in stdout.lower():
-            self.print_warning(f"Tag {self.tag} already exists. Deleting existing tag and retrying...")
-            print()
-
-            # Delete existing tag
-            self.print_step(f"Deleting existing tag {Colors.CYAN}{self.tag}{Colors.NC}")
-            exit_code, _, stderr = self.run_command([
-                "python3", str(gitcode_script), "delete-tag",
-                "--owner", self.owner,
-                "--repo", self.repo,
-                "--tag", self.tag,
-                "--access-token", self.access_token
-            ])
-
-            if exit_code != 0:
-                self.print_error(f"Failed to delete existing tag {self.tag}")
-                if stderr:
-                    print(f"Error: {stderr}")
-                return False
-
-            self.print_success("Tag deleted successfully!")
-            print()
+        if status is not gitcode.ReleaseStatus.TAG_EXISTS:
+            self.print_error(f"Failed to create release {self.tag} for {self.platform}")
+            return False
 
-            # Retry creating release
-            self.print_step(f"Retrying release creation for {Colors.CYAN}{self.tag}{Colors.NC}")
-            print()
+        self.print_warning(f"Tag {self.tag} already exists. Deleting existing tag and retrying...")
+        print()
 
-            exit_code, stdout, stderr = self.run_command([
-                "python3", str(gitcode_script), "release",
-                "--owner", self.owner,
-                "--repo", self.repo,
-                "--tag", self.tag,
-                "--access-token", self.access_token,
-                "--release-name", self.tag,
-                "--release-body", f"Release {self.tag}"
-            ])
-
-            if exit_code == 0:
-                self.print_success("Release created successfully!")
-                print()
-                return True
-            else:
-                self.print_error(f"Failed to create release {self.tag} for {self.platform}")
-                if stderr:
-                    print(f"Error: {stderr}")
-                return False
-        else:
-            self.print_error(f"Failed to create release {self.tag} for {self.platform}")
-            if stderr:
-                print(f"Error: {stderr}")
+        # Delete existing tag
+        self.print_step(f"Deleting existing tag {self._tag_styled}")
+        try:
+            status_code, payload = gitcode.delete_tag(self.owner, self.repo, self.tag, self.access_token)
+        except (OSError, http.client.HTTPException) as e:
+            status_code, payload = 0, str(e).encode()
+        gitcode.print_result("Delete tag", status_code, payload)
+        if not 200 <= status_code < 300 and status_code != 404:
+            self.print_error(f"Failed to delete existing tag {self.tag}")
             return False
 
+        self.print_success("Tag deleted successfully!")
+        print()
+
+        # Retry creating release
+        self.print_step(f"Retrying release creation for {self._tag_styled}")
+        print()
+
+        if self.release_once() is gitcode.ReleaseStatus.CREATED:
+            self.print_success("Release created successfully!")
+            print()
+            return True
+        self.print_error(f"Failed to create release {self.tag} for {self.platform}")
+        return False
+
     def upload_binary(self) -> bool:
         """Upload binary to the release"""
-        self.print_step(f"Step 3: Uploading binary for {Colors.CYAN}{self.platform}{Colors.NC}")
+        self.print_step(f"Step 3: Uploading binary for {self._platform_styled}")
         print()
 
-        gitcode_script = self.script_dir / "gitcode.py"
         binary_path = self.script_dir / "../../binary/magic-cli"
 
-        if not gitcode_script.exists():
-            self.print_error(f"gitcode.py script not found: {gitcode_script}")
-            return False
-
         if not binary_path.exists():
             self.print_error(f"Binary not found: {binary_path}")
             return False
 
-        exit_code, stdout, stderr = self.run_command([
-            "python3", str(gitcode_script), "upload",
-            "--owner", self.owner,
-            "--repo", self.repo,
-            "--tag", self.tag,
-            "--access-token", self.access_token,
-            str(binary_path),
-            "--remote-name", f"magic-cli-{self.platform}"
-        ])
-
-        if exit_code == 0:
+        try:
+            uploaded = gitcode.upload_asset(
+                self.owner,
+                self.repo,
+                self.tag,
+                self.access_token,
+                binary_path,
+                f"magic-cli-{self.platform}",
+            )
+        except (OSError, RuntimeError, http.client.HTTPException) as e:
+            self.print_error(f"Error: {e}")
+            uploaded = False
+
+        if uploaded:
             print()
             self.print_header("✅ Release Process Completed!")
             print(f"{Colors.GREEN}🎉 Magic CLI {self.tag} has been released for {self.platform}!{Colors.NC}")
@@ -255,8 +247,6 @@ class ReleaseManager:
             return True
         else:
             self.print_error("Binary upload failed!")
-            if stderr:
-                print(f"Error: {stderr}")
             return False
 
     def run_release(self) -> bool:
@@ -289,6 +279,9 @@ def main():
 
     args = parser.parse_args()
 
+    if not sys.stdout.isatty():
+        Colors.disable()
+
     try:
         release_manager = ReleaseManager(
             owner=args.owner,